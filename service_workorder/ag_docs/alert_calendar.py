@@ -0,0 +1,492 @@
+"""Materialised calendar of upcoming document expiry alerts.
+
+``Document Alert Calendar`` holds one row per (alert date, registration, document row,
+channel) for the next ``CALENDAR_HORIZON_DAYS`` days, so forecasts are a single
+indexed query instead of re-running the scheduler rules for every day.
+
+The calendar is kept current incrementally:
+
+* registrations rebuild their own rows on save and drop them on delete,
+* Document Type Master and Document Alert Settings changes rebuild the affected rows
+  in the background,
+* a daily job drops past dates and adds the day that entered the horizon.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from datetime import timedelta
+
+import frappe
+from frappe import _
+from frappe.utils import add_days, cint, cstr, getdate, now_datetime, nowdate
+
+from service_workorder.ag_docs.alert_schedule import get_next_alert_date, resolve_alert_rules
+from service_workorder.ag_docs.customer_contact_sync import get_customer_alert_contacts
+from service_workorder.ag_docs.expiry_window import evaluate_row_windows
+
+CALENDAR_DOCTYPE = "Document Alert Calendar"
+
+# Days ahead that are materialised; forecasts cannot look further
+CALENDAR_HORIZON_DAYS = 60
+
+# Last date the calendar holds, advanced by the daily roll
+MATERIALISED_UNTIL_KEY = "document_alert_calendar_until"
+
+# Largest alert_days set on a document row; recomputed by a rebuild and only raised in between
+ROW_ALERT_DAYS_KEY = "document_alert_calendar_row_alert_days"
+
+REBUILD_CHUNK_SIZE = 2000
+INSERT_CHUNK_SIZE = 1000
+
+REGISTRATION_DOCTYPES = ("Customer Document Registration", "Customer Employee Registration")
+
+# Parent fields that enable the Email / SMS channel of a registration
+CHANNEL_FLAGS = {
+	"Customer Document Registration": ("enable_email_alert", "enable_sms_alert"),
+	"Customer Employee Registration": ("notify_employee_email", "notify_employee_sms"),
+}
+
+_ROW_QUERY = """
+	select
+		child.name as rowname,
+		child.parent,
+		child.parenttype,
+		child.document_type,
+		child.document_number,
+		child.expiry_date,
+		child.alert_days,
+		child.alert_repeat_interval,
+		dt.alert_days as default_alert_days,
+		dt.repeat_interval as default_repeat_interval
+	from `tabDocument Detail` child
+	left join `tabDocument Type Master` dt
+		on dt.name = child.document_type
+	where child.parenttype in %(parenttypes)s
+		and child.parentfield = 'document_details'
+		and child.expiry_date >= %(from_date)s
+		{conditions}
+	order by child.name
+	limit %(limit)s
+"""
+
+_INSERT_FIELDS = (
+	"name",
+	"creation",
+	"modified",
+	"owner",
+	"modified_by",
+	"docstatus",
+	"alert_date",
+	"channel",
+	"document_detail",
+	"reference_doctype",
+	"reference_name",
+	"document_type",
+	"document_number",
+	"expiry_date",
+)
+
+
+@frappe.whitelist()
+def get_expiry_forecast(days=7, from_date=None, channel=None, include_details=1):
+	"""Per-day alert counts (and optionally the alerts themselves) for the next ``days`` days."""
+	frappe.has_permission(CALENDAR_DOCTYPE, "read", throw=True)
+
+	today = getdate(nowdate())
+	start = max(getdate(from_date or today), today)
+	days = min(max(cint(days) or 7, 1), CALENDAR_HORIZON_DAYS)
+	end = min(getdate(add_days(start, days - 1)), getdate(add_days(today, CALENDAR_HORIZON_DAYS)))
+
+	conditions = ""
+	params = {"start": start, "end": end}
+	if channel:
+		if channel not in ("Email", "SMS"):
+			frappe.throw(_("Channel must be Email or SMS."))
+		conditions = "and channel = %(channel)s"
+		params["channel"] = channel
+
+	rows = frappe.db.sql(
+		f"""
+		select
+			alert_date,
+			channel,
+			reference_doctype,
+			reference_name,
+			document_detail,
+			document_type,
+			document_number,
+			expiry_date
+		from `tabDocument Alert Calendar`
+		where alert_date between %(start)s and %(end)s
+			{conditions}
+		order by alert_date, reference_doctype, reference_name, channel
+		""",
+		params,
+		as_dict=True,
+	)
+
+	summary = {}
+	day = start
+	while day <= end:
+		summary[day] = {
+			"date": day,
+			"documents": set(),
+			"registrations": set(),
+			"Email": set(),
+			"SMS": set(),
+			"alerts": [],
+		}
+		day += timedelta(days=1)
+
+	for row in rows:
+		entry = summary.get(getdate(row.alert_date))
+		if entry is None:
+			continue
+		registration = (row.reference_doctype, row.reference_name)
+		entry["documents"].add(row.document_detail)
+		entry["registrations"].add(registration)
+		entry[row.channel].add(registration)
+		if cint(include_details):
+			entry["alerts"].append(row)
+
+	forecast = []
+	for entry in summary.values():
+		day = {
+			"date": entry["date"],
+			"documents": len(entry["documents"]),
+			"registrations": len(entry["registrations"]),
+			# the scheduler sends one message per registration and channel
+			"emails": len(entry["Email"]),
+			"sms": len(entry["SMS"]),
+		}
+		if cint(include_details):
+			day["alerts"] = entry["alerts"]
+		forecast.append(day)
+
+	return {
+		"from_date": start,
+		"to_date": end,
+		"horizon": CALENDAR_HORIZON_DAYS,
+		"days": forecast,
+	}
+
+
+def refresh_registration_calendar(doc):
+	"""Rebuild the calendar rows of one registration (called from its ``on_update``)."""
+	_raise_row_alert_days(row.alert_days for row in doc.get("document_details") or [])
+	delete_calendar_rows(reference_doctype=doc.doctype, reference_name=doc.name)
+	_rebuild_rows(
+		"and child.parenttype = %(reference_doctype)s and child.parent = %(reference_name)s",
+		{"reference_doctype": doc.doctype, "reference_name": doc.name},
+	)
+
+
+def refresh_document_type_calendar(document_type):
+	"""Rebuild the calendar rows that use a Document Type Master's defaults."""
+	delete_calendar_rows(document_type=document_type)
+	return _rebuild_rows("and child.document_type = %(document_type)s", {"document_type": document_type})
+
+
+def refresh_employee_calendar_for_customer(customer):
+	"""Rebuild the employee rows of a customer whose employee alert opt-ins changed."""
+	employees = frappe.get_all(
+		"Customer Employee Registration", filters={"customer_name": customer}, pluck="name"
+	)
+	for start in range(0, len(employees), INSERT_CHUNK_SIZE):
+		chunk = tuple(employees[start : start + INSERT_CHUNK_SIZE])
+		frappe.db.sql(
+			"""
+			delete from `tabDocument Alert Calendar`
+			where reference_doctype = 'Customer Employee Registration'
+				and reference_name in %(names)s
+			""",
+			{"names": chunk},
+		)
+		_rebuild_rows(
+			"and child.parenttype = 'Customer Employee Registration' and child.parent in %(names)s",
+			{"names": chunk},
+		)
+
+
+def rebuild_alert_calendar():
+	"""Recreate the whole calendar from today to the end of the horizon."""
+	frappe.db.delete(CALENDAR_DOCTYPE)
+	frappe.db.set_global(ROW_ALERT_DAYS_KEY, _query_row_alert_days())
+	inserted = _rebuild_rows()
+	frappe.db.set_global(MATERIALISED_UNTIL_KEY, cstr(getdate(add_days(nowdate(), CALENDAR_HORIZON_DAYS))))
+	return inserted
+
+
+def roll_alert_calendar():
+	"""Daily job: drop past dates and materialise the days that entered the horizon."""
+	today = getdate(nowdate())
+	frappe.db.sql("delete from `tabDocument Alert Calendar` where alert_date < %s", today)
+
+	horizon_end = getdate(add_days(today, CALENDAR_HORIZON_DAYS))
+	materialised_until = frappe.db.get_global(MATERIALISED_UNTIL_KEY)
+	if not materialised_until:
+		return rebuild_alert_calendar()
+
+	inserted = 0
+	day = max(getdate(materialised_until), today) + timedelta(days=1)
+	while day <= horizon_end:
+		inserted += _materialise_day(day)
+		day += timedelta(days=1)
+
+	frappe.db.set_global(MATERIALISED_UNTIL_KEY, cstr(horizon_end))
+	return inserted
+
+
+def delete_calendar_rows(**filters):
+	frappe.db.delete(CALENDAR_DOCTYPE, filters)
+
+
+def enqueue_document_type_calendar_refresh(document_type):
+	frappe.enqueue(
+		"service_workorder.ag_docs.alert_calendar.refresh_document_type_calendar",
+		queue="long",
+		document_type=document_type,
+		enqueue_after_commit=True,
+	)
+
+
+def enqueue_employee_calendar_refresh(customer):
+	frappe.enqueue(
+		"service_workorder.ag_docs.alert_calendar.refresh_employee_calendar_for_customer",
+		queue="long",
+		customer=customer,
+		enqueue_after_commit=True,
+	)
+
+
+def enqueue_calendar_rebuild():
+	frappe.enqueue(
+		"service_workorder.ag_docs.alert_calendar.rebuild_alert_calendar",
+		queue="long",
+		job_id="document_alert_calendar_rebuild",
+		deduplicate=True,
+		enqueue_after_commit=True,
+	)
+
+
+def make_calendar_key(alert_date, rowname, channel):
+	raw = "|".join((cstr(getdate(alert_date)), cstr(rowname), cstr(channel)))
+	return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _rebuild_rows(conditions="", params=None):
+	"""Materialise every alert date within the horizon for the Document Detail rows matched."""
+	today = getdate(nowdate())
+	horizon_end = getdate(add_days(today, CALENDAR_HORIZON_DAYS))
+	context = _ChannelContext()
+
+	params = {
+		**(params or {}),
+		"parenttypes": REGISTRATION_DOCTYPES,
+		"from_date": today,
+		"limit": REBUILD_CHUNK_SIZE,
+		"last_name": "",
+	}
+	query = _ROW_QUERY.format(conditions=f"{conditions} and child.name > %(last_name)s")
+
+	inserted = 0
+	while True:
+		rows = frappe.db.sql(query, params, as_dict=True)
+		if not rows:
+			break
+
+		channels = context.get_channels(rows)
+		entries = []
+		for row in rows:
+			row_channels = channels.get((row.parenttype, row.parent))
+			if not row_channels:
+				continue
+			for alert_date in _iter_alert_dates(row, today, horizon_end):
+				entries.extend((alert_date, row, channel) for channel in row_channels)
+
+		inserted += _insert_entries(entries)
+		if len(rows) < REBUILD_CHUNK_SIZE:
+			break
+		params["last_name"] = rows[-1].rowname
+
+	return inserted
+
+
+def _materialise_day(day):
+	"""Add the alerts of one date, evaluating only rows whose window can include it."""
+	context = _ChannelContext()
+	max_alert_days = _get_max_alert_days()
+	if max_alert_days <= 0:
+		return 0
+
+	params = {
+		"parenttypes": REGISTRATION_DOCTYPES,
+		"from_date": day,
+		"until": getdate(add_days(day, max_alert_days)),
+		"limit": REBUILD_CHUNK_SIZE,
+		"last_name": "",
+	}
+	query = _ROW_QUERY.format(conditions="and child.expiry_date <= %(until)s and child.name > %(last_name)s")
+
+	inserted = 0
+	while True:
+		rows = frappe.db.sql(query, params, as_dict=True)
+		if not rows:
+			break
+
+		_days_left, due = evaluate_row_windows(rows, day)
+		due_rows = [row for row, is_due in zip(rows, due, strict=True) if is_due]
+		channels = context.get_channels(due_rows)
+		entries = []
+		for row in due_rows:
+			entries.extend(
+				(day, row, channel) for channel in channels.get((row.parenttype, row.parent)) or ()
+			)
+
+		inserted += _insert_entries(entries)
+		if len(rows) < REBUILD_CHUNK_SIZE:
+			break
+		params["last_name"] = rows[-1].rowname
+
+	return inserted
+
+
+def _iter_alert_dates(row, from_date, to_date):
+	alert_days, repeat_interval = resolve_alert_rules(
+		row.alert_days,
+		row.alert_repeat_interval,
+		row.default_alert_days,
+		row.default_repeat_interval,
+	)
+	alert_date = get_next_alert_date(row.expiry_date, alert_days, repeat_interval, from_date)
+	expiry = getdate(row.expiry_date) if row.expiry_date else None
+	while alert_date and alert_date <= to_date and alert_date <= expiry:
+		yield alert_date
+		alert_date += timedelta(days=repeat_interval)
+
+
+def _insert_entries(entries):
+	if not entries:
+		return 0
+
+	timestamp = now_datetime()
+	user = frappe.session.user if getattr(frappe, "session", None) else "Administrator"
+	values = [
+		(
+			make_calendar_key(alert_date, row.rowname, channel),
+			timestamp,
+			timestamp,
+			user,
+			user,
+			0,
+			alert_date,
+			channel,
+			row.rowname,
+			row.parenttype,
+			row.parent,
+			row.document_type,
+			row.document_number,
+			row.expiry_date,
+		)
+		for alert_date, row, channel in entries
+	]
+
+	frappe.db.bulk_insert(
+		CALENDAR_DOCTYPE,
+		fields=_INSERT_FIELDS,
+		values=values,
+		ignore_duplicates=True,
+		chunk_size=INSERT_CHUNK_SIZE,
+	)
+	return len(values)
+
+
+def _get_max_alert_days():
+	"""Widest alert window of any row: the Document Type Master defaults or a row's own days.
+
+	The defaults come from the small master table; the row maximum is kept as a global so
+	the daily roll does not scan Document Detail. A stale, larger value only widens the
+	rows the roll evaluates.
+	"""
+	default_days = frappe.db.sql("select max(alert_days) from `tabDocument Type Master`")[0][0]
+	return max(cint(default_days), _get_row_alert_days())
+
+
+def _get_row_alert_days():
+	value = frappe.db.get_global(ROW_ALERT_DAYS_KEY)
+	if value in (None, ""):
+		value = _query_row_alert_days()
+		frappe.db.set_global(ROW_ALERT_DAYS_KEY, value)
+	return cint(value)
+
+
+def _raise_row_alert_days(alert_days):
+	days = max((cint(value) for value in alert_days), default=0)
+	if days > _get_row_alert_days():
+		frappe.db.set_global(ROW_ALERT_DAYS_KEY, days)
+
+
+def _query_row_alert_days():
+	return cint(frappe.db.sql("select max(alert_days) from `tabDocument Detail`")[0][0])
+
+
+class _ChannelContext:
+	"""Resolves which channels the scheduler would use for each registration.
+
+	Admin contacts receive every due document, so a channel enabled in Document Alert
+	Settings with admin contacts applies to all registrations; otherwise the
+	registration's own opt-ins (and, for employees, their customer's) decide.
+	"""
+
+	def __init__(self):
+		settings = frappe.get_cached_doc("Document Alert Settings")
+		self.enabled = {"Email": cint(settings.enable_email), "SMS": cint(settings.enable_sms)}
+		self.admin = {
+			"Email": _has_contacts(settings.default_admin_email, settings.cc_emails),
+			"SMS": _has_contacts(settings.default_admin_mobile, settings.cc_mobiles),
+		}
+		self._customer_contacts = None
+
+	def get_channels(self, rows):
+		"""Return ``{(parenttype, parent): channels}`` for the active registrations of ``rows``."""
+		parents = {}
+		for row in rows:
+			parents.setdefault(row.parenttype, set()).add(row.parent)
+
+		channels = {}
+		for parenttype, names in parents.items():
+			email_flag, sms_flag = CHANNEL_FLAGS[parenttype]
+			customer_field = "customer_name" if parenttype == "Customer Employee Registration" else "customer"
+			registrations = frappe.get_all(
+				parenttype,
+				filters={"name": ("in", list(names)), "docstatus": ("<", 2), "active": 1},
+				fields=["name", customer_field, email_flag, sms_flag],
+			)
+			for registration in registrations:
+				allowed = {
+					"Email": cint(registration.get(email_flag)),
+					"SMS": cint(registration.get(sms_flag)),
+				}
+				if parenttype == "Customer Employee Registration":
+					contacts = self.customer_contacts.get(registration.get(customer_field)) or {}
+					allowed["Email"] = allowed["Email"] or contacts.get("allow_email")
+					allowed["SMS"] = allowed["SMS"] or contacts.get("allow_sms")
+
+				channels[(parenttype, registration.name)] = tuple(
+					channel
+					for channel in ("Email", "SMS")
+					if self.enabled[channel] and (self.admin[channel] or allowed[channel])
+				)
+
+		return channels
+
+	@property
+	def customer_contacts(self):
+		if self._customer_contacts is None:
+			self._customer_contacts = get_customer_alert_contacts()
+		return self._customer_contacts
+
+
+def _has_contacts(*parts):
+	return any(cstr(part).replace(",", "").strip() for part in parts)
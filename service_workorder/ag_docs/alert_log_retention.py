@@ -0,0 +1,144 @@
+"""Retention for the recipient rows of Document Alert Log.
+
+Every run writes one ``Document Alert Log Detail`` row per recipient, tens of
+thousands a day. Once a log is older than the retention period its rows are rolled
+into two fields on the log itself: a JSON summary of the counts (per channel and
+status, per reference doctype, distinct recipients and the most common errors) and a
+zlib-compressed archive of the rows, readable through ``get_archived_log_details``.
+The rows are then deleted, which keeps the detail table at a few weeks of history.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import zlib
+from collections import Counter
+
+import frappe
+from frappe.utils import add_days, cint, nowdate
+
+from service_workorder.ag_docs.doctype.document_alert_log_detail.document_alert_log_detail import (
+	DETAIL_FIELDS,
+)
+
+LOG_DOCTYPE = "Document Alert Log"
+DETAIL_DOCTYPE = "Document Alert Log Detail"
+
+DEFAULT_RETENTION_DAYS = 30
+
+# Logs compacted per run of the daily job; older backlogs are worked off over a few days
+LOGS_PER_RUN = 200
+
+# Distinct error messages kept in the summary
+SUMMARY_TOP_ERRORS = 20
+
+
+def compact_alert_log_details():
+	"""Scheduler job: archive the detail rows of logs older than the retention period."""
+	settings = frappe.get_cached_doc("Document Alert Settings")
+	retention_days = settings.get("log_detail_retention_days")
+	# unset on sites migrated before the field existed; the field defaults to 30
+	retention_days = DEFAULT_RETENTION_DAYS if retention_days is None else cint(retention_days)
+	if retention_days <= 0:
+		return
+
+	logs = frappe.get_all(
+		LOG_DOCTYPE,
+		filters={
+			"details_compacted": 0,
+			"log_time": ("<", add_days(nowdate(), -retention_days)),
+		},
+		pluck="name",
+		order_by="log_time asc",
+		limit=LOGS_PER_RUN,
+	)
+	for log_name in logs:
+		try:
+			compact_log_details(log_name)
+			frappe.db.commit()
+		except Exception:
+			frappe.db.rollback()
+			frappe.log_error(frappe.get_traceback(), "Document Alert Log Compaction Failure")
+
+
+def compact_log_details(log_name):
+	"""Replace the detail rows of one log with its summary and compressed archive."""
+	rows = frappe.db.sql(
+		f"""
+		select {", ".join(f"`{field}`" for field in DETAIL_FIELDS)}
+		from `tabDocument Alert Log Detail`
+		where parent = %s and parenttype = %s
+		order by idx
+		""",
+		(str(log_name), LOG_DOCTYPE),
+		as_list=True,
+	)
+
+	frappe.db.set_value(
+		LOG_DOCTYPE,
+		log_name,
+		{
+			"details_compacted": 1,
+			"detail_rows_archived": len(rows),
+			"detail_summary": frappe.as_json(summarise_details(rows)),
+			"detail_archive": compress_details(rows) if rows else None,
+		},
+		update_modified=False,
+	)
+	if rows:
+		frappe.db.delete(DETAIL_DOCTYPE, {"parent": str(log_name), "parenttype": LOG_DOCTYPE})
+	return len(rows)
+
+
+@frappe.whitelist()
+def get_archived_log_details(log_name):
+	"""Return the archived detail rows of a compacted log as dicts."""
+	frappe.has_permission(LOG_DOCTYPE, "read", log_name, throw=True)
+	archive = frappe.db.get_value(LOG_DOCTYPE, log_name, "detail_archive")
+	return [dict(zip(DETAIL_FIELDS, row, strict=True)) for row in decompress_details(archive)]
+
+
+def summarise_details(rows):
+	"""Aggregate counts of detail rows (lists ordered like ``DETAIL_FIELDS``)."""
+	channel_index = DETAIL_FIELDS.index("channel")
+	recipient_index = DETAIL_FIELDS.index("recipient")
+	status_index = DETAIL_FIELDS.index("status")
+	doctype_index = DETAIL_FIELDS.index("reference_doctype")
+	name_index = DETAIL_FIELDS.index("reference_name")
+	error_index = DETAIL_FIELDS.index("error_message")
+
+	by_channel = {}
+	by_doctype = Counter()
+	errors = Counter()
+	recipients = set()
+	references = set()
+	for row in rows:
+		statuses = by_channel.setdefault(row[channel_index] or "", {})
+		statuses[row[status_index] or ""] = statuses.get(row[status_index] or "", 0) + 1
+		by_doctype[row[doctype_index] or ""] += 1
+		recipients.add((row[channel_index], row[recipient_index]))
+		if row[name_index]:
+			references.add((row[doctype_index], row[name_index]))
+		if row[error_index]:
+			errors[row[error_index]] += 1
+
+	return {
+		"rows": len(rows),
+		"by_channel_status": by_channel,
+		"by_reference_doctype": dict(by_doctype),
+		"distinct_recipients": len(recipients),
+		"distinct_references": len(references),
+		"top_errors": errors.most_common(SUMMARY_TOP_ERRORS),
+	}
+
+
+def compress_details(rows):
+	payload = json.dumps([list(row) for row in rows], separators=(",", ":"), default=str)
+	return base64.b64encode(zlib.compress(payload.encode("utf-8"), 9)).decode("ascii")
+
+
+def decompress_details(archive):
+	if not archive:
+		return []
+	return json.loads(zlib.decompress(base64.b64decode(archive)).decode("utf-8"))
@@ -0,0 +1,480 @@
+"""Persistent send queue for expiry alerts: failed sends and the sending window.
+
+A failed email enqueue or SMS gateway call is stored as a ``Document Alert Retry`` row
+holding the rendered message and only the recipients that were not reached, so a
+retry never rebuilds bundles. A short-interval scheduler job drains due rows and
+backs off exponentially until ``MAX_RETRY_ATTEMPTS`` is reached.
+
+With a sending window configured in Document Alert Settings the daily run stores
+every rendered message in the same queue instead of sending it. The drain then only
+works while the window is open and releases each channel at its token-bucket rate
+(or, without a rate, evenly over the rest of the window), and it keeps the progress
+counters of the run's Document Alert Log up to date.
+"""
+
+from __future__ import annotations
+
+import time
+from datetime import datetime, timedelta
+from math import ceil
+
+import frappe
+from frappe.utils import cint, cstr, get_time, getdate, now_datetime
+
+from service_workorder.ag_docs.doctype.document_alert_send_ledger.document_alert_send_ledger import SendLedger
+from service_workorder.ag_docs.email_queue_batch import EmailQueueBatch
+from service_workorder.ag_docs.sms_dispatch import SMSDispatcher, SMSJob, log_sms_job
+
+RETRY_DOCTYPE = "Document Alert Retry"
+
+# First retry after five minutes, doubling up to six hours
+RETRY_BASE_DELAY = 5 * 60
+RETRY_MAX_DELAY = 6 * 60 * 60
+MAX_RETRY_ATTEMPTS = 5
+
+# Rows handled per drain; the rest wait for the next run of the job
+DRAIN_BATCH_SIZE = 200
+
+DRAIN_LOCK_KEY = "document_alert_retry_drain"
+DRAIN_LOCK_TTL = 15 * 60
+
+# Seconds between two runs of process_alert_retries (see scheduler_events in hooks.py)
+DRAIN_INTERVAL = 5 * 60
+
+# Rows per channel a drain releases at most while the sending window is open
+WINDOW_DRAIN_LIMIT = 5000
+
+BUCKET_CACHE_KEY = "document_alert_send_bucket"
+
+# Names updated per query when linking scheduled sends to their Document Alert Log
+LINK_CHUNK_SIZE = 1000
+
+
+def get_retry_delay(attempts):
+	"""Seconds to wait before the next try after ``attempts`` failed retries."""
+	return min(RETRY_BASE_DELAY * 2 ** max(cint(attempts), 0), RETRY_MAX_DELAY)
+
+
+def queue_alert_retries(entries, alert_date, next_attempt_at=None):
+	"""Store sends for the drain and return the new row names.
+
+	``entries`` hold channel, recipients, message, subject, reference and error. Failed
+	sends wait for the first retry delay; scheduled sends pass ``next_attempt_at``.
+	"""
+	timestamp = now_datetime()
+	user = frappe.session.user if getattr(frappe, "session", None) else "Administrator"
+	if next_attempt_at is None:
+		next_attempt_at = timestamp + timedelta(seconds=get_retry_delay(0))
+	alert_date = getdate(alert_date)
+
+	names = []
+	values = []
+	for entry in entries or []:
+		recipients = [cstr(recipient).strip() for recipient in entry.get("recipients") or []]
+		recipients = [recipient for recipient in recipients if recipient]
+		if not recipients or not entry.get("message"):
+			continue
+
+		reference = entry.get("reference") or {}
+		names.append(frappe.generate_hash(length=10))
+		values.append(
+			(
+				names[-1],
+				timestamp,
+				timestamp,
+				user,
+				user,
+				0,
+				"Pending",
+				entry["channel"],
+				alert_date,
+				0,
+				next_attempt_at,
+				reference.get("parenttype"),
+				reference.get("parent"),
+				cstr(reference.get("title"))[:140],
+				"\n".join(rowname for rowname in reference.get("rownames") or [] if rowname),
+				"\n".join(recipients),
+				cstr(entry.get("subject")),
+				entry["message"],
+				cstr(entry.get("error")),
+			)
+		)
+
+	if not values:
+		return []
+
+	frappe.db.bulk_insert(
+		RETRY_DOCTYPE,
+		fields=(
+			"name",
+			"creation",
+			"modified",
+			"owner",
+			"modified_by",
+			"docstatus",
+			"status",
+			"channel",
+			"alert_date",
+			"attempts",
+			"next_attempt_at",
+			"reference_doctype",
+			"reference_name",
+			"reference_title",
+			"document_details",
+			"recipients",
+			"subject",
+			"message",
+			"last_error",
+		),
+		values=values,
+	)
+	return names
+
+
+def process_alert_retries():
+	"""Scheduler job: send the due rows of both channels, within the sending window if any."""
+	cache = frappe.cache()
+	lock_key = cache.make_key(DRAIN_LOCK_KEY)
+	if not cache.set(lock_key, 1, nx=True, ex=DRAIN_LOCK_TTL):
+		return
+
+	try:
+		window = SendingWindow.from_settings(frappe.get_cached_doc("Document Alert Settings"))
+		now = now_datetime()
+		if window and not window.is_open(now):
+			return
+
+		ledgers = {}
+		alert_logs = set()
+		for channel, send in (("Email", _retry_emails), ("SMS", _retry_sms)):
+			if window:
+				rows = window.release(channel, now)
+			else:
+				rows = _get_due_rows(channel, now, DRAIN_BATCH_SIZE)
+			if rows:
+				send(rows, ledgers)
+				alert_logs.update(row.alert_log for row in rows if row.alert_log)
+
+		update_send_progress(alert_logs)
+	finally:
+		cache.delete(lock_key)
+
+
+def link_alert_log(alert_log, names):
+	"""Point scheduled sends at the Document Alert Log of their run and fill in its progress."""
+	names = list(names or [])
+	if not alert_log or not names:
+		return
+
+	for start in range(0, len(names), LINK_CHUNK_SIZE):
+		frappe.db.sql(
+			"""update `tabDocument Alert Retry` set alert_log = %s where name in %s""",
+			(alert_log, tuple(names[start : start + LINK_CHUNK_SIZE])),
+		)
+	update_send_progress([alert_log])
+
+
+def update_send_progress(alert_logs):
+	"""Recount the scheduled sends of each Document Alert Log by status."""
+	for alert_log in alert_logs or []:
+		counts = dict(
+			frappe.db.sql(
+				"""select status, count(*) from `tabDocument Alert Retry`
+				where alert_log = %s group by status""",
+				alert_log,
+			)
+		)
+		total = sum(counts.values())
+		done = counts.get("Sent", 0) + counts.get("Failed", 0)
+		frappe.db.set_value(
+			"Document Alert Log",
+			alert_log,
+			{
+				"scheduled_sent": counts.get("Sent", 0),
+				"scheduled_failed": counts.get("Failed", 0),
+				"scheduled_pending": counts.get("Pending", 0),
+				"send_progress": (100.0 * done / total) if total else 0,
+			},
+			update_modified=False,
+		)
+
+
+class SendingWindow:
+	"""Daily time range in which queued alerts are sent, with optional per-channel rates."""
+
+	def __init__(self, start=None, end=None, email_rate=0, sms_rate=0):
+		self.start = _to_time(start)
+		self.end = _to_time(end)
+		self.buckets = {
+			channel: TokenBucket(channel, rate)
+			for channel, rate in (("Email", cint(email_rate)), ("SMS", cint(sms_rate)))
+			if rate > 0
+		}
+
+	@classmethod
+	def from_settings(cls, settings):
+		"""Return the configured window, or ``None`` when alerts go out right away."""
+		if not cint(settings.get("enable_sending_window")):
+			return None
+		return cls(
+			settings.get("sending_window_start"),
+			settings.get("sending_window_end"),
+			settings.get("window_email_rate"),
+			settings.get("window_sms_rate"),
+		)
+
+	@property
+	def all_day(self):
+		return not self.start or not self.end or self.start == self.end
+
+	def is_open(self, now):
+		if self.all_day:
+			return True
+		current = now.time()
+		if self.start < self.end:
+			return self.start <= current < self.end
+		# the window runs past midnight, e.g. 22:00 - 06:00
+		return current >= self.start or current < self.end
+
+	def next_opening(self, now):
+		"""When sends stored at ``now`` may go out first."""
+		if self.is_open(now):
+			return now
+		opening = datetime.combine(now.date(), self.start)
+		if opening <= now:
+			opening += timedelta(days=1)
+		return opening
+
+	def seconds_left(self, now):
+		"""Seconds until the open window closes (``None`` for an all-day window)."""
+		if self.all_day:
+			return None
+		closing = datetime.combine(now.date(), self.end)
+		if closing <= now:
+			closing += timedelta(days=1)
+		return (closing - now).total_seconds()
+
+	def release(self, channel, now):
+		"""Return the due rows of ``channel`` that may be sent in this drain."""
+		bucket = self.buckets.get(channel)
+		if bucket:
+			tokens = bucket.available()
+			if tokens <= 0:
+				return []
+			rows = _take_recipients(_get_due_rows(channel, now, min(tokens, WINDOW_DRAIN_LIMIT)), tokens)
+			bucket.consume(sum(len(_split_recipients(row)) for row in rows))
+			return rows
+
+		seconds_left = self.seconds_left(now)
+		if seconds_left is None:
+			return _get_due_rows(channel, now, WINDOW_DRAIN_LIMIT)
+
+		# no rate configured: spread what is due evenly over the drains left in the window
+		pending = frappe.db.count(
+			RETRY_DOCTYPE, {"status": "Pending", "channel": channel, "next_attempt_at": ("<=", now)}
+		)
+		drains_left = max(ceil(seconds_left / DRAIN_INTERVAL), 1)
+		return _get_due_rows(channel, now, min(ceil(pending / drains_left), WINDOW_DRAIN_LIMIT))
+
+
+class TokenBucket:
+	"""Per-channel send budget in messages per minute, kept in the cache between drains.
+
+	The bucket holds at most one drain interval worth of tokens, so a drain that was
+	skipped does not turn into a burst later.
+	"""
+
+	def __init__(self, channel, rate_per_minute):
+		self.key = f"{BUCKET_CACHE_KEY}:{channel}"
+		self.rate = rate_per_minute / 60.0
+		self.capacity = rate_per_minute * DRAIN_INTERVAL / 60.0
+		self.tokens = 0.0
+		self.updated = 0.0
+
+	def available(self):
+		state = frappe.cache().get_value(self.key) or {}
+		self.updated = time.time()
+		tokens = state.get("tokens", self.capacity)
+		elapsed = max(self.updated - state.get("updated", self.updated), 0)
+		self.tokens = min(self.capacity, tokens + elapsed * self.rate)
+		return int(self.tokens)
+
+	def consume(self, count):
+		self.tokens = max(self.tokens - count, 0.0)
+		frappe.cache().set_value(self.key, {"tokens": self.tokens, "updated": self.updated})
+
+
+def _get_due_rows(channel, now, limit):
+	if limit <= 0:
+		return []
+
+	return frappe.get_all(
+		RETRY_DOCTYPE,
+		filters={"status": "Pending", "channel": channel, "next_attempt_at": ("<=", now)},
+		fields=[
+			"name",
+			"channel",
+			"alert_date",
+			"alert_log",
+			"attempts",
+			"reference_doctype",
+			"reference_name",
+			"reference_title",
+			"document_details",
+			"recipients",
+			"subject",
+			"message",
+		],
+		order_by="next_attempt_at asc",
+		limit=limit,
+	)
+
+
+def _to_time(value):
+	if not value:
+		return None
+	if isinstance(value, timedelta):
+		# Time columns come back from the database as timedelta
+		return (datetime.min + value).time()
+	return get_time(value)
+
+
+def _take_recipients(rows, tokens):
+	"""Keep leading rows until their recipients use up ``tokens`` (at least one row)."""
+	taken = []
+	used = 0
+	for row in rows:
+		count = len(_split_recipients(row))
+		if taken and used + count > tokens:
+			break
+		taken.append(row)
+		used += count
+	return taken
+
+
+def _retry_emails(rows, ledgers):
+	if not rows:
+		return
+
+	batch = EmailQueueBatch()
+	for row in rows:
+		recipients = _get_unsent_recipients(row, ledgers)
+		if not recipients:
+			_mark_sent(row)
+			continue
+		try:
+			batch.add(
+				recipients=recipients,
+				subject=row.subject,
+				message=row.message,
+				reference=row,
+				reference_doctype=row.reference_doctype,
+				reference_name=row.reference_name,
+			)
+		except Exception as exc:
+			_mark_failed(row, cstr(exc))
+
+	for email in batch.flush():
+		row = email.reference
+		if email.skipped:
+			# every recipient unsubscribed meanwhile, nothing is left to deliver
+			_mark_sent(row)
+		elif email.ok:
+			_get_ledger(row, ledgers).record(
+				_get_rownames(row), "Email", email.recipients, _get_reference(row)
+			)
+			_mark_sent(row)
+		else:
+			_mark_failed(row, email.error)
+
+
+def _retry_sms(rows, ledgers):
+	if not rows:
+		return
+
+	settings = frappe.get_cached_doc("Document Alert Settings")
+	dispatcher = SMSDispatcher.from_settings(settings)
+
+	jobs = []
+	for row in rows:
+		recipients = _get_unsent_recipients(row, ledgers)
+		if not recipients:
+			_mark_sent(row)
+		elif not dispatcher:
+			_mark_failed(row, "SMS Settings are incomplete.")
+		else:
+			jobs.append(SMSJob(recipients=recipients, message=row.message, reference=row))
+
+	if not jobs:
+		return
+
+	dispatcher.send(jobs)
+	for job in jobs:
+		row = job.reference
+		try:
+			log_sms_job(job)
+		except Exception:
+			frappe.log_error(frappe.get_traceback(), "Document Alert SMS Log Failure")
+
+		if job.sent:
+			_get_ledger(row, ledgers).record(_get_rownames(row), "SMS", job.sent, _get_reference(row))
+
+		if job.ok:
+			_mark_sent(row)
+		else:
+			remaining = [number for number in job.recipients if number not in job.sent]
+			_mark_failed(row, job.error_message or "SMS gateway did not accept any recipient.", remaining)
+
+	# the messages already left the gateway, so persist the outcome right away
+	frappe.db.commit()
+
+
+def _get_unsent_recipients(row, ledgers):
+	return _get_ledger(row, ledgers).filter_unsent(_get_rownames(row), row.channel, _split_recipients(row))
+
+
+def _split_recipients(row):
+	return [recipient for recipient in cstr(row.recipients).splitlines() if recipient.strip()]
+
+
+def _get_ledger(row, ledgers):
+	alert_date = getdate(row.alert_date)
+	if alert_date not in ledgers:
+		ledgers[alert_date] = SendLedger(alert_date)
+	return ledgers[alert_date]
+
+
+def _get_rownames(row):
+	return [rowname for rowname in cstr(row.document_details).splitlines() if rowname.strip()]
+
+
+def _get_reference(row):
+	return {"parenttype": row.reference_doctype, "parent": row.reference_name}
+
+
+def _mark_sent(row):
+	frappe.db.set_value(
+		RETRY_DOCTYPE,
+		row.name,
+		{"status": "Sent", "attempts": cint(row.attempts) + 1, "last_error": ""},
+	)
+
+
+def _mark_failed(row, error, remaining_recipients=None):
+	attempts = cint(row.attempts) + 1
+	values = {"attempts": attempts, "last_error": cstr(error)}
+	if remaining_recipients:
+		values["recipients"] = "\n".join(remaining_recipients)
+
+	if attempts >= MAX_RETRY_ATTEMPTS:
+		values["status"] = "Failed"
+		frappe.log_error(
+			f"{row.channel} alert for {row.reference_name or row.reference_title} gave up after "
+			f"{attempts} retries: {error}",
+			"Document Alert Retry Failure",
+		)
+	else:
+		values["next_attempt_at"] = now_datetime() + timedelta(seconds=get_retry_delay(attempts))
+
+	frappe.db.set_value(RETRY_DOCTYPE, row.name, values)
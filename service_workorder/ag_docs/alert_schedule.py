@@ -0,0 +1,201 @@
+"""Keeps ``Document Detail.next_alert_date`` in step with the expiry alert rules.
+
+The daily scheduler only reads rows whose ``next_alert_date`` is due, so every
+place that can move an alert (registration edits, Document Type Master defaults
+and the scheduler itself) recomputes the column through these helpers.
+"""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+import frappe
+from frappe.utils import cint, getdate, nowdate
+
+REFRESH_CHUNK_SIZE = 5000
+UPDATE_CHUNK_SIZE = 1000
+
+
+def resolve_alert_rules(
+	alert_days=None, repeat_interval=None, default_alert_days=None, default_repeat_interval=None
+):
+	"""Return ``(alert_days, repeat_interval)`` using the same fallbacks as the scheduler."""
+	days = cint(alert_days or default_alert_days or 0)
+	interval = cint(repeat_interval or default_repeat_interval or 1)
+	if interval <= 0:
+		interval = 1
+	return days, interval
+
+
+def get_next_alert_date(expiry_date, alert_days, repeat_interval, from_date=None):
+	"""Return the first alert date on or after ``from_date`` or ``None`` when no alert is left.
+
+	Alerts fire every ``repeat_interval`` days starting ``alert_days`` before expiry
+	and stop on the expiry date itself.
+	"""
+	if not expiry_date or cint(alert_days) <= 0:
+		return None
+
+	expiry = getdate(expiry_date)
+	from_date = getdate(from_date or nowdate())
+	if from_date > expiry:
+		return None
+
+	repeat_interval = max(cint(repeat_interval), 1)
+	window_start = expiry - timedelta(days=cint(alert_days))
+	if from_date <= window_start:
+		return window_start
+
+	offset = (from_date - window_start).days
+	steps = -(-offset // repeat_interval)
+	candidate = window_start + timedelta(days=steps * repeat_interval)
+	if candidate > expiry:
+		return None
+	return candidate
+
+
+def get_next_alert_date_for_row(row, from_date=None):
+	"""Compute the next alert date for a scheduler/query row (dict-like)."""
+	alert_days, repeat_interval = resolve_alert_rules(
+		row.get("alert_days"),
+		row.get("alert_repeat_interval"),
+		row.get("default_alert_days"),
+		row.get("default_repeat_interval"),
+	)
+	return get_next_alert_date(row.get("expiry_date"), alert_days, repeat_interval, from_date)
+
+
+def set_next_alert_dates(doc, table_field="document_details"):
+	"""Fill ``next_alert_date`` on every document row of a registration before save.
+
+	Rows of inactive registrations get none, so the scheduler never picks them up;
+	saving the registration as active again recomputes them.
+	"""
+	rows = doc.get(table_field) or []
+	if not rows:
+		return
+
+	if not cint(doc.get("active")) or cint(doc.get("docstatus")) == 2:
+		for row in rows:
+			row.next_alert_date = None
+		return
+
+	defaults = _get_document_type_defaults({row.document_type for row in rows if row.document_type})
+	today = getdate(nowdate())
+
+	for row in rows:
+		default = defaults.get(row.document_type) or {}
+		alert_days, repeat_interval = resolve_alert_rules(
+			row.alert_days,
+			row.alert_repeat_interval,
+			default.get("alert_days"),
+			default.get("repeat_interval"),
+		)
+		row.next_alert_date = get_next_alert_date(row.expiry_date, alert_days, repeat_interval, today)
+
+
+def refresh_next_alert_dates(document_type=None, from_date=None):
+	"""Recompute ``next_alert_date`` for stored rows, optionally limited to one document type.
+
+	Rows are walked in primary-key order so large tables are processed in bounded chunks.
+	Rows of inactive (or missing) registrations are cleared, as ``set_next_alert_dates`` does.
+	"""
+	from_date = getdate(from_date or nowdate())
+	# rows without an expiry date may still hold a date from before it was removed
+	conditions = ["(child.expiry_date is not null or child.next_alert_date is not null)"]
+	params = {"limit": REFRESH_CHUNK_SIZE, "last_name": ""}
+	if document_type:
+		conditions.append("child.document_type = %(document_type)s")
+		params["document_type"] = document_type
+
+	updated = 0
+	while True:
+		rows = frappe.db.sql(
+			"""
+			select
+				child.name,
+				child.expiry_date,
+				child.alert_days,
+				child.alert_repeat_interval,
+				child.next_alert_date,
+				dt.alert_days as default_alert_days,
+				dt.repeat_interval as default_repeat_interval,
+				coalesce(cdr.active, cer.active, 0) as parent_active,
+				coalesce(cdr.docstatus, cer.docstatus, 2) as parent_docstatus
+			from `tabDocument Detail` child
+			left join `tabDocument Type Master` dt
+				on dt.name = child.document_type
+			left join `tabCustomer Document Registration` cdr
+				on child.parenttype = 'Customer Document Registration' and cdr.name = child.parent
+			left join `tabCustomer Employee Registration` cer
+				on child.parenttype = 'Customer Employee Registration' and cer.name = child.parent
+			where {conditions}
+				and child.name > %(last_name)s
+			order by child.name
+			limit %(limit)s
+			""".format(conditions=" and ".join(conditions)),
+			params,
+			as_dict=True,
+		)
+		if not rows:
+			break
+
+		updates = {}
+		for row in rows:
+			next_date = None
+			if cint(row.parent_active) and cint(row.parent_docstatus) < 2:
+				next_date = get_next_alert_date_for_row(row, from_date)
+			if (getdate(row.next_alert_date) if row.next_alert_date else None) != next_date:
+				updates[row.name] = next_date
+
+		updated += apply_next_alert_dates(updates)
+		params["last_name"] = rows[-1].name
+
+	return updated
+
+
+def apply_next_alert_dates(updates):
+	"""Persist ``{rowname: next_alert_date}`` with one UPDATE per distinct date and chunk."""
+	if not updates:
+		return 0
+
+	by_date = {}
+	for rowname, next_date in updates.items():
+		by_date.setdefault(next_date, []).append(rowname)
+
+	for next_date, rownames in by_date.items():
+		for start in range(0, len(rownames), UPDATE_CHUNK_SIZE):
+			chunk = rownames[start : start + UPDATE_CHUNK_SIZE]
+			placeholders = ", ".join(["%s"] * len(chunk))
+			frappe.db.sql(
+				f"""
+				update `tabDocument Detail`
+				set next_alert_date = %s
+				where name in ({placeholders})
+				""",
+				(next_date, *chunk),
+			)
+
+	return len(updates)
+
+
+def enqueue_document_type_refresh(document_type):
+	"""Recompute alert dates for a Document Type Master in the background."""
+	frappe.enqueue(
+		"service_workorder.ag_docs.alert_schedule.refresh_next_alert_dates",
+		queue="long",
+		document_type=document_type,
+		enqueue_after_commit=True,
+	)
+
+
+def _get_document_type_defaults(document_types):
+	if not document_types:
+		return {}
+
+	rows = frappe.get_all(
+		"Document Type Master",
+		filters={"name": ("in", list(document_types))},
+		fields=["name", "alert_days", "repeat_interval"],
+	)
+	return {row.name: row for row in rows}
@@ -1,18 +1,125 @@
 import frappe
+from frappe.contacts.doctype.contact.contact import get_default_contact
+from frappe.utils import cint, cstr
 
+# Resolved contact info per customer; dropped by the Customer/Contact hooks below
+CONTACT_CACHE_KEY = "service_workorder:customer_contact_info"
+# Backstop for changes that bypass the hooks (e.g. direct db updates)
+CONTACT_CACHE_TTL = 6 * 60 * 60
+
+
+def get_customer_contact_info(customer):
+    """Cached email/mobile of a customer and its default contact (``{}`` when unknown).
+
+    Shared by the registration form, registration validation and the sync hooks.
+    """
+    if not customer:
+        return {}
+
+    key = _get_cache_key(customer)
+    info = frappe.cache().get_value(key)
+    if info is None:
+        info = _resolve_customer_contact_info(customer)
+        frappe.cache().set_value(key, info, expires_in_sec=CONTACT_CACHE_TTL)
+    return dict(info)
 
-def update_document_registration_contacts_from_customer(doc, _method=None):
-    contact_name = doc.customer_primary_contact
-    contact_details = _get_primary_contact(contact_name) if contact_name else {}
 
-    updates = _collect_contact_updates(
-        email=contact_details.get("email_id") or doc.email_id,
-        mobile=contact_details.get("mobile") or doc.mobile_no or doc.phone,
+def clear_customer_contact_cache(customers):
+    if isinstance(customers, str):
+        customers = [customers]
+    keys = [_get_cache_key(customer) for customer in customers or [] if customer]
+    if not keys:
+        return
+
+    frappe.cache().delete_value(keys)
+    # a request reading before this transaction commits would cache the old values again
+    frappe.db.after_commit.add(lambda: frappe.cache().delete_value(keys))
+
+
+def get_registration_contact(info):
+    """Email and mobile a Customer Document Registration takes from ``info``."""
+    return (
+        info.get("contact_email") or info.get("customer_email"),
+        info.get("contact_mobile") or info.get("mobile"),
     )
+
+
+def get_customer_alert_contacts():
+    """Map customer -> contacts of the registrations that opted into employee alerts.
+
+    Resolved once per run so the employee query returns exactly one row per document.
+    """
+    rows = frappe.db.sql(
+        """
+        select
+            customer,
+            customer_email,
+            extra_email,
+            customer_mobile,
+            extra_mobile,
+            enable_email_alert,
+            employee_email_alert,
+            enable_sms_alert,
+            employee_sms_alert
+        from `tabCustomer Document Registration`
+        where ifnull(customer, '') != ''
+            and (
+                (ifnull(enable_email_alert, 0) = 1 and ifnull(employee_email_alert, 0) = 1)
+                or (ifnull(enable_sms_alert, 0) = 1 and ifnull(employee_sms_alert, 0) = 1)
+            )
+        """,
+        as_dict=True,
+    )
+
+    contacts = {}
+    for row in rows:
+        entry = contacts.setdefault(
+            row.customer,
+            {"allow_email": False, "allow_sms": False, "emails": set(), "mobiles": set()},
+        )
+        if cint(row.enable_email_alert) and cint(row.employee_email_alert):
+            entry["allow_email"] = True
+            entry["emails"].update(_collect_row_values(row, ("customer_email", "extra_email")))
+        if cint(row.enable_sms_alert) and cint(row.employee_sms_alert):
+            entry["allow_sms"] = True
+            entry["mobiles"].update(_collect_row_values(row, ("customer_mobile", "extra_mobile")))
+
+    return contacts
+
+
+def update_document_registration_contacts_from_customer(doc, _method=None):
+    clear_customer_contact_cache(doc.name)
+    _update_related_registrations(doc.name)
+
+
+def update_document_registration_contacts_from_contact(doc, _method=None):
+    customers = _get_linked_customers(doc)
+    # a link removed by this save still pointed at the contact in the cached info
+    customers.update(_get_linked_customers(doc.get_doc_before_save()))
+    if not customers:
+        return
+
+    clear_customer_contact_cache(customers)
+    if not (doc.is_primary_contact or doc.is_billing_contact):
+        return
+
+    for customer in customers:
+        _update_related_registrations(customer)
+
+
+def clear_contact_cache_for_doc(doc, _method=None):
+    """Drop the cached info of a deleted customer or of the customers of a deleted contact."""
+    customers = {doc.name} if doc.doctype == "Customer" else _get_linked_customers(doc)
+    clear_customer_contact_cache(customers)
+
+
+def _update_related_registrations(customer):
+    email, mobile = get_registration_contact(get_customer_contact_info(customer))
+    updates = _collect_contact_updates(email=email, mobile=mobile)
     if not updates:
         return
 
-    registrants = _get_related_registrations(doc.name)
+    registrants = _get_related_registrations(customer)
     if not registrants:
         return
 
@@ -24,36 +131,64 @@ def update_document_registration_contacts_from_customer(doc, _method=None):
     )
 
 
-def update_document_registration_contacts_from_contact(doc, _method=None):
-    if not (doc.is_primary_contact or doc.is_billing_contact):
-        return
+def _resolve_customer_contact_info(customer):
+    fields = ["customer_name", "email_id"]
+    for column in ("mobile_no", "phone", "customer_primary_contact"):
+        if frappe.db.has_column("Customer", column):
+            fields.append(column)
 
-    customers = {
-        link.link_name
-        for link in getattr(doc, "links", [])
-        if link.link_doctype == "Customer" and link.link_name
-    }
-    if not customers:
-        return
+    info = frappe.db.get_value("Customer", customer, fields, as_dict=True)
+    if not info:
+        return {}
 
-    updates = _collect_contact_updates(
-        email=doc.email_id,
-        mobile=doc.mobile_no or doc.phone,
-    )
-    if not updates:
-        return
+    result = {
+        "customer": customer,
+        "customer_name": info.get("customer_name"),
+        "customer_email": info.get("email_id"),
+    }
 
-    registrants = []
-    for customer in customers:
-        registrants.extend(_get_related_registrations(customer))
+    for column in ("mobile_no", "phone"):
+        if info.get(column):
+            result["mobile"] = info.get(column)
+            break
 
-    if registrants:
-        frappe.db.multiple_update(
-            "Customer Document Registration",
-            registrants,
-            updates,
-            update_modified=False,
+    # the contact picked on the customer wins over the one Frappe considers the default
+    contact_name = info.get("customer_primary_contact") or get_default_contact("Customer", customer)
+    if contact_name:
+        contact = frappe.db.get_value(
+            "Contact",
+            contact_name,
+            ["name", "email_id", "mobile_no", "phone"],
+            as_dict=True,
         )
+        if contact:
+            result["primary_contact"] = contact_name
+            result["contact_email"] = contact.get("email_id")
+            contact_mobile = contact.get("mobile_no") or contact.get("phone")
+            if contact_mobile:
+                result["contact_mobile"] = contact_mobile
+                if not result.get("mobile"):
+                    result["mobile"] = contact_mobile
+
+            if not result.get("customer_email") and contact.get("email_id"):
+                result["customer_email"] = contact.get("email_id")
+
+    return result
+
+
+def _get_cache_key(customer):
+    return f"{CONTACT_CACHE_KEY}:{customer}"
+
+
+def _get_linked_customers(doc):
+    if not doc:
+        return set()
+
+    return {
+        link.link_name
+        for link in getattr(doc, "links", [])
+        if link.link_doctype == "Customer" and link.link_name
+    }
 
 
 def _collect_contact_updates(email=None, mobile=None):
@@ -65,26 +200,6 @@ def _collect_contact_updates(email=None, mobile=None):
     return updates
 
 
-def _get_primary_contact(contact_name):
-    if not contact_name:
-        return {}
-
-    try:
-        contact = frappe.db.get_value(
-            "Contact",
-            contact_name,
-            ["email_id", "mobile_no", "phone"],
-            as_dict=True,
-        ) or {}
-    except Exception:
-        return {}
-
-    return {
-        "email_id": contact.get("email_id"),
-        "mobile": contact.get("mobile_no") or contact.get("phone"),
-    }
-
-
 def _get_related_registrations(customer):
     try:
         rows = frappe.get_all(
@@ -95,3 +210,8 @@ def _get_related_registrations(customer):
     except Exception:
         rows = []
     return rows
+
+
+def _collect_row_values(row, fields):
+    values = [cstr(row.get(field)).strip() for field in fields if row.get(field)]
+    return [value for value in values if value]
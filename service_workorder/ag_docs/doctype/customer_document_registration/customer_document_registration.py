@@ -6,12 +6,48 @@ from frappe import _
 from frappe.model.document import Document
 from frappe.utils import get_link_to_form
 
+from service_workorder.ag_docs.alert_calendar import (
+	delete_calendar_rows,
+	enqueue_employee_calendar_refresh,
+	refresh_registration_calendar,
+)
+from service_workorder.ag_docs.alert_schedule import set_next_alert_dates
+from service_workorder.ag_docs.customer_contact_sync import (
+	get_customer_contact_info,
+	get_registration_contact,
+)
+from service_workorder.ag_docs.document_numbers import (
+	find_document_number_rows,
+	get_document_number_key,
+	set_document_number_keys,
+)
+
+# Opt-ins that decide whether employees of the customer get alerts as well
+EMPLOYEE_ALERT_FIELDS = (
+	"customer",
+	"enable_email_alert",
+	"employee_email_alert",
+	"enable_sms_alert",
+	"employee_sms_alert",
+	"active",
+)
+
 
 class CustomerDocumentRegistration(Document):
 	def validate(self):
 		self.ensure_unique_registration()
+		set_document_number_keys(self)
 		self.ensure_unique_document_numbers()
 		self.sync_customer_contacts()
+		set_next_alert_dates(self)
+
+	def on_update(self):
+		refresh_registration_calendar(self)
+		if self.customer and any(self.has_value_changed(field) for field in EMPLOYEE_ALERT_FIELDS):
+			enqueue_employee_calendar_refresh(self.customer)
+
+	def on_trash(self):
+		delete_calendar_rows(reference_doctype=self.doctype, reference_name=self.name)
 
 	def ensure_unique_registration(self):
 		if not self.customer:
@@ -45,7 +81,7 @@ class CustomerDocumentRegistration(Document):
 			if not number:
 				continue
 
-			key = number.lower()
+			key = get_document_number_key(number)
 			if key in seen:
 				frappe.throw(
 					_("Document number {0} is duplicated within this registration.").format(
@@ -62,30 +98,14 @@ class CustomerDocumentRegistration(Document):
 		if not seen:
 			return
 
-		lookup_numbers = [data["number"] for data in seen.values()]
-		lower_map = {number.lower(): number for number in lookup_numbers}
-
-		placeholders = ", ".join(["%s"] * len(lower_map))
-		existing = frappe.db.sql(
-			f"""
-			select
-				name,
-				parent,
-				parenttype,
-				document_number
-			from `tabDocument Detail`
-			where lower(document_number) in ({placeholders})
-			""",
-			tuple(lower_map.keys()),
-			as_dict=True,
-		)
+		existing = find_document_number_rows(list(seen))
 
 		if not existing:
 			return
 
 		for row in existing:
 			number = (row.get("document_number") or "").strip()
-			key = number.lower()
+			key = row.document_number_key
 
 			# Skip current document rows
 			if (
@@ -109,14 +129,7 @@ class CustomerDocumentRegistration(Document):
 		if not self.customer:
 			return
 
-		try:
-			from service_workorder.api import get_customer_contact_info
-		except Exception:
-			return
-
-		info = get_customer_contact_info(self.customer) or {}
-		email = info.get("contact_email") or info.get("customer_email")
-		mobile = info.get("contact_mobile") or info.get("mobile")
+		email, mobile = get_registration_contact(get_customer_contact_info(self.customer))
 
 		if email and email != self.customer_email:
 			self.customer_email = email
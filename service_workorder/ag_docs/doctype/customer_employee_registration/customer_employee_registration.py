@@ -5,11 +5,23 @@ import frappe
 from frappe import _
 from frappe.model.document import Document
 
+from service_workorder.ag_docs.alert_calendar import delete_calendar_rows, refresh_registration_calendar
+from service_workorder.ag_docs.alert_schedule import set_next_alert_dates
+from service_workorder.ag_docs.document_numbers import set_document_number_keys
+
 
 class CustomerEmployeeRegistration(Document):
 	def validate(self):
 		self.ensure_uid_requirement()
 		self.ensure_unique_identity_values()
+		set_document_number_keys(self)
+		set_next_alert_dates(self)
+
+	def on_update(self):
+		refresh_registration_calendar(self)
+
+	def on_trash(self):
+		delete_calendar_rows(reference_doctype=self.doctype, reference_name=self.name)
 
 	def ensure_uid_requirement(self):
 		new_employee = frappe.utils.cint(self.get("new_employee"))
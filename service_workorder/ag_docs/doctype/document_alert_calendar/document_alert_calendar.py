@@ -0,0 +1,16 @@
+# Copyright (c) 2026, Mohamed Sharafudheen and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class DocumentAlertCalendar(Document):
+	"""A scheduled expiry alert; rows are maintained by ``service_workorder.ag_docs.alert_calendar``."""
+
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Document Alert Calendar", ["alert_date", "channel"])
+	frappe.db.add_index("Document Alert Calendar", ["reference_doctype", "reference_name"])
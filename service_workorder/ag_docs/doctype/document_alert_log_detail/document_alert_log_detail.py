@@ -1,5 +1,73 @@
+
+import frappe
 from frappe.model.document import Document
+from frappe.utils import now_datetime
+
+# Rows written per multi-row INSERT
+BULK_INSERT_BATCH_SIZE = 1000
+
+DETAIL_FIELDS = (
+    "channel",
+    "recipient",
+    "status",
+    "reference_doctype",
+    "reference_name",
+    "reference_title",
+    "error_message",
+)
 
 
 class DocumentAlertLogDetail(Document):
     pass
+
+
+def bulk_insert_log_details(parent, details, parentfield="log_entries", start_idx=1):
+    """Attach ``details`` to an existing Document Alert Log with batched multi-row INSERTs.
+
+    Skips per-row document validation; values are expected to come from the scheduler.
+    Returns the number of rows written.
+    """
+    if not details:
+        return 0
+
+    timestamp = now_datetime()
+    user = frappe.session.user if getattr(frappe, "session", None) else "Administrator"
+    columns = (
+        "name",
+        "creation",
+        "modified",
+        "owner",
+        "modified_by",
+        "docstatus",
+        "idx",
+        "parent",
+        "parenttype",
+        "parentfield",
+        *DETAIL_FIELDS,
+    )
+
+    values = []
+    for idx, detail in enumerate(details, start=start_idx):
+        values.append(
+            (
+                frappe.generate_hash(length=10),
+                timestamp,
+                timestamp,
+                user,
+                user,
+                0,
+                idx,
+                parent,
+                "Document Alert Log",
+                parentfield,
+                *(detail.get(field) for field in DETAIL_FIELDS),
+            )
+        )
+
+    frappe.db.bulk_insert(
+        "Document Alert Log Detail",
+        fields=columns,
+        values=values,
+        chunk_size=BULK_INSERT_BATCH_SIZE,
+    )
+    return len(values)
@@ -0,0 +1,24 @@
+# Copyright (c) 2026, Mohamed Sharafudheen and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.query_builder import Interval
+from frappe.query_builder.functions import Now
+
+
+class DocumentAlertRetry(Document):
+	"""A queued alert send (failed, or held for the sending window); drained by ``service_workorder.ag_docs.alert_retry``."""
+
+	@staticmethod
+	def clear_old_logs(days=30):
+		# pending retries are kept until they are sent or given up on
+		table = frappe.qb.DocType("Document Alert Retry")
+		frappe.db.delete(
+			table,
+			filters=(table.modified < (Now() - Interval(days=days))) & (table.status != "Pending"),
+		)
+
+
+def on_doctype_update():
+	frappe.db.add_index("Document Alert Retry", ["status", "next_attempt_at"])
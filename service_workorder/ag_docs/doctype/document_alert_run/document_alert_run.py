@@ -0,0 +1,390 @@
+# Copyright (c) 2026, Mohamed Sharafudheen and contributors
+# For license information, please see license.txt
+
+import json
+import time
+
+import frappe
+from frappe.model.document import Document
+from frappe.query_builder import Interval
+from frappe.query_builder.functions import Now
+from frappe.utils import cint, getdate, now_datetime
+
+from service_workorder.ag_docs.doctype.document_alert_log_detail.document_alert_log_detail import (
+	bulk_insert_log_details,
+)
+
+RUN_DOCTYPE = "Document Alert Run"
+DIGEST_DOCTYPE = "Document Alert Run Digest"
+
+# Site-wide lock holding "<run_id>:<token>" of the workers sending alerts
+RUN_LOCK_KEY = "document_alert_run_lock"
+# A lock that is not refreshed for this long belongs to a dead worker and is free again
+RUN_LOCK_TTL = 10 * 60
+# Seconds between two heartbeats (lock and checkpoint_at) of a live run
+HEARTBEAT_INTERVAL = 60
+
+_REFRESH_IF_OWNER = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+	return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_SWAP_IF_OWNER = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+	redis.call('set', KEYS[1], ARGV[2], 'EX', ARGV[3])
+	return 1
+end
+return 0
+"""
+_DELETE_IF_OWNER = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+	return redis.call('del', KEYS[1])
+end
+return 0
+"""
+_DELETE_IF_RUN = """
+local holder = redis.call('get', KEYS[1])
+if holder and string.sub(holder, 1, string.len(ARGV[1])) == ARGV[1] then
+	return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# Registration cursor field per parent doctype
+CURSOR_FIELDS = {
+	"Customer Document Registration": "customer_cursor",
+	"Customer Employee Registration": "employee_cursor",
+}
+
+
+class DocumentAlertRun(Document):
+	"""Checkpoint of an expiry alert run; see ``AlertRunCheckpoint``."""
+
+	@staticmethod
+	def clear_old_logs(days=30):
+		# running checkpoints are kept until they are resumed or given up on
+		table = frappe.qb.DocType(RUN_DOCTYPE)
+		frappe.db.delete(
+			table,
+			filters=(table.modified < (Now() - Interval(days=days))) & (table.status != "Running"),
+		)
+		frappe.db.sql(
+			"""
+			delete from `tabDocument Alert Run Digest`
+			where parent not in (select name from `tabDocument Alert Run`)
+			"""
+		)
+
+
+class AlertRunCheckpoint:
+	"""Saved progress of one alert run or shard.
+
+	The run saves its registration cursors and log counters at chunk boundaries,
+	after every buffered send has gone out. Admin digest entries are appended as one
+	``Document Alert Run Digest`` row per checkpoint holding only the entries added
+	since the previous one. Log detail rows are written right away under the run's
+	name and moved to the Document Alert Log once it exists, so the saved state stays
+	small. Between saves ``touch`` keeps the
+	run's ``AlertRunLock`` and ``checkpoint_at`` fresh, so a live run is never taken
+	for a dead one.
+	"""
+
+	def __init__(self, doc, lock=None):
+		self.doc = doc
+		self.lock = lock
+		self._touched_at = time.monotonic()
+		self.state = json.loads(doc.state) if isinstance(doc.state, str) and doc.state else doc.state or {}
+		self.cursor = {
+			parenttype: doc.get(fieldname) or "" for parenttype, fieldname in CURSOR_FIELDS.items()
+		}
+		self.details_written = frappe.db.count("Document Alert Log Detail", {"parent": doc.name})
+		self.digest_saved = len(self.digest_entries)
+		self.digest_chunks = len(doc.get("digest_chunks") or [])
+
+	@property
+	def name(self):
+		return self.doc.name
+
+	@property
+	def alert_date(self):
+		return getdate(self.doc.alert_date)
+
+	@property
+	def digest_entries(self):
+		# "digest" in the state is where checkpoints written before the digest rows kept it
+		entries = list(self.state.get("digest") or [])
+		for row in sorted(self.doc.get("digest_chunks") or [], key=lambda row: row.idx):
+			entries.extend(json.loads(row.entries or "[]"))
+		return entries
+
+	@property
+	def context(self):
+		return self.state.get("context") or {}
+
+	@classmethod
+	def start(cls, run_id, alert_date, shard_index=0, shard_count=0):
+		doc = frappe.get_doc(
+			{
+				"doctype": RUN_DOCTYPE,
+				"status": "Running",
+				"run_id": run_id,
+				"alert_date": getdate(alert_date),
+				"shard_index": cint(shard_index),
+				"shard_count": cint(shard_count),
+				"checkpoint_at": now_datetime(),
+			}
+		)
+		doc.insert(ignore_permissions=True, set_name=get_run_name(run_id, shard_index, shard_count))
+		frappe.db.commit()
+		return cls(doc)
+
+	@classmethod
+	def load(cls, name):
+		"""Return the saved checkpoint ``name`` or ``None``."""
+		if not frappe.db.exists(RUN_DOCTYPE, name):
+			return None
+		return cls(frappe.get_doc(RUN_DOCTYPE, name))
+
+	@classmethod
+	def load_or_start(cls, run_id, alert_date, shard_index=0, shard_count=0):
+		return cls.load(get_run_name(run_id, shard_index, shard_count)) or cls.start(
+			run_id, alert_date, shard_index, shard_count
+		)
+
+	@property
+	def is_running(self):
+		return self.doc.status == "Running"
+
+	def start_after(self, parenttype):
+		return self.cursor.get(parenttype) or ""
+
+	def save(self, context, details, digest_entries, cursor, bundles_processed):
+		"""Persist the progress of everything handled so far and commit it."""
+		self.details_written += bulk_insert_log_details(
+			self.name, details, start_idx=self.details_written + 1
+		)
+		self._append_digest(digest_entries[self.digest_saved :])
+		self.digest_saved = len(digest_entries)
+		self.cursor.update(cursor)
+		self.state = {**self.state, "context": context}
+
+		values = {
+			"checkpoint_at": now_datetime(),
+			"bundles_processed": cint(bundles_processed),
+			"state": frappe.as_json(self.state, indent=None),
+		}
+		for parenttype, fieldname in CURSOR_FIELDS.items():
+			values[fieldname] = self.cursor.get(parenttype) or ""
+
+		frappe.db.set_value(RUN_DOCTYPE, self.name, values, update_modified=False)
+		frappe.db.commit()
+		self._touched_at = time.monotonic()
+		self._heartbeat()
+
+	def touch(self):
+		"""Refresh the lock and ``checkpoint_at`` between send batches, at most every ``HEARTBEAT_INTERVAL``.
+
+		Commits, so call it only where everything sent so far may be committed.
+		"""
+		if time.monotonic() - self._touched_at < HEARTBEAT_INTERVAL:
+			return
+
+		self._touched_at = time.monotonic()
+		self._heartbeat()
+		frappe.db.set_value(RUN_DOCTYPE, self.name, "checkpoint_at", now_datetime(), update_modified=False)
+		frappe.db.commit()
+
+	def _heartbeat(self):
+		if self.lock and not self.lock.heartbeat():
+			# progress up to here is saved; the worker holding the lock now carries on
+			raise AlertRunLockLost(f"Run {self.doc.run_id} lost the alert run lock to {self.lock.holder()}.")
+
+	def mark_resumed(self):
+		self.doc.resume_count = cint(self.doc.resume_count) + 1
+		frappe.db.set_value(
+			RUN_DOCTYPE,
+			self.name,
+			{"resume_count": self.doc.resume_count, "checkpoint_at": now_datetime()},
+			update_modified=False,
+		)
+		frappe.db.commit()
+
+	def finish(self, status="Completed"):
+		"""Close the run; the saved state is only needed while it can be resumed."""
+		self.doc.status = status
+		frappe.db.set_value(RUN_DOCTYPE, self.name, {"status": status, "state": None})
+		frappe.db.delete(DIGEST_DOCTYPE, {"parent": self.name, "parenttype": RUN_DOCTYPE})
+
+	def _append_digest(self, entries):
+		if not entries:
+			return
+
+		self.digest_chunks += 1
+		timestamp = now_datetime()
+		frappe.db.bulk_insert(
+			DIGEST_DOCTYPE,
+			fields=(
+				"name",
+				"creation",
+				"modified",
+				"owner",
+				"modified_by",
+				"docstatus",
+				"idx",
+				"parent",
+				"parenttype",
+				"parentfield",
+				"entries",
+			),
+			values=[
+				(
+					frappe.generate_hash(length=10),
+					timestamp,
+					timestamp,
+					"Administrator",
+					"Administrator",
+					0,
+					self.digest_chunks,
+					self.name,
+					RUN_DOCTYPE,
+					"digest_chunks",
+					frappe.as_json(entries, indent=None),
+				)
+			],
+		)
+
+
+class AlertRunLockLost(Exception):
+	pass
+
+
+class AlertRunLock:
+	"""Single-flight guard: at most one alert run per site at a time.
+
+	The cache key holds ``<run_id>:<token>``, the token being unique to the worker that
+	took the lock. Shards of one run share the token they were enqueued with. Live
+	workers refresh the lock every ``HEARTBEAT_INTERVAL``; a dead worker's lock expires
+	after ``RUN_LOCK_TTL``, and a lock left behind by a run that has ended is taken
+	over with a compare-and-swap. A live worker's lock is never taken over.
+	"""
+
+	def __init__(self, run_id, token=None):
+		self.run_id = run_id
+		self.token = token or frappe.generate_hash(length=10)
+		self.cache = frappe.cache()
+		self.key = self.cache.make_key(RUN_LOCK_KEY)
+
+	@property
+	def value(self):
+		return f"{self.run_id}:{self.token}"
+
+	def holder(self):
+		"""``<run_id>:<token>`` of the current holder, or ``None``."""
+		value = self.cache.get(self.key)
+		return value.decode() if isinstance(value, bytes) else value
+
+	def acquire(self, join_run=False):
+		"""Take the lock; returns whether this worker holds it.
+
+		With ``join_run`` (resumed shards) a lock held by another worker of the same run
+		is shared instead, as parallel shards do.
+		"""
+		if self.cache.set(self.key, self.value, nx=True, ex=RUN_LOCK_TTL):
+			return True
+
+		holder = self.holder()
+		if not holder:
+			# expired in between
+			return bool(self.cache.set(self.key, self.value, nx=True, ex=RUN_LOCK_TTL))
+
+		holder_run_id, _, holder_token = holder.partition(":")
+		if join_run and holder_run_id == self.run_id:
+			self.token = holder_token
+			return self.heartbeat()
+		if has_run_ended(holder_run_id):
+			return bool(self.cache.eval(_SWAP_IF_OWNER, 1, self.key, holder, self.value, RUN_LOCK_TTL))
+		return False
+
+	def heartbeat(self):
+		"""Extend the lock; takes it again if it expired. False when another worker holds it."""
+		if self.cache.eval(_REFRESH_IF_OWNER, 1, self.key, self.value, RUN_LOCK_TTL):
+			return True
+		return bool(self.cache.set(self.key, self.value, nx=True, ex=RUN_LOCK_TTL))
+
+	def release(self):
+		self.cache.eval(_DELETE_IF_OWNER, 1, self.key, self.value)
+
+	@classmethod
+	def release_run(cls, run_id):
+		"""Release the lock if any worker of ``run_id`` holds it (the run has finished)."""
+		cache = frappe.cache()
+		cache.eval(_DELETE_IF_RUN, 1, cache.make_key(RUN_LOCK_KEY), f"{run_id}:")
+
+	@classmethod
+	def held_by_run(cls, run_id):
+		holder = cls(run_id).holder()
+		return bool(holder) and holder.partition(":")[0] == run_id
+
+
+def has_run_ended(run_id):
+	"""Whether every checkpoint of ``run_id`` exists and is no longer running."""
+	runs = frappe.get_all(
+		RUN_DOCTYPE,
+		filters={"run_id": run_id},
+		fields=["status", "shard_count"],
+	)
+	# not started yet, or shards still waiting in the queue
+	if not runs or len(runs) < cint(runs[0].shard_count):
+		return False
+
+	return not any(run.status == "Running" for run in runs)
+
+
+def get_run_name(run_id, shard_index=0, shard_count=0):
+	return f"{run_id}-{cint(shard_index)}" if cint(shard_count) > 1 else run_id
+
+
+def attach_run_details(alert_log, run_names):
+	"""Move detail rows written at checkpoints to ``alert_log``; returns how many moved.
+
+	Every run numbers its rows from 1, so the rows are renumbered run after run (in the
+	order of ``run_names``) to give the log one ``idx`` sequence.
+	"""
+	run_names = [name for name in run_names or [] if name]
+	if not alert_log or not run_names:
+		return 0
+
+	counts = {
+		row.parent: row
+		for row in frappe.db.sql(
+			"""
+			select parent, count(*) as row_count, min(idx) as first_idx
+			from `tabDocument Alert Log Detail`
+			where parent in %s
+			group by parent
+			""",
+			(tuple(run_names),),
+			as_dict=True,
+		)
+	}
+
+	moved = 0
+	for run_name in run_names:
+		if run_name not in counts:
+			continue
+		frappe.db.sql(
+			"""
+			update `tabDocument Alert Log Detail`
+			set parent = %s, idx = idx - %s + %s
+			where parent = %s
+			""",
+			(alert_log, counts[run_name].first_idx, moved + 1, run_name),
+		)
+		moved += counts[run_name].row_count
+
+	frappe.db.sql(
+		"""update `tabDocument Alert Run` set alert_log = %s where name in %s""",
+		(alert_log, tuple(run_names)),
+	)
+	return moved
@@ -0,0 +1,10 @@
+# Copyright (c) 2026, Mohamed Sharafudheen and contributors
+# For license information, please see license.txt
+
+from frappe.model.document import Document
+
+
+class DocumentAlertRunDigest(Document):
+	"""Admin digest entries added to a Document Alert Run between two checkpoints."""
+
+	pass
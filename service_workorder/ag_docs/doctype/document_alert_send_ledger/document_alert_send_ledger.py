@@ -0,0 +1,126 @@
+# Copyright (c) 2026, Mohamed Sharafudheen and contributors
+# For license information, please see license.txt
+
+import hashlib
+
+import frappe
+from frappe.model.document import Document
+from frappe.query_builder import Interval
+from frappe.query_builder.functions import Now
+from frappe.utils import cstr, getdate, now_datetime
+
+
+class DocumentAlertSendLedger(Document):
+	"""Marks a document row as already alerted on a channel, to a recipient, for a date."""
+
+	@staticmethod
+	def clear_old_logs(days=30):
+		table = frappe.qb.DocType("Document Alert Send Ledger")
+		frappe.db.delete(table, filters=(table.creation < (Now() - Interval(days=days))))
+
+
+class SendLedger:
+	"""In-memory view of one alert date's ledger, loaded with a single query."""
+
+	def __init__(self, alert_date):
+		self.alert_date = getdate(alert_date)
+		self.sent_keys = set(
+			frappe.get_all(
+				"Document Alert Send Ledger",
+				filters={"alert_date": self.alert_date},
+				pluck="name",
+			)
+		)
+
+	def filter_unsent(self, rownames, channel, recipients):
+		"""Drop recipients who already received every one of ``rownames`` on ``channel`` today."""
+		rownames = [rowname for rowname in rownames or [] if rowname]
+		if not rownames or not self.sent_keys:
+			return list(recipients or [])
+
+		return [
+			recipient
+			for recipient in recipients or []
+			if any(self.key(rowname, channel, recipient) not in self.sent_keys for rowname in rownames)
+		]
+
+	def record(self, rownames, channel, recipients, reference=None):
+		"""Insert ledger rows for a successful send (existing keys are ignored)."""
+		reference = reference or {}
+		timestamp = now_datetime()
+		user = frappe.session.user if getattr(frappe, "session", None) else "Administrator"
+
+		values = []
+		for rowname in rownames or []:
+			if not rowname:
+				continue
+			for recipient in recipients or []:
+				key = self.key(rowname, channel, recipient)
+				if key in self.sent_keys:
+					continue
+				self.sent_keys.add(key)
+				values.append(
+					(
+						key,
+						timestamp,
+						timestamp,
+						user,
+						user,
+						0,
+						self.alert_date,
+						channel,
+						normalize_recipient(channel, recipient),
+						rowname,
+						reference.get("parenttype"),
+						reference.get("parent"),
+					)
+				)
+
+		if not values:
+			return 0
+
+		frappe.db.bulk_insert(
+			"Document Alert Send Ledger",
+			fields=(
+				"name",
+				"creation",
+				"modified",
+				"owner",
+				"modified_by",
+				"docstatus",
+				"alert_date",
+				"channel",
+				"recipient",
+				"document_detail",
+				"reference_doctype",
+				"reference_name",
+			),
+			values=values,
+			ignore_duplicates=True,
+		)
+		return len(values)
+
+	def key(self, rowname, channel, recipient):
+		return make_ledger_key(rowname, channel, recipient, self.alert_date)
+
+
+def make_ledger_key(rowname, channel, recipient, alert_date):
+	"""Stable, fixed-length key for (Document Detail row, channel, recipient, alert date)."""
+	raw = "|".join(
+		(
+			cstr(rowname),
+			cstr(channel),
+			normalize_recipient(channel, recipient),
+			cstr(getdate(alert_date)),
+		)
+	)
+	return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def normalize_recipient(channel, recipient):
+	value = cstr(recipient).strip()
+	if channel == "SMS":
+		for char in " -()":
+			value = value.replace(char, "")
+		return value
+	return value.lower()
@@ -6,11 +6,29 @@ import frappe
 from frappe import _
 from frappe.model.document import Document
 from frappe.utils import cint
+from frappe.utils.jinja import validate_template
+
+from service_workorder.ag_docs.alert_calendar import enqueue_calendar_rebuild
+
+# Settings that change which channels the alert calendar holds
+CALENDAR_FIELDS = (
+	"enable_email",
+	"enable_sms",
+	"default_admin_email",
+	"default_admin_mobile",
+	"cc_emails",
+	"cc_mobiles",
+)
 
 
 class DocumentAlertSettings(Document):
 	def validate(self):
 		self.validate_uid_lengths()
+		self.validate_email_template()
+
+	def on_update(self):
+		if any(self.has_value_changed(field) for field in CALENDAR_FIELDS):
+			enqueue_calendar_rebuild()
 
 	def validate_uid_lengths(self):
 		min_length = cint(self.uid_min_length) or 7
@@ -24,3 +42,7 @@ class DocumentAlertSettings(Document):
 
 		self.uid_min_length = min_length
 		self.uid_max_length = max_length
+
+	def validate_email_template(self):
+		if (self.email_template or "").strip():
+			validate_template(self.email_template)
@@ -4,6 +4,12 @@
 # import frappe
 from frappe.model.document import Document
 
+from service_workorder.ag_docs.alert_calendar import enqueue_document_type_calendar_refresh
+from service_workorder.ag_docs.alert_schedule import enqueue_document_type_refresh
+
 
 class DocumentTypeMaster(Document):
-	pass
+	def on_update(self):
+		if self.has_value_changed("alert_days") or self.has_value_changed("repeat_interval"):
+			enqueue_document_type_refresh(self.name)
+			enqueue_document_type_calendar_refresh(self.name)
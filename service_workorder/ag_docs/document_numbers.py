@@ -0,0 +1,96 @@
+"""Normalized lookup key for ``Document Detail.document_number``.
+
+Document numbers are compared trimmed and case-insensitively. The normalized value
+is stored in the indexed ``document_number_key`` column when a registration is saved,
+so duplicate checks match it directly instead of scanning ``lower(document_number)``.
+"""
+
+from __future__ import annotations
+
+import frappe
+
+BACKFILL_CHUNK_SIZE = 5000
+UPDATE_CHUNK_SIZE = 1000
+
+
+def get_document_number_key(number):
+	"""Return the normalized key of ``number`` or ``None`` when it is blank."""
+	return (number or "").strip().lower() or None
+
+
+def set_document_number_keys(doc, table_field="document_details"):
+	"""Fill ``document_number_key`` on every document row of a registration before save."""
+	for row in doc.get(table_field) or []:
+		row.document_number_key = get_document_number_key(row.document_number)
+
+
+def find_document_number_rows(keys):
+	"""Return the stored rows whose key is one of ``keys`` (already normalized)."""
+	keys = [key for key in keys or [] if key]
+	if not keys:
+		return []
+
+	placeholders = ", ".join(["%s"] * len(keys))
+	return frappe.db.sql(
+		f"""
+		select
+			name,
+			parent,
+			parenttype,
+			document_number,
+			document_number_key
+		from `tabDocument Detail`
+		where document_number_key in ({placeholders})
+		""",
+		tuple(keys),
+		as_dict=True,
+	)
+
+
+def backfill_document_number_keys():
+	"""Recompute ``document_number_key`` for stored rows in primary-key order; returns rows updated."""
+	last_name = ""
+	updated = 0
+	while True:
+		rows = frappe.db.sql(
+			"""
+			select name, document_number, document_number_key
+			from `tabDocument Detail`
+			where name > %s
+			order by name
+			limit %s
+			""",
+			(last_name, BACKFILL_CHUNK_SIZE),
+			as_dict=True,
+		)
+		if not rows:
+			break
+
+		updates = {}
+		for row in rows:
+			key = get_document_number_key(row.document_number)
+			if key != (row.document_number_key or None):
+				updates[row.name] = key
+
+		_apply_document_number_keys(updates)
+		updated += len(updates)
+		last_name = rows[-1].name
+
+	return updated
+
+
+def _apply_document_number_keys(updates):
+	rownames = list(updates)
+	for start in range(0, len(rownames), UPDATE_CHUNK_SIZE):
+		chunk = rownames[start : start + UPDATE_CHUNK_SIZE]
+		cases = " ".join(["when %s then %s"] * len(chunk))
+		placeholders = ", ".join(["%s"] * len(chunk))
+		values = [value for rowname in chunk for value in (rowname, updates[rowname])]
+		frappe.db.sql(
+			f"""
+			update `tabDocument Detail`
+			set document_number_key = case name {cases} end
+			where name in ({placeholders})
+			""",
+			(*values, *chunk),
+		)
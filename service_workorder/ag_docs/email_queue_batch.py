@@ -0,0 +1,192 @@
+"""Bulk Email Queue writer for the document alert pipeline.
+
+``frappe.sendmail`` inserts one Email Queue document (plus its recipient rows) through
+the ORM for every message. A daily alert run produces thousands of messages, so the
+scheduler builds each queue row with ``QueueBuilder`` and writes whole batches with
+multi-row INSERTs instead. The regular Email Queue flush job sends them afterwards.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+import frappe
+from frappe.utils import cstr, now_datetime
+
+try:
+	from frappe.email.doctype.email_queue.email_queue import QueueBuilder
+except ImportError:  # pragma: no cover - older frappe versions
+	QueueBuilder = None
+
+# Messages buffered before they are written to the Email Queue
+EMAIL_BATCH_SIZE = 500
+
+# Names checked per query when counting pending messages
+COUNT_CHUNK_SIZE = 1000
+
+_META_COLUMNS = ("name", "creation", "modified", "owner", "modified_by", "docstatus")
+
+
+@dataclass
+class QueuedEmail:
+	"""A message waiting to be written; ``reference`` is handed back untouched.
+
+	``skipped`` is set when no recipient is left after Email Queue filtering (all
+	unsubscribed or blocked); such a message is never written and was not delivered.
+	"""
+
+	recipients: list
+	subject: str
+	message: str = ""
+	reference: object = None
+	queue_data: dict = None
+	queue_name: str = ""
+	error: str = ""
+	skipped: bool = False
+
+	@property
+	def ok(self):
+		return not self.error
+
+
+@dataclass
+class EmailQueueBatch:
+	"""Collect alert emails and write them to the Email Queue in bulk."""
+
+	batch_size: int = EMAIL_BATCH_SIZE
+	# False when the messages are held elsewhere (sending window) and only collected here
+	build_queue_rows: bool = True
+	pending: list = field(default_factory=list)
+	queued_names: list = field(default_factory=list)
+
+	@property
+	def is_full(self):
+		return len(self.pending) >= self.batch_size
+
+	def add(self, recipients, subject, message, reference=None, reference_doctype=None, reference_name=None):
+		"""Build the queue row for one message. Errors while building are raised to the caller."""
+		email = QueuedEmail(
+			recipients=list(recipients), subject=subject, message=message, reference=reference
+		)
+
+		if not self.build_queue_rows:
+			self.pending.append(email)
+			return email
+
+		if QueueBuilder is None:
+			# No bulk path on this frappe version, fall back to the regular API
+			frappe.sendmail(recipients=email.recipients, subject=subject, message=message)
+			self.pending.append(email)
+			return email
+
+		builder = QueueBuilder(
+			recipients=email.recipients,
+			subject=subject,
+			message=message,
+			reference_doctype=reference_doctype,
+			reference_name=reference_name,
+		)
+		final_recipients = builder.final_recipients()
+		if final_recipients:
+			email.recipients = list(final_recipients)
+			email.queue_data = {**builder.as_dict(include_recipients=False), "status": "Not Sent"}
+		else:
+			email.skipped = True
+
+		self.pending.append(email)
+		return email
+
+	def flush(self):
+		"""Write the buffered messages and return them with ``queue_name``/``error`` filled in.
+
+		Skipped messages are returned as they are, without a ``queue_name``.
+		"""
+		emails, self.pending = self.pending, []
+		to_insert = [email for email in emails if email.queue_data]
+		if not to_insert:
+			return emails
+
+		try:
+			self._insert(to_insert)
+		except Exception as exc:
+			frappe.log_error(frappe.get_traceback(), "Document Alert Email Queue Failure")
+			for email in to_insert:
+				email.queue_name = ""
+				email.error = cstr(exc)
+		else:
+			self.queued_names.extend(email.queue_name for email in to_insert)
+
+		return emails
+
+	def count_pending(self):
+		"""Count messages of this batch that the Email Queue has not sent yet."""
+		return count_pending_queue_names(self.queued_names)
+
+	def _insert(self, emails):
+		timestamp = now_datetime()
+		user = frappe.session.user if getattr(frappe, "session", None) else "Administrator"
+		table_columns = set(frappe.db.get_table_columns("Email Queue"))
+
+		data_fields = []
+		for email in emails:
+			for key in email.queue_data:
+				if key in table_columns and key not in data_fields and key not in _META_COLUMNS:
+					data_fields.append(key)
+
+		queue_columns = (*_META_COLUMNS, *data_fields)
+		queue_values = []
+		recipient_values = []
+
+		for email in emails:
+			email.queue_name = frappe.generate_hash(length=10)
+			data = email.queue_data
+			queue_values.append(
+				(
+					email.queue_name,
+					timestamp,
+					timestamp,
+					user,
+					user,
+					0,
+					*(data.get(key) for key in data_fields),
+				)
+			)
+			for idx, recipient in enumerate(email.recipients, start=1):
+				recipient_values.append(
+					(
+						frappe.generate_hash(length=10),
+						timestamp,
+						timestamp,
+						user,
+						user,
+						0,
+						idx,
+						email.queue_name,
+						"Email Queue",
+						"recipients",
+						recipient,
+						"Not Sent",
+					)
+				)
+
+		frappe.db.bulk_insert("Email Queue", fields=queue_columns, values=queue_values)
+		frappe.db.bulk_insert(
+			"Email Queue Recipient",
+			fields=(*_META_COLUMNS, "idx", "parent", "parenttype", "parentfield", "recipient", "status"),
+			values=recipient_values,
+		)
+
+
+def count_pending_queue_names(names):
+	"""Count the given Email Queue names that are still ``Not Sent``."""
+	if not names:
+		return 0
+
+	names = list(names)
+	pending = 0
+	for start in range(0, len(names), COUNT_CHUNK_SIZE):
+		pending += frappe.db.count(
+			"Email Queue",
+			{"name": ("in", names[start : start + COUNT_CHUNK_SIZE]), "status": "Not Sent"},
+		)
+	return pending
@@ -0,0 +1,79 @@
+"""E.164 normalisation of SMS recipients.
+
+Registrations store mobile numbers the way users typed them ("+971 50 123 4567",
+"0501234567", "971501234567"), so one person could count as several recipients and
+receive the same alert more than once. :class:`PhoneNormalizer` maps every spelling
+to one E.164 number, using a default country for national numbers, and remembers
+each result for the rest of the run.
+"""
+
+from __future__ import annotations
+
+import re
+
+import frappe
+from frappe.utils import cstr
+
+try:
+	import phonenumbers
+except ImportError:  # pragma: no cover - phonenumbers ships with frappe
+	phonenumbers = None
+
+_NON_DIGITS = re.compile(r"[^\d+]")
+
+
+class PhoneNormalizer:
+	"""Normalise numbers to E.164; numbers that cannot be parsed are only cleaned."""
+
+	def __init__(self, default_region=None):
+		self.default_region = (cstr(default_region).strip().upper() or None) if default_region else None
+		self._cache = {}
+
+	@classmethod
+	def from_settings(cls, settings):
+		"""Use Document Alert Settings' default SMS country, or the System Settings country."""
+		country = settings.get("sms_default_country") or frappe.db.get_single_value(
+			"System Settings", "country"
+		)
+		region = frappe.db.get_value("Country", country, "code") if country else None
+		return cls(region)
+
+	def normalize(self, number):
+		raw = cstr(number).strip()
+		if raw not in self._cache:
+			self._cache[raw] = self._normalize(raw)
+		return self._cache[raw]
+
+	def normalize_all(self, numbers):
+		"""Normalise and de-duplicate ``numbers``, keeping their order."""
+		normalized = []
+		seen = set()
+		for number in numbers or []:
+			value = self.normalize(number)
+			if value and value not in seen:
+				normalized.append(value)
+				seen.add(value)
+		return normalized
+
+	def _normalize(self, raw):
+		cleaned = _NON_DIGITS.sub("", raw)
+		if not cleaned or phonenumbers is None:
+			return cleaned
+
+		candidates = [cleaned]
+		if cleaned.startswith("00"):
+			candidates.append(f"+{cleaned[2:]}")
+		elif not cleaned.startswith(("+", "0")):
+			# "971501234567" is an international number typed without the plus sign;
+			# country codes never start with 0, so "050..." stays a national number
+			candidates.append(f"+{cleaned}")
+
+		for candidate in candidates:
+			try:
+				parsed = phonenumbers.parse(candidate, self.default_region)
+			except phonenumbers.NumberParseException:
+				continue
+			if phonenumbers.is_valid_number(parsed):
+				return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
+
+		return cleaned
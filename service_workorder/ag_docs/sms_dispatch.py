@@ -0,0 +1,260 @@
+"""Pooled, concurrent SMS delivery for the document alert pipeline.
+
+``frappe.core.doctype.sms_settings.sms_settings.send_sms`` opens a new HTTP request per
+number and sends them one after another. The dispatcher below talks to the same SMS
+Settings gateway, but keeps a keep-alive connection pool per gateway, runs requests on
+a bounded thread pool, throttles them with a per-gateway token bucket and packs several
+recipients into one request when the gateway accepts comma separated lists.
+
+Worker threads only perform HTTP calls; SMS Log rows are written by the caller's
+thread once a batch completes.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+import frappe
+from frappe.utils import cint, cstr, flt
+
+DEFAULT_HEADERS = {"Accept": "text/plain, text/html, */*"}
+DEFAULT_TIMEOUT = 15
+
+_sessions: dict = {}
+_rate_limiters: dict = {}
+_registry_lock = threading.Lock()
+
+
+@dataclass
+class SMSGateway:
+	"""Connection details for an HTTP SMS gateway (mirrors SMS Settings)."""
+
+	url: str
+	message_parameter: str
+	receiver_parameter: str
+	static_params: dict = field(default_factory=dict)
+	headers: dict = field(default_factory=dict)
+	use_post: bool = False
+	use_json: bool = False
+
+	@property
+	def key(self):
+		parts = urlsplit(self.url)
+		return f"{parts.scheme}://{parts.netloc}"
+
+	@classmethod
+	def from_sms_settings(cls):
+		"""Build the gateway from SMS Settings, or return ``None`` when it is incomplete."""
+		try:
+			settings = frappe.get_cached_doc("SMS Settings")
+		except frappe.DoesNotExistError:
+			return None
+
+		url = cstr(settings.get("sms_gateway_url")).strip()
+		message_parameter = cstr(settings.get("message_parameter")).strip()
+		receiver_parameter = cstr(settings.get("receiver_parameter")).strip()
+		if not (url and message_parameter and receiver_parameter):
+			return None
+
+		static_params = {}
+		headers = dict(DEFAULT_HEADERS)
+		for row in settings.get("parameters") or []:
+			if not row.parameter:
+				continue
+			if cint(row.get("header")):
+				headers[row.parameter] = row.value
+			else:
+				static_params[row.parameter] = row.value
+
+		return cls(
+			url=url,
+			message_parameter=message_parameter,
+			receiver_parameter=receiver_parameter,
+			static_params=static_params,
+			headers=headers,
+			use_post=bool(cint(settings.get("use_post"))),
+			use_json=bool(cint(settings.get("use_json"))),
+		)
+
+
+@dataclass
+class SMSJob:
+	"""One message for a set of recipients; ``reference`` is handed back untouched."""
+
+	recipients: list
+	message: str
+	reference: object = None
+	# billed segments per recipient (see sms_packing.measure)
+	segments: int = 1
+	sent: list = field(default_factory=list)
+	errors: list = field(default_factory=list)
+	# longest single gateway call of this job, in seconds (rate limit waits excluded)
+	elapsed: float = 0.0
+
+	@property
+	def ok(self):
+		return bool(self.sent) and not self.errors
+
+	@property
+	def error_message(self):
+		return "; ".join(self.errors)
+
+
+class RateLimiter:
+	"""Thread-safe token bucket; ``rate`` requests per second with a burst of ``capacity``."""
+
+	def __init__(self, rate, capacity=None):
+		self.rate = flt(rate)
+		self.capacity = max(flt(capacity or rate), 1.0)
+		self._tokens = self.capacity
+		self._updated = time.monotonic()
+		self._lock = threading.Lock()
+
+	def acquire(self):
+		if self.rate <= 0:
+			return
+
+		while True:
+			with self._lock:
+				now = time.monotonic()
+				self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+				self._updated = now
+				if self._tokens >= 1:
+					self._tokens -= 1
+					return
+				wait = (1 - self._tokens) / self.rate
+			time.sleep(wait)
+
+
+class SMSDispatcher:
+	"""Send many :class:`SMSJob` objects through one gateway concurrently."""
+
+	def __init__(
+		self, gateway, max_workers=4, rate_limit=0, batch_size=1, timeout=DEFAULT_TIMEOUT, session=None
+	):
+		self.gateway = gateway
+		self.max_workers = max(cint(max_workers), 1)
+		self.batch_size = max(cint(batch_size), 1)
+		self.timeout = timeout
+		self.session = session or get_session(gateway.key, self.max_workers)
+		self.rate_limiter = get_rate_limiter(gateway.key, rate_limit)
+
+	@classmethod
+	def from_settings(cls, settings):
+		"""Create a dispatcher for Document Alert Settings, or ``None`` if SMS Settings is incomplete."""
+		gateway = SMSGateway.from_sms_settings()
+		if not gateway:
+			return None
+
+		return cls(
+			gateway,
+			max_workers=cint(settings.get("sms_dispatch_workers")) or 4,
+			rate_limit=flt(settings.get("sms_rate_limit")),
+			batch_size=cint(settings.get("sms_batch_size")) or 1,
+		)
+
+	def send(self, jobs):
+		"""Deliver ``jobs`` and fill ``sent``/``errors`` on each of them. Returns ``jobs``."""
+		requests_to_send = []
+		for job in jobs:
+			job.recipients = _clean_numbers(job.recipients)
+			for start in range(0, len(job.recipients), self.batch_size):
+				requests_to_send.append((job, job.recipients[start : start + self.batch_size]))
+
+		if not requests_to_send:
+			return jobs
+
+		with ThreadPoolExecutor(max_workers=min(self.max_workers, len(requests_to_send))) as pool:
+			futures = [
+				(job, batch, pool.submit(self._timed_post, batch, job.message))
+				for job, batch in requests_to_send
+			]
+			for job, batch, future in futures:
+				elapsed, error = future.result()
+				job.elapsed = max(job.elapsed, elapsed)
+				if error:
+					job.errors.append(f"{', '.join(batch)}: {cstr(error)}")
+				else:
+					job.sent.extend(batch)
+
+		return jobs
+
+	def _timed_post(self, recipients, message):
+		"""Wait for the rate limiter, then post; returns ``(seconds, exception or None)``."""
+		self.rate_limiter.acquire()
+		started = time.perf_counter()
+		try:
+			self._post(recipients, message)
+		except Exception as exc:
+			return time.perf_counter() - started, exc
+		return time.perf_counter() - started, None
+
+	def _post(self, recipients, message):
+		gateway = self.gateway
+		params = dict(gateway.static_params)
+		params[gateway.message_parameter] = message
+		params[gateway.receiver_parameter] = ",".join(recipients)
+
+		kwargs = {"headers": gateway.headers or DEFAULT_HEADERS, "timeout": self.timeout}
+		# same as the core SMS helper: "Use JSON" only applies to POST requests
+		if not gateway.use_post:
+			response = self.session.get(gateway.url, params=params, **kwargs)
+		elif gateway.use_json:
+			response = self.session.post(gateway.url, json=params, **kwargs)
+		else:
+			response = self.session.post(gateway.url, data=params, **kwargs)
+		response.raise_for_status()
+		return response.status_code
+
+
+def get_session(key, pool_size):
+	"""Return a keep-alive ``requests.Session`` shared by every dispatcher for ``key``."""
+	with _registry_lock:
+		session = _sessions.get(key)
+		if session is None or getattr(session, "_pool_size", 0) < pool_size:
+			import requests
+			from requests.adapters import HTTPAdapter
+
+			session = requests.Session()
+			adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+			session.mount("http://", adapter)
+			session.mount("https://", adapter)
+			session._pool_size = pool_size
+			_sessions[key] = session
+		return session
+
+
+def get_rate_limiter(key, rate):
+	"""Return the token bucket shared by every dispatcher for ``key``."""
+	with _registry_lock:
+		limiter = _rate_limiters.get(key)
+		if limiter is None or limiter.rate != flt(rate):
+			limiter = RateLimiter(rate)
+			_rate_limiters[key] = limiter
+		return limiter
+
+
+def log_sms_job(job):
+	"""Write an SMS Log for a finished job the same way the core SMS helper does."""
+	if not job.sent:
+		return
+
+	try:
+		from frappe.core.doctype.sms_settings.sms_settings import create_sms_log
+	except ImportError:
+		return
+
+	create_sms_log({"message": job.message, "receiver_list": list(job.recipients)}, job.sent)
+
+
+def _clean_numbers(recipients):
+	numbers = []
+	for number in recipients or []:
+		cleaned = cstr(number).replace(" ", "").replace("-", "").replace("(", "").replace(")", "")
+		if cleaned and cleaned not in numbers:
+			numbers.append(cleaned)
+	return numbers
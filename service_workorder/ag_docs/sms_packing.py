@@ -0,0 +1,305 @@
+"""GSM segment-aware packing of document alert SMS.
+
+Gateways bill per segment: 160 GSM-7 characters (153 per part once a message is
+concatenated) or only 70 UCS-2 characters (67 per part) as soon as a single
+character falls outside the GSM alphabet. The packer keeps messages in GSM-7 where
+punctuation allows it, measures every candidate message, switches to compact
+document labels (Document Type Master short codes) when that saves segments, and
+stops at a per-recipient segment budget with a "+N more" summary.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+GSM_BASIC_CHARS = frozenset(
+	"@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+	"¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+# Extension table characters take an escape plus the character (two septets)
+GSM_EXTENDED_CHARS = frozenset("^{}\\[~]|€\f")
+
+# Look-alikes that would otherwise force the whole message into UCS-2
+GSM_REPLACEMENTS = {
+	"\u2018": "'",  # left single quotation mark
+	"\u2019": "'",  # right single quotation mark
+	"\u201a": "'",  # single low-9 quotation mark
+	"\u201c": '"',  # left double quotation mark
+	"\u201d": '"',  # right double quotation mark
+	"\u201e": '"',  # double low-9 quotation mark
+	"\u2013": "-",  # en dash
+	"\u2014": "-",  # em dash
+	"\u2212": "-",  # minus sign
+	"\u2026": "...",  # horizontal ellipsis
+	"\u00a0": " ",  # no-break space
+	"\u2007": " ",  # figure space
+	"\u202f": " ",  # narrow no-break space
+	"\t": " ",
+	"\u2022": "-",  # bullet
+	"`": "'",
+	"\u00b4": "'",  # acute accent
+}
+
+GSM_SINGLE_SEGMENT = 160
+GSM_MULTI_SEGMENT = 153
+UCS2_SINGLE_SEGMENT = 70
+UCS2_MULTI_SEGMENT = 67
+
+# Longest concatenated message the packer produces before starting another one
+MAX_MESSAGE_SEGMENTS = 3
+
+SECTION_SEPARATOR = " | "
+# Marks a message cut short because a single document did not fit
+TRUNCATION_MARK = "..."
+ITEM_SEPARATOR = "; "
+
+
+@dataclass
+class SegmentInfo:
+	encoding: str
+	units: int
+	segments: int
+
+
+@dataclass
+class SMSItem:
+	"""One document line; ``short_label`` is used when compact labels save segments."""
+
+	label: str
+	short_label: str = ""
+
+
+@dataclass
+class SMSSection:
+	"""The documents of one bundle, introduced by ``title``."""
+
+	title: str
+	items: list
+	reference: object = None
+
+
+@dataclass
+class PackedSMS:
+	message: str
+	segments: int
+	encoding: str
+	references: list = field(default_factory=list)
+	trimmed: int = 0
+
+
+def to_gsm(text):
+	"""Replace typographic look-alikes with their GSM-7 equivalents."""
+	text = text or ""
+	for char, replacement in GSM_REPLACEMENTS.items():
+		if char in text:
+			text = text.replace(char, replacement)
+	return text
+
+
+def measure(text):
+	"""Return the encoding, length in encoding units and segment count of ``text``."""
+	text = text or ""
+	units = 0
+	for char in text:
+		if char in GSM_BASIC_CHARS:
+			units += 1
+		elif char in GSM_EXTENDED_CHARS:
+			units += 2
+		else:
+			units = len(text.encode("utf-16-le")) // 2
+			return SegmentInfo("UCS-2", units, _segments(units, UCS2_SINGLE_SEGMENT, UCS2_MULTI_SEGMENT))
+
+	return SegmentInfo("GSM-7", units, _segments(units, GSM_SINGLE_SEGMENT, GSM_MULTI_SEGMENT))
+
+
+def pack_sections(sections, signature="", budget=0, max_message_segments=MAX_MESSAGE_SEGMENTS):
+	"""Pack ``sections`` into as few segments as possible.
+
+	Every message stays within ``max_message_segments``; all messages together stay
+	within ``budget`` segments (0 = no limit), trimming the remaining documents into a
+	"+N more" note. Full and compact labels are both tried and the cheaper one wins.
+	Non-empty ``sections`` always give at least one message: a first document too long
+	for the limits is cut short.
+	"""
+	sections = [section for section in sections or [] if section.items]
+	if not sections:
+		return []
+
+	max_message_segments = max(_to_int(max_message_segments), 1)
+
+	signature = to_gsm(signature or "").strip()
+	full = _pack(sections, signature, budget, max_message_segments, compact=False)
+	has_short_labels = any(item.short_label for section in sections for item in section.items)
+	if not has_short_labels:
+		return full
+
+	compact = _pack(sections, signature, budget, max_message_segments, compact=True)
+	return min(full, compact, key=_pack_cost)
+
+
+def _pack(sections, signature, budget, max_message_segments, compact):
+	messages = []
+	current = []
+	cut_short = False
+	used = 0
+	total_items = sum(len(section.items) for section in sections)
+	placed = 0
+
+	def fits(groups, closed):
+		segments = _measure_groups(groups, signature).segments
+		return segments <= max_message_segments and (not budget or closed + segments <= budget)
+
+	for section in sections:
+		title = to_gsm(section.title)
+		for item in section.items:
+			label = to_gsm((item.short_label or item.label) if compact else item.label)
+
+			trial = _append(current, title, label, section.reference)
+			if fits(trial, used):
+				current = trial
+				placed += 1
+				continue
+
+			if not current:
+				# not even the first document fits; send it cut short rather than nothing
+				current = trial
+				placed += 1
+				cut_short = True
+				break
+
+			trial = _append([], title, label, section.reference)
+			if not fits(trial, used + _measure_groups(current, signature).segments):
+				break
+
+			used += _measure_groups(current, signature).segments
+			messages.append(current)
+			current = trial
+			placed += 1
+		else:
+			continue
+		break
+
+	if current:
+		messages.append(current)
+
+	trimmed = total_items - placed
+	if trimmed and messages:
+		trimmed = _fit_summary(messages, signature, budget, max_message_segments, trimmed)
+
+	packed = []
+	for groups in messages:
+		suffix = groups[0].get("suffix", "") if groups else ""
+		if cut_short:
+			allowed = min(max_message_segments, budget) if budget else max_message_segments
+			text = _render_cut_short(groups, signature, suffix, allowed)
+		else:
+			text = _render(groups, signature, suffix)
+		info = measure(text)
+		packed.append(
+			PackedSMS(
+				message=text,
+				segments=info.segments,
+				encoding=info.encoding,
+				references=_unique_references(groups),
+			)
+		)
+
+	if packed and trimmed:
+		# the "+N more" note stands for the dropped documents, so the last message
+		# also carries the references of sections that did not fit at all
+		last = packed[-1]
+		last.trimmed = trimmed
+		for section in sections:
+			if section.reference is not None and not any(section.reference is ref for ref in last.references):
+				if not any(section.reference is ref for sms in packed for ref in sms.references):
+					last.references.append(section.reference)
+	return packed
+
+
+def _fit_summary(messages, signature, budget, max_message_segments, trimmed):
+	"""Append "+N more" to the last message, dropping documents until it fits."""
+	last = messages[-1]
+	closed = sum(_measure_groups(groups, signature).segments for groups in messages[:-1])
+
+	while True:
+		suffix = f" +{trimmed} more"
+		segments = measure(_render(last, signature, suffix)).segments
+		if segments <= max_message_segments and (not budget or closed + segments <= budget):
+			break
+		if not last or (len(last) == 1 and len(last[0]["labels"]) == 1):
+			# nothing left to drop; the summary stands on its own
+			break
+		group = last[-1]
+		group["labels"].pop()
+		trimmed += 1
+		if not group["labels"]:
+			last.pop()
+
+	if last:
+		last[0]["suffix"] = f" +{trimmed} more"
+	return trimmed
+
+
+def _append(groups, title, label, reference):
+	groups = [dict(group, labels=list(group["labels"])) for group in groups]
+	if groups and groups[-1]["title"] == title and groups[-1]["reference"] is reference:
+		groups[-1]["labels"].append(label)
+	else:
+		groups.append({"title": title, "labels": [label], "reference": reference})
+	return groups
+
+
+def _render(groups, signature, suffix=""):
+	text = SECTION_SEPARATOR.join(
+		f"{group['title']} doc alert: {ITEM_SEPARATOR.join(group['labels'])}" for group in groups
+	)
+	text = f"{text}{suffix}"
+	if signature:
+		text = f"{text} {signature}"
+	return text
+
+
+def _render_cut_short(groups, signature, suffix, allowed_segments):
+	"""Render ``groups`` cut to ``allowed_segments``, keeping the suffix and signature if possible."""
+	tail = f"{suffix} {signature}" if signature else suffix
+	body = _render(groups, "")
+	if measure(f"{TRUNCATION_MARK}{tail}").segments > allowed_segments:
+		body, tail = f"{body}{tail}", ""
+
+	low, high = 0, len(body)
+	while low < high:
+		middle = (low + high + 1) // 2
+		if measure(f"{body[:middle]}{TRUNCATION_MARK}{tail}").segments <= allowed_segments:
+			low = middle
+		else:
+			high = middle - 1
+	return f"{body[:low].rstrip()}{TRUNCATION_MARK}{tail}"
+
+
+def _measure_groups(groups, signature):
+	return measure(_render(groups, signature))
+
+
+def _unique_references(groups):
+	references = []
+	for group in groups:
+		if group["reference"] is not None and not any(group["reference"] is ref for ref in references):
+			references.append(group["reference"])
+	return references
+
+
+def _pack_cost(packed):
+	return (packed[-1].trimmed if packed else 0, sum(message.segments for message in packed))
+
+
+def _to_int(value):
+	try:
+		return int(value or 0)
+	except (TypeError, ValueError):
+		return 0
+
+
+def _segments(units, single, multi):
+	if units <= single:
+		return 1 if units else 0
+	return -(-units // multi)
@@ -1,8 +1,12 @@
 import frappe
 from frappe import _
-from frappe.contacts.doctype.contact.contact import get_default_contact
 from frappe.utils import nowdate, add_days, cint
 
+from service_workorder.ag_docs.customer_contact_sync import (
+    get_customer_contact_info as _get_cached_customer_contact_info,
+)
+from service_workorder.ag_docs.document_numbers import find_document_number_rows, get_document_number_key
+
 
 # ============================================================
 # COMMON: Prevent double creation (ONLY one allowed - SO or SI)
@@ -40,50 +44,7 @@ def load_sales_taxes(template_name=None, company=None):
 # ============================================================
 @frappe.whitelist()
 def get_customer_contact_info(customer):
-    if not customer:
-        return {}
-
-    fields = ["customer_name", "email_id"]
-    for column in ("mobile_no", "phone"):
-        if frappe.db.has_column("Customer", column):
-            fields.append(column)
-
-    info = frappe.db.get_value("Customer", customer, fields, as_dict=True)
-    if not info:
-        return {}
-
-    result = {
-        "customer": customer,
-        "customer_name": info.get("customer_name"),
-        "customer_email": info.get("email_id"),
-    }
-
-    for column in ("mobile_no", "phone"):
-        if info.get(column):
-            result["mobile"] = info.get(column)
-            break
-
-    contact_name = get_default_contact("Customer", customer)
-    if contact_name:
-        contact = frappe.db.get_value(
-            "Contact",
-            contact_name,
-            ["name", "email_id", "mobile_no", "phone"],
-            as_dict=True,
-        )
-        if contact:
-            result["primary_contact"] = contact_name
-            result["contact_email"] = contact.get("email_id")
-            contact_mobile = contact.get("mobile_no") or contact.get("phone")
-            if contact_mobile:
-                result["contact_mobile"] = contact_mobile
-                if not result.get("mobile"):
-                    result["mobile"] = contact_mobile
-
-            if not result.get("customer_email") and contact.get("email_id"):
-                result["customer_email"] = contact.get("email_id")
-
-    return result
+    return _get_cached_customer_contact_info(customer)
 
 
 @frappe.whitelist()
@@ -115,21 +76,7 @@ def find_document_number_usage(document_number, parent=None, parenttype=None, ro
     if not value:
         return {}
 
-    normalized = value.lower()
-
-    rows = frappe.db.sql(
-        """
-        select
-            name,
-            parent,
-            parenttype,
-            document_number
-        from `tabDocument Detail`
-        where lower(document_number) = %s
-        """,
-        normalized,
-        as_dict=True,
-    )
+    rows = find_document_number_rows([get_document_number_key(value)])
 
     for row in rows:
         if (
@@ -210,33 +157,100 @@ def get_service_charge_from_slab(slab=None, item=None, slab_name=None, item_code
 # ============================================================
 # PRODUCT BUNDLE HELPER FOR SERVICE REQUEST JOBS
 # ============================================================
+# Expanded sales items per Product Bundle; see the Product Bundle/Item doc_events
+PRODUCT_BUNDLE_CACHE_KEY = "service_workorder:product_bundle_items"
+# Backstop for changes that bypass the hooks (e.g. direct db updates)
+PRODUCT_BUNDLE_CACHE_TTL = 6 * 60 * 60
+
+# Item fields copied into the expanded bundle rows
+BUNDLE_ITEM_FIELDS = ("item_name", "is_sales_item")
+
+
 @frappe.whitelist()
 def get_product_bundle_items(product_bundle):
     if not product_bundle:
         return []
 
-    bundle = frappe.get_doc("Product Bundle", product_bundle)
-    items = []
-    for row in bundle.items:
-        if not row.item_code:
-            continue
-        item_info = frappe.db.get_value(
-            "Item",
-            row.item_code,
-            ["item_name", "is_sales_item"],
-            as_dict=True,
-        )
-        if not (item_info and cint(item_info.is_sales_item) != 0):
-            continue
-        items.append(
-            {
-                "item_code": row.item_code,
-                "item_name": item_info.item_name or row.item_code,
-                "qty": row.qty or 1,
-                "description": row.description or "",
-            }
+    key = _get_product_bundle_cache_key(product_bundle)
+    items = frappe.cache().get_value(key)
+    if items is None:
+        items = _load_product_bundle_items(product_bundle)
+        frappe.cache().set_value(key, items, expires_in_sec=PRODUCT_BUNDLE_CACHE_TTL)
+    return [dict(item) for item in items]
+
+
+def _load_product_bundle_items(product_bundle):
+    rows = frappe.db.sql(
+        """
+        select
+            pbi.item_code,
+            pbi.qty,
+            pbi.description,
+            item.item_name
+        from `tabProduct Bundle Item` pbi
+        inner join `tabItem` item
+            on item.name = pbi.item_code
+        where pbi.parent = %s
+            and pbi.parenttype = 'Product Bundle'
+            and ifnull(item.is_sales_item, 0) != 0
+        order by pbi.idx
+        """,
+        product_bundle,
+        as_dict=True,
+    )
+    if not rows and not frappe.db.exists("Product Bundle", product_bundle):
+        frappe.throw(
+            _("Product Bundle {0} not found").format(product_bundle),
+            frappe.DoesNotExistError,
         )
-    return items
+
+    return [
+        {
+            "item_code": row.item_code,
+            "item_name": row.item_name or row.item_code,
+            "qty": row.qty or 1,
+            "description": row.description or "",
+        }
+        for row in rows
+    ]
+
+
+def clear_product_bundle_cache(doc, _method=None):
+    _clear_product_bundle_cache([doc.name])
+
+
+def clear_all_product_bundle_cache(doc=None, _method=None, *args):
+    """Rename hook: linked bundle rows are rewritten without a bundle save."""
+    frappe.cache().delete_keys(PRODUCT_BUNDLE_CACHE_KEY)
+    frappe.db.after_commit.add(lambda: frappe.cache().delete_keys(PRODUCT_BUNDLE_CACHE_KEY))
+
+
+def clear_product_bundle_cache_for_item(doc, _method=None):
+    """Item hook: drop the cached expansions of bundles that list this item."""
+    if not any(doc.has_value_changed(field) for field in BUNDLE_ITEM_FIELDS):
+        return
+
+    bundles = frappe.get_all(
+        "Product Bundle Item",
+        filters={"item_code": doc.name, "parenttype": "Product Bundle"},
+        pluck="parent",
+        distinct=True,
+    )
+    _clear_product_bundle_cache(bundles)
+
+
+def _clear_product_bundle_cache(bundles):
+    keys = [_get_product_bundle_cache_key(bundle) for bundle in bundles if bundle]
+    if not keys:
+        return
+
+    frappe.cache().delete_value(keys)
+    # a request reading before this transaction commits would cache the old items again
+    frappe.db.after_commit.add(lambda: frappe.cache().delete_value(keys))
+
+
+def _get_product_bundle_cache_key(product_bundle):
+    return f"{PRODUCT_BUNDLE_CACHE_KEY}:{product_bundle}"
 
 
 @frappe.whitelist()
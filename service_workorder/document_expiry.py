@@ -1,19 +1,26 @@
-from collections import defaultdict
 import re
-from typing import Dict, List, Sequence
+import tracemalloc
+from collections import defaultdict
+from collections.abc import Sequence
+from contextlib import contextmanager, nullcontext
+from datetime import timedelta
+from functools import lru_cache
+from itertools import chain
+from time import perf_counter
 
 import frappe
 from frappe import _
 from frappe.utils import (
+    add_days,
     cint,
     cstr,
     escape_html,
-    formatdate,
     format_datetime,
+    formatdate,
     get_link_to_form,
     getdate,
-    nowdate,
     now_datetime,
+    nowdate,
 )
 
 try:
@@ -21,6 +28,91 @@ try:
 except Exception:  # pragma: no cover - fallback for unexpected import issues
     _sms_send = None
 
+from service_workorder.ag_docs.alert_retry import SendingWindow, link_alert_log, queue_alert_retries
+from service_workorder.ag_docs.alert_schedule import (
+    apply_next_alert_dates,
+    get_next_alert_date_for_row,
+)
+from service_workorder.ag_docs.customer_contact_sync import get_customer_alert_contacts
+from service_workorder.ag_docs.doctype.document_alert_log_detail.document_alert_log_detail import (
+    bulk_insert_log_details,
+)
+from service_workorder.ag_docs.doctype.document_alert_run.document_alert_run import (
+    AlertRunCheckpoint,
+    AlertRunLock,
+    attach_run_details,
+)
+from service_workorder.ag_docs.doctype.document_alert_send_ledger.document_alert_send_ledger import SendLedger
+from service_workorder.ag_docs.email_queue_batch import EmailQueueBatch, count_pending_queue_names
+from service_workorder.ag_docs.expiry_window import evaluate_row_windows
+from service_workorder.ag_docs.phone_numbers import PhoneNormalizer
+from service_workorder.ag_docs.sms_dispatch import SMSDispatcher, SMSJob, log_sms_job
+from service_workorder.ag_docs.sms_packing import SMSItem, SMSSection, pack_sections
+
+# Registrations fetched and aggregated per round trip by the bundle builders
+BUNDLE_CHUNK_SIZE = 500
+
+# Default alert table template, relative to the app package
+DEFAULT_EMAIL_TEMPLATE_PATH = ("templates", "emails", "document_expiry_alert.html")
+
+# Bundles whose SMS are merged per recipient before the messages go out; a recipient
+# in more bundles than this gets one combined message per batch
+SMS_FLUSH_SIZE = 5000
+
+# SMS messages handed to the gateway between two heartbeats of the run
+SMS_SEND_BATCH_SIZE = 500
+
+# Employee bundles held for per-recipient grouped emails before they are queued
+EMAIL_GROUP_FLUSH_SIZE = 5000
+
+# Log detail note for emails whose recipients were all filtered out by the Email Queue
+EMAIL_SKIPPED_MESSAGE = "All recipients unsubscribed or blocked"
+
+# Seconds shard results of a parallel run are kept in the cache
+ALERT_RUN_TTL = 2 * 24 * 60 * 60
+
+# A run saves its progress at the next registration chunk boundary after this many
+# bundles or seconds (aligned with SMS_FLUSH_SIZE, where messages are flushed anyway)
+CHECKPOINT_BUNDLES = 5000
+CHECKPOINT_SECONDS = 10 * 60
+
+# A running checkpoint older than this belongs to a dead worker and is resumed
+RUN_STALE_AFTER = 30 * 60
+MAX_RUN_RESUMES = 3
+
+# Log counters that are summed when shard results are merged
+ALERT_COUNTER_KEYS = (
+    "total_records",
+    "emails_sent",
+    "sms_sent",
+    "emails_failed",
+    "sms_failed",
+    "email_attempts",
+    "sms_attempts",
+    "duplicates_skipped",
+    "retries_queued",
+    "sms_segments",
+    "scheduled_sends",
+)
+
+# Slowest individual sends kept on Document Alert Log
+SLOWEST_SENDS_LIMIT = 10
+
+# Stages copied into their own Document Alert Log fields (the rest stay in stage_timings)
+STAGE_LOG_FIELDS = {
+    "query": "query_seconds",
+    "aggregate": "aggregate_seconds",
+    "render": "render_seconds",
+    "email_queue": "email_queue_seconds",
+    "sms": "sms_seconds",
+}
+
+# Registration field used to keep a customer's registrations in the same shard
+SHARD_KEY_FIELDS = {
+    "Customer Document Registration": "customer",
+    "Customer Employee Registration": "customer_name",
+}
+
 
 @frappe.whitelist()
 def send_test_email():
@@ -49,7 +141,7 @@ def send_test_sms():
     if sms_error:
         frappe.throw(sms_error)
 
-    mobile_numbers = _get_admin_mobiles(settings)
+    mobile_numbers = PhoneNormalizer.from_settings(settings).normalize_all(_get_admin_mobiles(settings))
 
     if not mobile_numbers:
         frappe.throw("No mobile numbers found. Add Admin or CC mobile first.")
@@ -64,8 +156,17 @@ def send_test_sms():
 
 
 def send_expiry_notifications():
-    """Entry point for the scheduler: notify customers/employees about expiring docs."""
+    """Entry point for the scheduler: notify customers/employees about expiring docs.
+
+    With ``Parallel Alert Jobs`` above one the run is split into customer shards that
+    are processed on the long queue; the last shard to finish writes the single log.
+    Progress is checkpointed in Document Alert Run so an interrupted run is resumed
+    by ``resume_interrupted_expiry_runs``. Only one run is in flight per site: a
+    second invocation resumes today's interrupted run if there is one, and is skipped
+    while another run still holds the lock.
+    """
     log_context = _init_alert_log_context()
+    checkpoint = None
 
     try:
         settings = frappe.get_single("Document Alert Settings")
@@ -77,172 +178,1180 @@ def send_expiry_notifications():
             return
 
         today = getdate(nowdate())
-        bundles: List[Dict] = []
-        bundles.extend(_build_customer_bundles(today))
-        bundles.extend(_build_employee_bundles(today))
+        checkpoint = _get_interrupted_run(today)
+        lock = AlertRunLock(checkpoint.doc.run_id if checkpoint else frappe.generate_hash(length=12))
+        if not lock.acquire():
+            checkpoint = None
+            _skip_overlapping_run(log_context, lock.holder())
+            return
 
-        if not bundles:
-            frappe.logger().info("Document alerts: no expiring documents found.")
-            log_context["status"] = "Skipped"
-            log_context["failure_details"].append("No expiring documents matched the alert window.")
-            _create_alert_log(log_context)
+        if checkpoint:
+            # pick up where the dead worker stopped instead of starting over
+            checkpoint.mark_resumed()
+            frappe.logger().info("Document alerts: resuming interrupted run %s.", checkpoint.name)
+        else:
+            shard_count = cint(settings.get("alert_shards"))
+            if shard_count > 1:
+                try:
+                    _enqueue_alert_shards(today, shard_count, lock.run_id, lock.token)
+                except Exception:
+                    lock.release()
+                    raise
+                return
+
+            checkpoint = AlertRunCheckpoint.start(lock.run_id, today)
+
+        checkpoint.lock = lock
+        try:
+            _run_alert_job(settings, checkpoint, log_context)
+        finally:
+            lock.release()
+
+    except Exception as err:
+        _fail_alert_run(log_context, err, checkpoint)
+        raise
+
+
+def resume_expiry_run(run_name):
+    """Background job: continue an interrupted run (or shard) from its last checkpoint."""
+    checkpoint = AlertRunCheckpoint.load(run_name)
+    if not checkpoint or not checkpoint.is_running:
+        return
+
+    sharded = cint(checkpoint.doc.shard_count) > 1
+    lock = AlertRunLock(checkpoint.doc.run_id)
+    # a shard joins the other shards of its run; a whole run never shares the lock
+    if not lock.acquire(join_run=sharded):
+        # another worker is sending; this run is resumed (or given up on) by a later check
+        frappe.logger().info("Document alerts: run %s not resumed, %s holds the lock.", run_name, lock.holder())
+        return
+
+    if sharded:
+        run_expiry_shard(
+            checkpoint.doc.run_id,
+            checkpoint.doc.shard_index,
+            checkpoint.doc.shard_count,
+            cstr(checkpoint.alert_date),
+            lock_token=lock.token,
+        )
+        return
+
+    checkpoint.lock = lock
+    log_context = _init_alert_log_context()
+    try:
+        settings = frappe.get_single("Document Alert Settings")
+        _run_alert_job(settings, checkpoint, log_context)
+    except Exception as err:
+        _fail_alert_run(log_context, err, checkpoint)
+        raise
+    finally:
+        lock.release()
+
+
+def resume_interrupted_expiry_runs():
+    """Scheduler job: resume runs whose worker stopped checkpointing, or give up on them."""
+    stale_before = now_datetime() - timedelta(seconds=RUN_STALE_AFTER)
+    runs = frappe.get_all(
+        "Document Alert Run",
+        filters={"status": "Running", "checkpoint_at": ("<", stale_before)},
+        pluck="name",
+    )
+    today = getdate(nowdate())
+
+    for run_name in runs:
+        checkpoint = AlertRunCheckpoint.load(run_name)
+        # a worker of the run still refreshes the lock, so it is alive (or its shards are)
+        if AlertRunLock.held_by_run(checkpoint.doc.run_id):
+            continue
+
+        # a run from an earlier day would alert against a stale date; today's run covers it
+        if cint(checkpoint.doc.resume_count) >= MAX_RUN_RESUMES or checkpoint.alert_date < today:
+            _abandon_alert_run(checkpoint)
+            continue
+
+        # moves checkpoint_at forward, so the run is not enqueued again before it starts
+        checkpoint.mark_resumed()
+        frappe.enqueue(
+            "service_workorder.document_expiry.resume_expiry_run",
+            queue="long",
+            job_id=f"document_alerts::resume::{run_name}",
+            deduplicate=True,
+            run_name=run_name,
+        )
+
+
+def _get_interrupted_run(today):
+    """Today's single-job run whose worker stopped checkpointing and may still be resumed."""
+    runs = frappe.get_all(
+        "Document Alert Run",
+        filters={
+            "status": "Running",
+            "alert_date": today,
+            "shard_count": ("<=", 1),
+            "resume_count": ("<", MAX_RUN_RESUMES),
+            "checkpoint_at": ("<", now_datetime() - timedelta(seconds=RUN_STALE_AFTER)),
+        },
+        pluck="name",
+        order_by="checkpoint_at desc",
+        limit=1,
+    )
+    return AlertRunCheckpoint.load(runs[0]) if runs else None
+
+
+def _skip_overlapping_run(log_context, holder):
+    message = f"Run {holder or '?'} is still sending alerts; this invocation was skipped."
+    frappe.logger().info("Document alerts: %s", message)
+    log_context["status"] = "Skipped"
+    log_context["failure_details"].append(message)
+    _create_alert_log(log_context)
+
+
+def _run_alert_job(settings, checkpoint, log_context):
+    digest_entries = _restore_checkpoint(checkpoint, log_context)
+    _start_run_metrics(settings, log_context)
+    digest_entries = _process_alert_bundles(
+        settings, checkpoint.alert_date, log_context, checkpoint=checkpoint, digest_entries=digest_entries
+    )
+    checkpoint.finish()
+    _finalize_alert_run(settings, log_context, digest_entries, checkpoint.alert_date)
+
+
+def _fail_alert_run(log_context, err, checkpoint=None):
+    log_context["status"] = "Failed"
+    log_context["failure_details"].append(cstr(err))
+    frappe.log_error(frappe.get_traceback(), "Document Alert Scheduler Failure")
+    if checkpoint and checkpoint.is_running:
+        checkpoint.finish("Interrupted")
+    _create_alert_log(log_context)
+
+
+def _abandon_alert_run(checkpoint):
+    """Write the log of a run that cannot be resumed from what its checkpoint recorded."""
+    log_context = _init_alert_log_context()
+    digest_entries = _restore_checkpoint(checkpoint, log_context)
+    message = (
+        f"Run {checkpoint.name} stopped after {log_context['total_records']} bundle(s) "
+        f"and was not resumed (resumed {cint(checkpoint.doc.resume_count)} time(s))."
+    )
+    checkpoint.finish("Interrupted")
+
+    if cint(checkpoint.doc.shard_count) > 1:
+        log_context["failure_details"].append(f"Shard {checkpoint.doc.shard_index}: {message}")
+        log_context["shard_failed"] = 1
+        _hand_off_shard_result(
+            checkpoint.doc.run_id,
+            checkpoint.doc.shard_index,
+            checkpoint.doc.shard_count,
+            cstr(checkpoint.alert_date),
+            log_context,
+            digest_entries,
+        )
+        return
+
+    log_context["status"] = "Failed"
+    log_context["failure_details"].append(message)
+    _create_alert_log(log_context)
+
+
+def _restore_checkpoint(checkpoint, log_context):
+    """Load the saved counters into ``log_context`` and return the saved digest entries."""
+    log_context.update(checkpoint.context)
+    log_context["details"] = []
+    log_context["retries"] = []
+    log_context["alert_runs"] = [checkpoint.name]
+    return list(checkpoint.digest_entries)
+
+
+def _get_checkpoint_context(log_context):
+    """The parts of ``log_context`` worth saving, with run time and memory up to now."""
+    context = {
+        key: value
+        for key, value in log_context.items()
+        if not key.startswith("_") and key not in ("details", "retries")
+    }
+    started = log_context.get("_run_started")
+    if started is not None:
+        context["run_seconds"] = log_context["run_seconds"] + perf_counter() - started
+    if log_context.get("_tracing"):
+        context["peak_memory"] = max(log_context["peak_memory"], tracemalloc.get_traced_memory()[1])
+    return context
+
+
+def run_expiry_shard(run_id, shard_index, shard_count, today, lock_token=None):
+    """Background job: send the alerts of one customer shard and hand its results to the run.
+
+    ``lock_token`` is the token of the run's ``AlertRunLock`` shared by its shards.
+    """
+    log_context = _init_alert_log_context()
+    digest_entries: list[dict] = []
+    checkpoint = None
+
+    try:
+        settings = frappe.get_single("Document Alert Settings")
+        checkpoint = AlertRunCheckpoint.load_or_start(run_id, today, shard_index, shard_count)
+        if not checkpoint.is_running:
+            # already handed its result to the run
             return
 
-        email_count = 0
-        sms_count = 0
-        email_failures = 0
-        sms_failures = 0
-        failure_details = log_context["failure_details"]
-        log_context["total_records"] = len(bundles)
+        checkpoint.lock = AlertRunLock(run_id, lock_token) if lock_token else None
+
+        digest_entries = _restore_checkpoint(checkpoint, log_context)
+        _start_run_metrics(settings, log_context)
+        digest_entries = _process_alert_bundles(
+            settings,
+            getdate(today),
+            log_context,
+            shard=(cint(shard_index), cint(shard_count)),
+            checkpoint=checkpoint,
+            digest_entries=digest_entries,
+        )
+    except Exception as err:
+        log_context["failure_details"].append(f"Shard {shard_index}: {cstr(err)}")
+        frappe.log_error(frappe.get_traceback(), "Document Alert Shard Failure")
+        log_context["shard_failed"] = 1
+
+    _stop_run_metrics(log_context)
+    if checkpoint and checkpoint.is_running:
+        checkpoint.finish("Interrupted" if log_context.get("shard_failed") else "Completed")
+    _hand_off_shard_result(run_id, shard_index, shard_count, today, log_context, digest_entries)
+
+
+def _hand_off_shard_result(run_id, shard_index, shard_count, today, log_context, digest_entries):
+    cache = frappe.cache()
+    run_key = _get_run_cache_key(run_id)
+    cache.hset(run_key, cstr(shard_index), {"context": log_context, "digest": digest_entries})
+    cache.expire(cache.make_key(run_key), ALERT_RUN_TTL)
+
+    if len(cache.hkeys(run_key)) < cint(shard_count):
+        return
+
+    # Only the first shard that sees the full set writes the log
+    if not cache.set(cache.make_key(f"{run_key}:finalized"), 1, nx=True, ex=ALERT_RUN_TTL):
+        return
+
+    _finalize_sharded_run(run_id, today)
+
+
+@frappe.whitelist()
+def dry_run_expiry_notifications(alert_date=None, sample_size=5):
+    """Run the alert pipeline for ``alert_date`` without sending or writing anything.
+
+    Returns the counts the scheduler would produce, a few sample bundles and the
+    wall-clock seconds spent in each stage (query, aggregate, recipients, render).
+    """
+    frappe.only_for("System Manager")
+
+    settings = frappe.get_single("Document Alert Settings")
+    today = getdate(alert_date or nowdate())
+    sample_size = max(cint(sample_size), 0)
+    timer = _StageTimer()
+    started = perf_counter()
 
+    with timer.stage("setup"):
         admin_recipients = _get_admin_emails(settings)
-        consolidate_admin_email = (
-            settings.enable_email
-            and cint(settings.get("consolidate_admin_email"))
-            and bool(admin_recipients)
+        admin_mobiles = _get_admin_mobiles(settings)
+        consolidate_admin_email = _should_consolidate_admin_email(settings, admin_recipients)
+        email_template = _get_email_template(settings) if settings.enable_email else None
+        ledger = SendLedger(today)
+        phone_normalizer = PhoneNormalizer.from_settings(settings) if settings.enable_sms else None
+        sms_merger = _SMSMerger.from_settings(settings)
+        email_grouper = _EmailGrouper() if _should_group_employee_emails(settings) else None
+
+    counts = {
+        "bundles": 0,
+        "documents": 0,
+        "emails": 0,
+        "sms": 0,
+        "sms_messages": 0,
+        "sms_segments": 0,
+        "email_recipients": 0,
+        "sms_recipients": 0,
+        "digest_entries": 0,
+        "duplicates_skipped": 0,
+    }
+    samples = []
+
+    # no schedule_updates: next_alert_date is left untouched
+    bundles = chain(
+        _build_customer_bundles(today, timer=timer),
+        _build_employee_bundles(today, timer=timer),
+    )
+    for bundle in bundles:
+        counts["bundles"] += 1
+        counts["documents"] += len(bundle["documents"])
+
+        with timer.stage("recipients"):
+            rownames = _get_bundle_rownames(bundle)
+            digest = bool(consolidate_admin_email and ledger.filter_unsent(rownames, "Email", admin_recipients))
+            if settings.enable_email and not consolidate_admin_email:
+                bundle["email_recipients"].update(admin_recipients)
+            if settings.enable_sms:
+                bundle["sms_recipients"].update(admin_mobiles)
+                bundle["sms_recipients"] = set(phone_normalizer.normalize_all(bundle["sms_recipients"]))
+
+            email_recipients = sorted(bundle["email_recipients"]) if settings.enable_email else []
+            sms_recipients = sorted(bundle["sms_recipients"]) if settings.enable_sms else []
+            email_unsent = ledger.filter_unsent(rownames, "Email", email_recipients)
+            sms_unsent = ledger.filter_unsent(rownames, "SMS", sms_recipients)
+            counts["duplicates_skipped"] += len(email_recipients) - len(email_unsent)
+            counts["duplicates_skipped"] += len(sms_recipients) - len(sms_unsent)
+
+        with timer.stage("render"):
+            body = _render_email_body(bundle, template=email_template) if email_unsent or digest else None
+            sms_message = _build_sms_message(bundle, settings) if sms_unsent else None
+            if sms_unsent:
+                sms_merger.add(sms_unsent, _build_sms_section(bundle))
+
+        counts["digest_entries"] += int(digest)
+        if email_unsent and email_grouper is not None and _is_employee_bundle(bundle):
+            email_grouper.add(email_unsent, bundle, email_template)
+        elif email_unsent:
+            counts["emails"] += 1
+            counts["email_recipients"] += len(email_unsent)
+        if sms_unsent:
+            counts["sms"] += 1
+            counts["sms_recipients"] += len(sms_unsent)
+
+        if len(samples) < sample_size:
+            samples.append(
+                {
+                    "reference_doctype": bundle["parenttype"],
+                    "reference_name": bundle["parent"],
+                    "title": bundle["title"],
+                    "documents": bundle["documents"],
+                    "email_recipients": email_unsent,
+                    "sms_recipients": sms_unsent,
+                    "email_body": body,
+                    "sms_message": sms_message,
+                }
+            )
+
+    timings = dict(timer.timings)
+    timings["total"] = perf_counter() - started
+    counts["rows_fetched"] = timer.rows_fetched
+    if email_grouper is not None:
+        for recipients, _bundles in email_grouper.build():
+            counts["emails"] += 1
+            counts["email_recipients"] += len(recipients)
+
+    # messages and billed segments after packing each recipient's alerts across bundles
+    for job in sms_merger.build_jobs():
+        counts["sms_messages"] += len(job.recipients)
+        counts["sms_segments"] += job.segments * len(job.recipients)
+    return {
+        "alert_date": today,
+        "counts": counts,
+        "samples": samples,
+        "timings": {stage: round(seconds, 4) for stage, seconds in timings.items()},
+    }
+
+
+def _enqueue_alert_shards(today, shard_count, run_id, lock_token=None):
+    for shard_index in range(shard_count):
+        frappe.enqueue(
+            "service_workorder.document_expiry.run_expiry_shard",
+            queue="long",
+            job_id=f"document_alerts::{run_id}::{shard_index}",
+            run_id=run_id,
+            shard_index=shard_index,
+            shard_count=shard_count,
+            today=cstr(today),
+            lock_token=lock_token,
         )
-        admin_digest_entries: List[Dict] = []
 
-        for bundle in bundles:
+    frappe.logger().info(
+        "Document alerts: run %s split into %s shard job(s).",
+        run_id,
+        shard_count,
+    )
+    return run_id
+
+
+def _finalize_sharded_run(run_id, today):
+    cache = frappe.cache()
+    run_key = _get_run_cache_key(run_id)
+    shard_results = cache.hgetall(run_key) or {}
+
+    log_context = _init_alert_log_context()
+    digest_entries: list[dict] = []
+    failed_shards = 0
+    for _shard, result in sorted(shard_results.items()):
+        context = result.get("context") or {}
+        _merge_alert_context(log_context, context)
+        digest_entries.extend(result.get("digest") or [])
+        failed_shards += cint(context.get("shard_failed"))
+
+    if failed_shards and failed_shards >= len(shard_results):
+        log_context["status"] = "Failed"
+    elif failed_shards:
+        log_context["status"] = "Partial Failures"
+
+    try:
+        settings = frappe.get_single("Document Alert Settings")
+        _finalize_alert_run(settings, log_context, digest_entries, getdate(today))
+    finally:
+        cache.delete_value(run_key)
+        AlertRunLock.release_run(run_id)
+
+
+class _StageTimer:
+    """Accumulates wall-clock seconds per pipeline stage (into ``timings`` when given)."""
+
+    def __init__(self, timings=None):
+        self.timings = timings if timings is not None else {}
+        self.rows_fetched = 0
+
+    @contextmanager
+    def stage(self, name):
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0) + perf_counter() - started
+
+
+def _start_run_metrics(settings, log_context):
+    """Start the run clock and, unless disabled in settings, trace peak memory."""
+    log_context["_run_started"] = perf_counter()
+
+    trace_memory = settings.get("trace_alert_memory")
+    # unset on sites migrated before the field existed; the field defaults to on
+    if trace_memory is not None and not cint(trace_memory):
+        return
+
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    else:
+        tracemalloc.start()
+        log_context["_tracing_started"] = True
+    log_context["_tracing"] = True
+
+
+def _stop_run_metrics(log_context):
+    """Store run duration and peak traced memory on the context (once per started run)."""
+    started = log_context.pop("_run_started", None)
+    if started is None:
+        return
+
+    log_context["run_seconds"] += perf_counter() - started
+    if log_context.pop("_tracing", False):
+        log_context["peak_memory"] = max(log_context["peak_memory"], tracemalloc.get_traced_memory()[1])
+        if log_context.pop("_tracing_started", False):
+            tracemalloc.stop()
+
+
+def _record_send_timing(log_context, channel, bundle, seconds, recipients=0):
+    _add_slow_send(
+        log_context,
+        {
+            "channel": channel,
+            "reference_doctype": bundle.get("parenttype"),
+            "reference_name": bundle.get("parent"),
+            "recipients": recipients,
+            "seconds": round(seconds, 4),
+        },
+    )
+
+
+def _add_slow_send(log_context, entry):
+    slowest = log_context["slowest_sends"]
+    slowest.append(entry)
+    if len(slowest) > SLOWEST_SENDS_LIMIT:
+        slowest.sort(key=lambda d: d["seconds"], reverse=True)
+        del slowest[SLOWEST_SENDS_LIMIT:]
+
+
+def _time_stage(timer, name):
+    return timer.stage(name) if timer else nullcontext()
+
+
+def _get_run_cache_key(run_id):
+    return f"document_alert_run:{run_id}"
+
+
+def _merge_alert_context(target, source):
+    for key in ALERT_COUNTER_KEYS:
+        target[key] = (target.get(key) or 0) + (source.get(key) or 0)
+    target["failure_details"].extend(source.get("failure_details") or [])
+    target["email_queue_names"].extend(source.get("email_queue_names") or [])
+    target["scheduled_names"].extend(source.get("scheduled_names") or [])
+    target["alert_runs"].extend(source.get("alert_runs") or [])
+    target["details"].extend(source.get("details") or [])
+
+    target["run_seconds"] += source.get("run_seconds") or 0
+    target["rows_fetched"] += source.get("rows_fetched") or 0
+    target["peak_memory"] = max(target["peak_memory"], source.get("peak_memory") or 0)
+    for stage, seconds in (source.get("timings") or {}).items():
+        target["timings"][stage] = target["timings"].get(stage, 0) + seconds
+    for entry in source.get("slowest_sends") or []:
+        _add_slow_send(target, entry)
+
+
+def _process_alert_bundles(settings, today, log_context, shard=None, checkpoint=None, digest_entries=None):
+    """Send every due bundle (optionally of a single shard) and count the outcome on ``log_context``.
+
+    With a ``checkpoint`` the run continues after its saved registration cursors and
+    saves progress at chunk boundaries. Returns the bundle copies meant for the
+    consolidated admin digest.
+    """
+    schedule_updates: dict = {}
+    timer = _StageTimer(log_context["timings"])
+    progress = _RunProgress(checkpoint, log_context) if checkpoint else None
+    # Bundles are streamed chunk by chunk, so never materialise the full list here
+    bundles = chain(
+        _build_customer_bundles(today, schedule_updates, shard=shard, timer=timer, progress=progress),
+        _build_employee_bundles(today, schedule_updates, shard=shard, timer=timer, progress=progress),
+    )
+
+    failure_details = log_context["failure_details"]
+    admin_recipients = _get_admin_emails(settings)
+    admin_mobiles = _get_admin_mobiles(settings)
+    consolidate_admin_email = _should_consolidate_admin_email(settings, admin_recipients)
+    admin_digest_entries: list[dict] = list(digest_entries or [])
+    sms_dispatcher = _get_sms_dispatcher(settings)
+    sms_merger = _SMSMerger.from_settings(settings)
+    phone_normalizer = PhoneNormalizer.from_settings(settings) if settings.enable_sms else None
+    email_template = _get_email_template(settings) if settings.enable_email else None
+    _open_sending_window(settings, log_context, today)
+    # held sends skip the Email Queue, so do not build its rows now
+    email_batch = EmailQueueBatch(build_queue_rows=not log_context["sending_window"])
+    email_grouper = _EmailGrouper() if _should_group_employee_emails(settings) else None
+    # one lookup per run/shard; reruns on the same day skip what already went out
+    ledger = SendLedger(today)
+
+    # keeps the lock and checkpoint_at fresh while long, rate-limited flushes run
+    heartbeat = checkpoint.touch if checkpoint else None
+
+    def flush_buffers():
+        with timer.stage("email_queue"):
+            if email_grouper is not None:
+                _flush_email_groups(email_grouper, email_batch, log_context, ledger, heartbeat)
+            _flush_email_batch(email_batch, log_context, ledger, heartbeat)
+        with timer.stage("sms"):
+            _flush_sms_jobs(sms_dispatcher, sms_merger, log_context, ledger, heartbeat)
+        log_context["email_queue_names"].extend(email_batch.queued_names)
+        email_batch.queued_names = []
+        log_context["rows_fetched"] += timer.rows_fetched
+        timer.rows_fetched = 0
+        _flush_alert_retries(log_context, today)
+
+        # Move every evaluated row past today so a rerun only picks up unsent rows
+        with timer.stage("schedule_update"):
+            apply_next_alert_dates(schedule_updates)
+        schedule_updates.clear()
+
+    def save_checkpoint(cursor):
+        # called between chunks: every bundle aggregated so far has been handled
+        flush_buffers()
+        with timer.stage("checkpoint"):
+            details, log_context["details"] = log_context["details"], []
+            checkpoint.save(
+                _get_checkpoint_context(log_context),
+                details,
+                admin_digest_entries,
+                cursor,
+                log_context["total_records"],
+            )
+
+    if progress:
+        progress.on_save = save_checkpoint
+
+    for bundle in bundles:
+        log_context["total_records"] += 1
+        rownames = _get_bundle_rownames(bundle)
+
+        with timer.stage("recipients"):
             # make sure the latest admin contacts are attached before sending
+            add_to_digest = False
             if settings.enable_email:
                 if consolidate_admin_email:
-                    admin_digest_entries.append(_clone_bundle_for_digest(bundle))
+                    add_to_digest = bool(ledger.filter_unsent(rownames, "Email", admin_recipients))
                 else:
                     bundle["email_recipients"].update(admin_recipients)
+            sms_recipients = []
             if settings.enable_sms:
-                bundle["sms_recipients"].update(_get_admin_mobiles(settings))
+                bundle["sms_recipients"].update(admin_mobiles)
+                # one spelling per number, so nobody gets the same alert twice
+                bundle["sms_recipients"] = set(phone_normalizer.normalize_all(bundle["sms_recipients"]))
+                sms_recipients = _filter_unsent(ledger, log_context, rownames, "SMS", bundle["sms_recipients"])
+
+            email_recipients = _filter_unsent(ledger, log_context, rownames, "Email", bundle["email_recipients"])
 
-            email_recipients = sorted(bundle["email_recipients"])
-            sms_recipients = sorted(bundle["sms_recipients"])
+        if add_to_digest:
+            with timer.stage("render"):
+                # rendered once; the recipient email and the admin digest share the fragment
+                _render_bundle_fragment(bundle, email_template)
+            admin_digest_entries.append(_clone_bundle_for_digest(bundle))
 
-            if settings.enable_email and email_recipients:
+        if email_grouper is not None and email_recipients and _is_employee_bundle(bundle):
+            try:
+                with timer.stage("render"):
+                    email_grouper.add(email_recipients, bundle, email_template)
+            except Exception as exc:
                 log_context["email_attempts"] += 1
-                try:
-                    if _send_email_alert(bundle, recipients=email_recipients):
-                        email_count += 1
-                        _record_alert_detail(
-                            log_context,
-                            "Email",
-                            email_recipients,
-                            bundle,
-                            "Sent",
-                        )
-                except Exception as exc:
-                    email_failures += 1
-                    _capture_alert_failure(
-                        failure_details,
-                        "Email",
-                        bundle,
-                        exc,
-                        "Document Alert Email Failure",
-                    )
-                    _record_alert_detail(
-                        log_context,
-                        "Email",
-                        email_recipients,
-                        bundle,
-                        "Failed",
-                        cstr(exc),
-                    )
+                log_context["emails_failed"] += 1
+                _capture_alert_failure(failure_details, "Email", bundle, exc, "Document Alert Email Failure")
+                _record_alert_detail(log_context, "Email", email_recipients, bundle, "Failed", cstr(exc))
 
-            if settings.enable_sms and sms_recipients:
-                log_context["sms_attempts"] += 1
-                try:
-                    if _send_sms_alert(bundle, settings, recipients=sms_recipients):
-                        sms_count += 1
-                        _record_alert_detail(
-                            log_context,
-                            "SMS",
-                            sms_recipients,
-                            bundle,
-                            "Sent",
-                        )
-                except Exception as exc:
-                    sms_failures += 1
-                    _capture_alert_failure(
-                        failure_details,
-                        "SMS",
-                        bundle,
-                        exc,
-                        "Document Alert SMS Failure",
-                    )
-                    _record_alert_detail(
-                        log_context,
-                        "SMS",
-                        sms_recipients,
-                        bundle,
-                        "Failed",
-                        cstr(exc),
-                    )
+            if len(email_grouper) >= EMAIL_GROUP_FLUSH_SIZE:
+                with timer.stage("email_queue"):
+                    _flush_email_groups(email_grouper, email_batch, log_context, ledger, heartbeat)
 
-        if consolidate_admin_email and admin_digest_entries:
+        elif settings.enable_email and email_recipients:
             log_context["email_attempts"] += 1
+            message = None
             try:
-                if _send_admin_digest_email(admin_recipients, admin_digest_entries):
-                    email_count += 1
-                    _record_alert_detail(
-                        log_context,
-                        "Email",
-                        admin_recipients,
-                        {"title": "Admin Summary", "parent": "Document Alert Settings"},
-                        "Sent",
-                    )
+                with timer.stage("render"):
+                    message = _render_email_body(bundle, template=email_template)
+                started = perf_counter()
+                with timer.stage("email_queue"):
+                    _queue_email_alert(email_batch, bundle, recipients=email_recipients, message=message)
+                _record_send_timing(log_context, "Email", bundle, perf_counter() - started, len(email_recipients))
             except Exception as exc:
-                email_failures += 1
+                log_context["emails_failed"] += 1
                 _capture_alert_failure(
                     failure_details,
                     "Email",
-                    {"title": "Admin Summary"},
+                    bundle,
                     exc,
-                    "Document Alert Admin Digest Failure",
+                    "Document Alert Email Failure",
                 )
                 _record_alert_detail(
                     log_context,
                     "Email",
-                    admin_recipients,
-                    {"title": "Admin Summary"},
+                    email_recipients,
+                    bundle,
                     "Failed",
                     cstr(exc),
                 )
+                # a template error would fail again, so only rendered messages are retried
+                if message:
+                    _add_retry(
+                        log_context,
+                        "Email",
+                        _get_bundle_reference(bundle),
+                        email_recipients,
+                        message,
+                        cstr(exc),
+                        subject=_get_email_subject(bundle),
+                    )
+
+            if email_batch.is_full:
+                with timer.stage("email_queue"):
+                    _flush_email_batch(email_batch, log_context, ledger, heartbeat)
+
+        if settings.enable_sms and sms_recipients:
+            with timer.stage("render"):
+                sms_merger.add(sms_recipients, _build_sms_section(bundle))
+            if len(sms_merger) >= SMS_FLUSH_SIZE:
+                with timer.stage("sms"):
+                    _flush_sms_jobs(sms_dispatcher, sms_merger, log_context, ledger, heartbeat)
 
-        log_context["emails_sent"] = email_count
-        log_context["sms_sent"] = sms_count
-        log_context["emails_failed"] = email_failures
-        log_context["sms_failed"] = sms_failures
+    flush_buffers()
+    return admin_digest_entries
 
-        derived_email_pending = max(
-            log_context["email_attempts"] - email_count - email_failures,
-            0,
+
+class _RunProgress:
+    """Registration cursors of a checkpointed run, saved at chunk boundaries now and then.
+
+    ``_iter_registration_row_chunks`` reports a chunk as done only once the consumer
+    asks for the next one, i.e. after every bundle of the chunk went through the loop.
+    """
+
+    def __init__(self, checkpoint, log_context):
+        self.checkpoint = checkpoint
+        self.log_context = log_context
+        self.resume_cursor = dict(checkpoint.cursor)
+        self.cursor = dict(checkpoint.cursor)
+        self.on_save = None
+        self._saved_bundles = log_context["total_records"]
+        self._saved_at = perf_counter()
+
+    def start_after(self, parenttype):
+        return self.resume_cursor.get(parenttype) or ""
+
+    def chunk_done(self, parenttype, last_parent):
+        self.cursor[parenttype] = last_parent
+        bundles = self.log_context["total_records"]
+        if bundles - self._saved_bundles < CHECKPOINT_BUNDLES and perf_counter() - self._saved_at < CHECKPOINT_SECONDS:
+            self.checkpoint.touch()
+            return
+
+        self.on_save(self.cursor)
+        self._saved_bundles = bundles
+        self._saved_at = perf_counter()
+
+
+def _get_sms_dispatcher(settings):
+    """Return the pooled SMS dispatcher, or ``None`` to fall back to one-by-one sends."""
+    if not settings.enable_sms:
+        return None
+
+    try:
+        return SMSDispatcher.from_settings(settings)
+    except Exception:
+        frappe.log_error(frappe.get_traceback(), "Document Alert SMS Dispatcher Failure")
+        return None
+
+
+def _filter_unsent(ledger, log_context, rownames, channel, recipients):
+    recipients = sorted(recipients)
+    unsent = ledger.filter_unsent(rownames, channel, recipients)
+    log_context["duplicates_skipped"] += len(recipients) - len(unsent)
+    return unsent
+
+
+def _get_bundle_rownames(bundle):
+    return [doc.get("rowname") for doc in bundle.get("documents") or [] if doc.get("rowname")]
+
+
+def _flush_sms_jobs(dispatcher, merger, log_context, ledger=None, heartbeat=None):
+    """Send the merged SMS messages and record each outcome on the log.
+
+    Without a pooled dispatcher the messages go out one by one through ``frappe.send_sms``.
+    Messages go out in batches of ``SMS_SEND_BATCH_SIZE`` with a ``heartbeat`` after each.
+    """
+    jobs = merger.build_jobs()
+    if not jobs:
+        return
+
+    log_context["sms_attempts"] += len(jobs)
+    if log_context.get("sending_window"):
+        _schedule_sends(
+            log_context,
+            "SMS",
+            [
+                {"channel": "SMS", "reference": job.reference, "recipients": job.recipients, "message": job.message}
+                for job in jobs
+            ],
         )
-        log_context["email_queue_pending"] = max(
-            _count_pending_email_queue(),
-            derived_email_pending,
+        return
+
+    for start in range(0, len(jobs), SMS_SEND_BATCH_SIZE):
+        _send_sms_batch(dispatcher, jobs[start : start + SMS_SEND_BATCH_SIZE], log_context, ledger)
+        if heartbeat:
+            heartbeat()
+
+
+def _send_sms_batch(dispatcher, jobs, log_context, ledger=None):
+    if dispatcher:
+        dispatcher.send(jobs)
+    else:
+        _send_sms_jobs_one_by_one(jobs)
+
+    for job in jobs:
+        reference = job.reference
+        if dispatcher:
+            try:
+                log_sms_job(job)
+            except Exception:
+                frappe.log_error(frappe.get_traceback(), "Document Alert SMS Log Failure")
+
+        _record_send_timing(log_context, "SMS", reference, job.elapsed, len(job.recipients))
+        if job.sent:
+            for bundle in reference.get("bundles") or [reference]:
+                _record_alert_detail(log_context, "SMS", job.sent, bundle, "Sent")
+                if ledger:
+                    ledger.record(bundle.get("rownames"), "SMS", job.sent, bundle)
+
+        log_context["sms_segments"] += job.segments * len(job.sent)
+        if job.ok:
+            log_context["sms_sent"] += 1
+            continue
+
+        log_context["sms_failed"] += 1
+        failed = [number for number in job.recipients if number not in job.sent]
+        error_message = job.error_message or "SMS gateway did not accept any recipient."
+        _record_batch_failure(log_context, "SMS", reference, error_message, "Document Alert SMS Failure")
+        for bundle in reference.get("bundles") or [reference]:
+            _record_alert_detail(log_context, "SMS", failed, bundle, "Failed", error_message)
+        _add_retry(log_context, "SMS", reference, failed, job.message, error_message)
+
+    if ledger:
+        # the messages already left the gateway, so persist the ledger right away
+        frappe.db.commit()
+
+
+def _send_sms_jobs_one_by_one(jobs):
+    for job in jobs:
+        job.recipients = sorted(job.recipients)
+        started = perf_counter()
+        try:
+            _send_sms_message(job.recipients, job.message)
+        except Exception as exc:
+            job.errors.append(cstr(exc))
+            frappe.log_error(frappe.get_traceback(), "Document Alert SMS Failure")
+        else:
+            job.sent = list(job.recipients)
+        job.elapsed = perf_counter() - started
+
+
+class _SMSMerger:
+    """Collects each bundle's SMS per recipient so a number gets one combined message.
+
+    Recipients with the same bundles share a job, which keeps multi-recipient gateway
+    requests possible. ``pack_sections`` decides how the combined documents are split
+    into messages and trims them to the per-recipient ``segment_budget``.
+    """
+
+    def __init__(self, signature=None, segment_budget=0):
+        self.signature = cstr(signature).strip()
+        self.segment_budget = max(cint(segment_budget), 0)
+        self.parts: list = []
+        self.by_recipient = defaultdict(list)
+
+    @classmethod
+    def from_settings(cls, settings):
+        budget = settings.get("sms_segment_budget")
+        # unset on sites migrated before the field existed; the field defaults to 3
+        return cls(settings.sms_signature, 3 if budget is None else budget)
+
+    def __len__(self):
+        return len(self.parts)
+
+    def add(self, recipients, section):
+        index = len(self.parts)
+        self.parts.append(section)
+        for number in recipients:
+            self.by_recipient[number].append(index)
+
+    def build_jobs(self):
+        grouped = defaultdict(list)
+        for number, indexes in self.by_recipient.items():
+            grouped[tuple(indexes)].append(number)
+
+        jobs = []
+        for indexes, recipients in grouped.items():
+            packed = pack_sections(
+                [self.parts[index] for index in indexes],
+                signature=self.signature,
+                budget=self.segment_budget,
+            )
+            for sms in packed:
+                jobs.append(
+                    SMSJob(
+                        recipients=recipients,
+                        message=sms.message,
+                        reference=_merge_bundle_references(sms.references),
+                        segments=sms.segments,
+                    )
+                )
+
+        self.parts = []
+        self.by_recipient.clear()
+        return jobs
+
+
+def _merge_bundle_references(references, title=None):
+    if len(references) == 1:
+        return references[0]
+
+    return {
+        "parent": None,
+        "parenttype": None,
+        "title": title or ", ".join(cstr(reference.get("title")) for reference in references),
+        "rownames": [rowname for reference in references for rowname in reference.get("rownames") or []],
+        "bundles": references,
+    }
+
+
+def _flush_email_batch(email_batch, log_context, ledger=None, heartbeat=None):
+    """Write the buffered alert emails to the Email Queue and record each outcome on the log.
+
+    During a sending window run the emails are stored for the window instead.
+    """
+    if log_context.get("sending_window"):
+        emails, email_batch.pending = email_batch.pending, []
+        _schedule_sends(
+            log_context,
+            "Email",
+            [
+                {
+                    "channel": "Email",
+                    "reference": email.reference,
+                    "recipients": email.recipients,
+                    "message": email.message,
+                    "subject": email.subject,
+                }
+                for email in emails
+            ],
         )
-        log_context["sms_pending"] = max(
-            log_context["sms_attempts"] - sms_count - sms_failures,
-            0,
+        return
+
+    for email in email_batch.flush():
+        reference = email.reference
+        if email.skipped:
+            # nobody left to receive it: not delivered, so neither counted nor ledgered
+            log_context["email_attempts"] -= 1
+            for bundle in reference.get("bundles") or [reference]:
+                _record_alert_detail(
+                    log_context, "Email", email.recipients, bundle, "Skipped", EMAIL_SKIPPED_MESSAGE
+                )
+            continue
+
+        if email.ok:
+            log_context["emails_sent"] += 1
+            for bundle in reference.get("bundles") or [reference]:
+                _record_alert_detail(log_context, "Email", email.recipients, bundle, "Sent")
+                if ledger:
+                    ledger.record(bundle.get("rownames"), "Email", email.recipients, bundle)
+            continue
+
+        log_context["emails_failed"] += 1
+        _record_batch_failure(log_context, "Email", reference, email.error, "Document Alert Email Failure")
+        for bundle in reference.get("bundles") or [reference]:
+            _record_alert_detail(log_context, "Email", email.recipients, bundle, "Failed", email.error)
+        _add_retry(
+            log_context, "Email", reference, email.recipients, email.message, email.error, subject=email.subject
         )
 
-        frappe.logger().info(
-            "Document alerts: %s email(s) and %s SMS alert(s) sent for %s record(s).",
-            email_count,
-            sms_count,
-            len(bundles),
+    if heartbeat:
+        heartbeat()
+
+
+def _should_group_employee_emails(settings):
+    return bool(settings.enable_email and cint(settings.get("group_employee_emails")))
+
+
+def _is_employee_bundle(bundle):
+    return bundle.get("parenttype") == "Customer Employee Registration"
+
+
+class _EmailGrouper:
+    """Collects employee bundles per email recipient so each address gets one email per run.
+
+    Like ``_SMSMerger``, recipients with the same bundles share one email. Only the
+    rendered document table of a bundle is kept (see ``_clone_bundle_for_digest``).
+    """
+
+    def __init__(self):
+        self.bundles: list[dict] = []
+        self.by_recipient = defaultdict(list)
+
+    def __len__(self):
+        return len(self.bundles)
+
+    def add(self, recipients, bundle, template=None):
+        _render_bundle_fragment(bundle, template)
+        index = len(self.bundles)
+        self.bundles.append(_clone_bundle_for_digest(bundle))
+        for recipient in recipients:
+            self.by_recipient[recipient].append(index)
+
+    def build(self):
+        """Return ``(recipients, bundles)`` pairs, one per email to queue."""
+        grouped = defaultdict(list)
+        for recipient, indexes in self.by_recipient.items():
+            grouped[tuple(indexes)].append(recipient)
+
+        groups = [
+            (sorted(recipients), [self.bundles[index] for index in indexes])
+            for indexes, recipients in grouped.items()
+        ]
+        self.bundles = []
+        self.by_recipient.clear()
+        return groups
+
+
+def _flush_email_groups(email_grouper, email_batch, log_context, ledger=None, heartbeat=None):
+    """Queue one email per group of recipients that share the same employee bundles."""
+    for recipients, bundles in email_grouper.build():
+        log_context["email_attempts"] += 1
+        reference = _merge_bundle_references(
+            [_get_bundle_reference(bundle) for bundle in bundles],
+            title=_get_grouped_email_title(bundles),
         )
+        message = None
+        try:
+            if len(bundles) == 1:
+                subject = _get_email_subject(bundles[0])
+                message = _render_email_body(bundles[0])
+            else:
+                subject = f"Document Expiry Alert - {reference['title']}"
+                message = _render_digest_body(bundles)
+
+            started = perf_counter()
+            email_batch.add(
+                recipients=recipients,
+                subject=subject,
+                message=message,
+                reference=reference,
+                reference_doctype=reference.get("parenttype"),
+                reference_name=reference.get("parent"),
+            )
+            _record_send_timing(log_context, "Email", reference, perf_counter() - started, len(recipients))
+        except Exception as exc:
+            log_context["emails_failed"] += 1
+            _capture_alert_failure(
+                log_context["failure_details"], "Email", reference, exc, "Document Alert Email Failure"
+            )
+            for bundle in reference.get("bundles") or [reference]:
+                _record_alert_detail(log_context, "Email", recipients, bundle, "Failed", cstr(exc))
+            if message:
+                _add_retry(log_context, "Email", reference, recipients, message, cstr(exc), subject=subject)
+
+        if email_batch.is_full:
+            _flush_email_batch(email_batch, log_context, ledger, heartbeat)
+
+
+def _get_grouped_email_title(bundles):
+    customers = {bundle.get("customer_name") for bundle in bundles}
+    label = f"{len(bundles)} employees"
+    if len(customers) == 1 and None not in customers and "" not in customers:
+        return f"{customers.pop()} ({label})"
+    return label
+
+
+def _add_retry(log_context, channel, reference, recipients, message, error, subject=None):
+    """Remember a failed send; the retries are stored once the current batch is done."""
+    log_context["retries"].append(
+        {
+            "channel": channel,
+            "reference": reference,
+            "recipients": list(recipients or []),
+            "message": message,
+            "subject": subject,
+            "error": error,
+        }
+    )
 
-        _create_alert_log(log_context)
 
-    except Exception as err:
-        log_context["status"] = "Failed"
-        log_context["failure_details"].append(cstr(err))
-        frappe.log_error(frappe.get_traceback(), "Document Alert Scheduler Failure")
+def _flush_alert_retries(log_context, today):
+    retries, log_context["retries"] = log_context["retries"], []
+    if not retries:
+        return
+
+    try:
+        log_context["retries_queued"] += len(queue_alert_retries(retries, today))
+    except Exception:
+        frappe.log_error(frappe.get_traceback(), "Document Alert Retry Queue Failure")
+
+
+def _open_sending_window(settings, log_context, today):
+    """Hold this run's sends for the sending window when one is configured."""
+    if log_context.get("sending_window"):
+        return
+
+    window = SendingWindow.from_settings(settings)
+    if window:
+        log_context["sending_window"] = {"alert_date": today, "opens_at": window.next_opening(now_datetime())}
+
+
+def _schedule_sends(log_context, channel, entries):
+    """Store rendered sends for the sending window; they count as pending on the log."""
+    if not entries:
+        return
+
+    window = log_context["sending_window"]
+    try:
+        names = queue_alert_retries(entries, window["alert_date"], next_attempt_at=window["opens_at"])
+    except Exception as exc:
+        frappe.log_error(frappe.get_traceback(), "Document Alert Scheduling Failure")
+        log_context["emails_failed" if channel == "Email" else "sms_failed"] += len(entries)
+        for entry in entries:
+            reference = entry["reference"]
+            _record_batch_failure(log_context, channel, reference, cstr(exc), "Document Alert Scheduling Failure")
+            for bundle in reference.get("bundles") or [reference]:
+                _record_alert_detail(log_context, channel, entry["recipients"], bundle, "Failed", cstr(exc))
+        return
+
+    log_context["scheduled_sends"] += len(names)
+    log_context["scheduled_names"].extend(names)
+
+
+def _record_batch_failure(log_context, channel, bundle, error_message, title):
+    label = f"{bundle.get('title') or bundle.get('parent')} ({bundle.get('parenttype')})"
+    log_context["failure_details"].append(f"{channel}: {label} -> {error_message}")
+    frappe.log_error(error_message, title)
+
+
+def _get_bundle_reference(bundle):
+    return {
+        "parent": bundle.get("parent"),
+        "parenttype": bundle.get("parenttype"),
+        "title": bundle.get("title"),
+        "rownames": _get_bundle_rownames(bundle),
+    }
+
+
+def _should_consolidate_admin_email(settings, admin_recipients):
+    return bool(
+        settings.enable_email
+        and cint(settings.get("consolidate_admin_email"))
+        and admin_recipients
+    )
+
+
+def _finalize_alert_run(settings, log_context, digest_entries, today):
+    """Send the admin digest, snapshot the queues and write the Document Alert Log."""
+    if not log_context["total_records"]:
+        frappe.logger().info("Document alerts: no expiring documents found.")
+        if not log_context.get("status"):
+            log_context["status"] = "Skipped"
+        log_context["failure_details"].append("No expiring documents matched the alert window.")
         _create_alert_log(log_context)
-        raise
+        return
+
+    failure_details = log_context["failure_details"]
+    admin_recipients = _get_admin_emails(settings)
+    timer = _StageTimer(log_context["timings"])
+    _open_sending_window(settings, log_context, today)
+
+    if digest_entries and _should_consolidate_admin_email(settings, admin_recipients):
+        log_context["email_attempts"] += 1
+        email_batch = EmailQueueBatch()
+        try:
+            with timer.stage("render"):
+                _queue_admin_digest_email(email_batch, admin_recipients, digest_entries)
+            with timer.stage("email_queue"):
+                _flush_email_batch(email_batch, log_context, SendLedger(today))
+            log_context["email_queue_names"].extend(email_batch.queued_names)
+        except Exception as exc:
+            log_context["emails_failed"] += 1
+            _capture_alert_failure(
+                failure_details,
+                "Email",
+                {"title": "Admin Summary"},
+                exc,
+                "Document Alert Admin Digest Failure",
+            )
+            _record_alert_detail(
+                log_context,
+                "Email",
+                admin_recipients,
+                {"title": "Admin Summary"},
+                "Failed",
+                cstr(exc),
+            )
+
+    derived_email_pending = max(
+        log_context["email_attempts"] - log_context["emails_sent"] - log_context["emails_failed"],
+        0,
+    )
+    _flush_alert_retries(log_context, today)
+
+    with timer.stage("queue_snapshot"):
+        log_context["email_queue_pending"] = max(
+            _count_pending_email_queue(log_context.get("email_queue_names")),
+            derived_email_pending,
+        )
+    log_context["sms_pending"] = max(
+        log_context["sms_attempts"] - log_context["sms_sent"] - log_context["sms_failed"],
+        0,
+    )
+
+    frappe.logger().info(
+        "Document alerts: %s email(s) and %s SMS alert(s) sent for %s record(s).",
+        log_context["emails_sent"],
+        log_context["sms_sent"],
+        log_context["total_records"],
+    )
+
+    _create_alert_log(log_context)
 
 
-def _build_customer_bundles(today):
-    rows = frappe.db.sql(
+def _build_customer_bundles(today, schedule_updates=None, shard=None, timer=None, progress=None):
+    for rows in _iter_registration_row_chunks(
         """
         select
             parent.name as parent,
@@ -259,6 +1368,7 @@ def _build_customer_bundles(today):
             child.document_number,
             child.alert_repeat_interval,
             dt.document_name,
+            dt.short_code,
             child.expiry_date,
             child.alert_days,
             child.notes,
@@ -271,27 +1381,41 @@ def _build_customer_bundles(today):
             and child.parentfield = 'document_details'
         left join `tabDocument Type Master` dt
             on dt.name = child.document_type
-        where parent.docstatus < 2
+        where parent.name in %(parents)s
+            and parent.docstatus < 2
             and parent.active = 1
             and child.expiry_date is not null
+            and child.next_alert_date <= %(today)s
         """,
-        as_dict=True,
-    )
-
-    return _aggregate_rows(
-        rows=rows,
         parenttype="Customer Document Registration",
-        title_fn=lambda d: d.customer_name or d.customer or d.parent,
-        email_flag="enable_email_alert",
-        sms_flag="enable_sms_alert",
-        email_fields=("customer_email", "extra_email"),
-        sms_fields=("customer_mobile", "extra_mobile"),
         today=today,
-    )
-
+        shard=shard,
+        timer=timer,
+        progress=progress,
+    ):
+        with _time_stage(timer, "aggregate"):
+            bundles = _aggregate_rows(
+                rows=rows,
+                parenttype="Customer Document Registration",
+                title_fn=lambda d: d.customer_name or d.customer or d.parent,
+                email_flag="enable_email_alert",
+                sms_flag="enable_sms_alert",
+                email_fields=("customer_email", "extra_email"),
+                sms_fields=("customer_mobile", "extra_mobile"),
+                today=today,
+                schedule_updates=schedule_updates,
+            )
+        yield from bundles
+
+
+def _build_employee_bundles(
+    today, schedule_updates=None, shard=None, customer_contacts=None, timer=None, progress=None
+):
+    if customer_contacts is None:
+        with _time_stage(timer, "recipients"):
+            customer_contacts = get_customer_alert_contacts()
 
-def _build_employee_bundles(today):
-    rows = frappe.db.sql(
+    for rows in _iter_registration_row_chunks(
         """
         select
             parent.name as parent,
@@ -303,27 +1427,12 @@ def _build_employee_bundles(today):
             parent.extra_mobile,
             parent.notify_employee_email,
             parent.notify_employee_sms,
-            cdr.customer_email as customer_alert_email,
-            cdr.extra_email as customer_alert_extra_email,
-            cdr.customer_mobile as customer_alert_mobile,
-            cdr.extra_mobile as customer_alert_extra_mobile,
-            case
-                when ifnull(cdr.enable_email_alert, 0) = 1
-                    and ifnull(cdr.employee_email_alert, 0) = 1
-                then 1
-                else 0
-            end as customer_employee_email_allowed,
-            case
-                when ifnull(cdr.enable_sms_alert, 0) = 1
-                    and ifnull(cdr.employee_sms_alert, 0) = 1
-                then 1
-                else 0
-            end as customer_employee_sms_allowed,
             child.name as rowname,
             child.document_type,
             child.document_number,
             child.alert_repeat_interval,
             dt.document_name,
+            dt.short_code,
             child.expiry_date,
             child.alert_days,
             child.notes,
@@ -336,42 +1445,104 @@ def _build_employee_bundles(today):
             and child.parentfield = 'document_details'
         left join `tabDocument Type Master` dt
             on dt.name = child.document_type
-        left join `tabCustomer Document Registration` cdr
-            on cdr.customer = parent.customer_name
-        where parent.docstatus < 2
+        where parent.name in %(parents)s
+            and parent.docstatus < 2
             and parent.active = 1
             and child.expiry_date is not null
+            and child.next_alert_date <= %(today)s
         """,
-        as_dict=True,
-    )
-
-    # The scheduler already injects admin contacts, so only include employee contacts
-    return _aggregate_rows(
-        rows=rows,
         parenttype="Customer Employee Registration",
-        title_fn=lambda d: d.full_name or d.customer_name or d.parent,
-        email_flag="notify_employee_email",
-        sms_flag="notify_employee_sms",
-        email_fields=("email_id", "extra_email"),
-        sms_fields=("mobile_number", "extra_mobile"),
         today=today,
-        extra_email_sources=(
-            (
-                "customer_employee_email_allowed",
-                ("customer_alert_email", "customer_alert_extra_email"),
-            ),
-        ),
-        extra_sms_sources=(
-            (
-                "customer_employee_sms_allowed",
-                ("customer_alert_mobile", "customer_alert_extra_mobile"),
-            ),
-        ),
-    )
+        shard=shard,
+        timer=timer,
+        progress=progress,
+    ):
+        # The scheduler already injects admin contacts, so only include employee contacts
+        with _time_stage(timer, "aggregate"):
+            bundles = _aggregate_rows(
+                rows=rows,
+                parenttype="Customer Employee Registration",
+                title_fn=lambda d: d.full_name or d.customer_name or d.parent,
+                email_flag="notify_employee_email",
+                sms_flag="notify_employee_sms",
+                email_fields=("email_id", "extra_email"),
+                sms_fields=("mobile_number", "extra_mobile"),
+                today=today,
+                schedule_updates=schedule_updates,
+                customer_contacts=customer_contacts,
+            )
+        yield from bundles
+
+
+def _iter_registration_row_chunks(
+    query, parenttype, today, shard=None, chunk_size=None, timer=None, progress=None
+):
+    """Yield the rows of ``query`` a few hundred registrations at a time.
+
+    Registrations are paged by name (keyset on ``Document Detail.parent``) so every
+    chunk holds complete registrations and can be aggregated on its own. ``query``
+    must filter on ``parent.name in %(parents)s``. ``shard`` is an ``(index, count)``
+    pair that keeps only the registrations whose customer hashes into that shard.
+    ``progress`` (a ``_RunProgress``) resumes after its cursor and hears about every
+    chunk the caller has finished.
+    """
+    chunk_size = chunk_size or BUNDLE_CHUNK_SIZE
+    params = {
+        "parenttype": parenttype,
+        "today": today,
+        "last_parent": progress.start_after(parenttype) if progress else "",
+        "limit": chunk_size,
+    }
+
+    shard_condition = ""
+    if shard:
+        shard_field = SHARD_KEY_FIELDS[parenttype]
+        shard_condition = (
+            f"and mod(crc32(coalesce(parent.{shard_field}, parent.name)), %(shard_count)s) = %(shard_index)s"
+        )
+        params["shard_index"], params["shard_count"] = shard
+
+    while True:
+        with _time_stage(timer, "query"):
+            parents = frappe.db.sql_list(
+                f"""
+                select distinct child.parent
+                from `tabDocument Detail` child
+                inner join `tab{parenttype}` parent on parent.name = child.parent
+                where child.parenttype = %(parenttype)s
+                    and child.parentfield = 'document_details'
+                    and child.next_alert_date <= %(today)s
+                    and parent.active = 1
+                    and parent.docstatus < 2
+                    and child.parent > %(last_parent)s
+                    {shard_condition}
+                order by child.parent
+                limit %(limit)s
+                """,
+                params,
+            )
+            rows = (
+                frappe.db.sql(query, {"parents": tuple(parents), "today": today}, as_dict=True)
+                if parents
+                else []
+            )
+        if not parents:
+            return
+
+        if timer:
+            timer.rows_fetched += len(rows)
+        if rows:
+            yield rows
+        if progress:
+            progress.chunk_done(parenttype, parents[-1])
+
+        if len(parents) < chunk_size:
+            return
+        params["last_parent"] = parents[-1]
 
 
 def _aggregate_rows(
-    rows: Sequence[Dict],
+    rows: Sequence[dict],
     parenttype: str,
     title_fn,
     email_flag: str,
@@ -379,8 +1550,8 @@ def _aggregate_rows(
     email_fields: Sequence[str],
     sms_fields: Sequence[str],
     today,
-    extra_email_sources: Sequence = None,
-    extra_sms_sources: Sequence = None,
+    schedule_updates: dict | None = None,
+    customer_contacts: dict | None = None,
 ):
     grouped = defaultdict(
         lambda: {
@@ -395,41 +1566,36 @@ def _aggregate_rows(
         }
     )
 
-    for row in rows:
-        entry = _prepare_document_entry(row, today)
-        if not entry:
+    tomorrow = getdate(add_days(today, 1))
+    days_left_column, due_column = evaluate_row_windows(rows, today)
+
+    for row, days_left, due in zip(rows, days_left_column, due_column, strict=True):
+        if schedule_updates is not None and row.get("rowname"):
+            schedule_updates[row.rowname] = get_next_alert_date_for_row(row, tomorrow)
+
+        if not due:
             continue
 
+        entry = _make_document_entry(row, getdate(row.get("expiry_date")), days_left)
+
         bundle = grouped[row.parent]
         if not bundle["parent"]:
             bundle["parent"] = row.parent
             bundle["title"] = title_fn(row) or row.parent
             if row.get("customer_name"):
                 bundle["customer_name"] = row.get("customer_name")
+            if customer_contacts:
+                _merge_customer_contacts(bundle, customer_contacts.get(row.get("customer_name")))
 
         bundle["documents"].append(entry)
 
-        email_sources = []
-        if email_flag:
-            email_sources.append((email_flag, email_fields))
-        if extra_email_sources:
-            email_sources.extend(extra_email_sources)
-
-        for flag, fields in email_sources:
-            if flag and row.get(flag):
-                bundle["allow_email"] = True
-                bundle["email_recipients"].update(_collect_row_contacts(row, fields))
+        if email_flag and row.get(email_flag):
+            bundle["allow_email"] = True
+            bundle["email_recipients"].update(_collect_row_contacts(row, email_fields))
 
-        sms_sources = []
-        if sms_flag:
-            sms_sources.append((sms_flag, sms_fields))
-        if extra_sms_sources:
-            sms_sources.extend(extra_sms_sources)
-
-        for flag, fields in sms_sources:
-            if flag and row.get(flag):
-                bundle["allow_sms"] = True
-                bundle["sms_recipients"].update(_collect_row_contacts(row, fields))
+        if sms_flag and row.get(sms_flag):
+            bundle["allow_sms"] = True
+            bundle["sms_recipients"].update(_collect_row_contacts(row, sms_fields))
 
     bundles = []
     for bundle in grouped.values():
@@ -444,7 +1610,20 @@ def _aggregate_rows(
     return bundles
 
 
+def _merge_customer_contacts(bundle, contacts):
+    if not contacts:
+        return
+
+    if contacts["allow_email"]:
+        bundle["allow_email"] = True
+        bundle["email_recipients"].update(contacts["emails"])
+    if contacts["allow_sms"]:
+        bundle["allow_sms"] = True
+        bundle["sms_recipients"].update(contacts["mobiles"])
+
+
 def _prepare_document_entry(row, today):
+    """Per-row reference for ``evaluate_row_windows``; kept in step with it by the tests."""
     if not row.get("expiry_date"):
         return None
 
@@ -469,6 +1648,10 @@ def _prepare_document_entry(row, today):
     if window_age % repeat_interval != 0:
         return None
 
+    return _make_document_entry(row, expiry, days_left)
+
+
+def _make_document_entry(row, expiry, days_left):
     document_label = (
         row.get("document_name")
         or row.get("document_type")
@@ -476,24 +1659,33 @@ def _prepare_document_entry(row, today):
     )
 
     return {
+        "rowname": row.get("rowname"),
         "document_type": document_label,
         "document_number": row.get("document_number") or "",
+        "short_code": row.get("short_code") or "",
         "expiry_date": expiry,
         "days_left": days_left,
         "notes": row.get("notes") or "",
     }
 
 
-def _send_email_alert(bundle, recipients=None):
+def _queue_email_alert(email_batch, bundle, recipients=None, template=None, message=None):
     recipients = sorted(recipients or bundle["email_recipients"])
     if not recipients:
-        return False
+        return None
 
-    subject = f"Document Expiry Alert - {bundle['title']}"
-    message = _render_email_body(bundle)
+    return email_batch.add(
+        recipients=recipients,
+        subject=_get_email_subject(bundle),
+        message=message or _render_email_body(bundle, template=template),
+        reference=_get_bundle_reference(bundle),
+        reference_doctype=bundle.get("parenttype"),
+        reference_name=bundle.get("parent"),
+    )
 
-    frappe.sendmail(recipients=recipients, subject=subject, message=message)
-    return True
+
+def _get_email_subject(bundle):
+    return f"Document Expiry Alert - {bundle['title']}"
 
 
 def _clone_bundle_for_digest(bundle):
@@ -504,21 +1696,29 @@ def _clone_bundle_for_digest(bundle):
         "customer_name": bundle.get("customer_name"),
         "documents": [doc.copy() for doc in bundle["documents"]],
     }
+    if bundle.get("email_fragment") is not None:
+        digest_bundle["email_fragment"] = bundle["email_fragment"]
     return digest_bundle
 
 
-def _send_admin_digest_email(recipients, bundles):
+def _queue_admin_digest_email(email_batch, recipients, bundles):
     recipients = sorted(recipients or [])
     if not recipients or not bundles:
-        return False
+        return None
 
-    subject = f"Document Expiry Summary - {formatdate(nowdate())}"
-    message = _render_admin_digest_body(bundles)
-    frappe.sendmail(recipients=recipients, subject=subject, message=message)
-    return True
+    return email_batch.add(
+        recipients=recipients,
+        subject=f"Document Expiry Summary - {formatdate(nowdate())}",
+        message=_render_digest_body(bundles),
+        reference={
+            "title": "Admin Summary",
+            "parent": "Document Alert Settings",
+            "rownames": [rowname for bundle in bundles for rowname in _get_bundle_rownames(bundle)],
+        },
+    )
 
 
-def _render_admin_digest_body(bundles):
+def _render_digest_body(bundles):
     sections = []
     for bundle in bundles:
         sections.append(
@@ -536,77 +1736,92 @@ def _render_admin_digest_body(bundles):
     """
 
 
-def _render_email_body(bundle, include_intro=True):
-    link = get_link_to_form(bundle["parenttype"], bundle["parent"])
-    rows_html = []
-    customer_line = ""
-    if bundle.get("customer_name") and bundle.get("parenttype") == "Customer Employee Registration":
-        customer_line = f"<p>Customer: <strong>{escape_html(bundle['customer_name'])}</strong></p>"
-
-    for doc in bundle["documents"]:
-        note = escape_html(doc["notes"]) if doc["notes"] else ""
-        rows_html.append(
-            f"""
-            <tr>
-                <td>{escape_html(doc["document_type"])}</td>
-                <td>{escape_html(doc["document_number"])}</td>
-                <td>{formatdate(doc["expiry_date"])}</td>
-                <td>{_days_label(doc["days_left"])}</td>
-                <td>{note}</td>
-            </tr>
-            """
-        )
-
-    table = (
-        """
-        <table border="1" cellpadding="6" cellspacing="0" style="border-collapse:collapse;">
-            <thead>
-                <tr>
-                    <th>Document</th>
-                    <th>Document Number</th>
-                    <th>Expiry Date</th>
-                    <th>Due In</th>
-                    <th>Notes</th>
-                </tr>
-            </thead>
-            <tbody>
-        """
-        + "".join(rows_html)
-        + """
-            </tbody>
-        </table>
-        """
-    )
-
+def _render_email_body(bundle, include_intro=True, template=None):
     intro = ""
     if include_intro:
         intro = f"<p>The following document(s) for <strong>{escape_html(bundle['title'])}</strong> are due soon:</p>"
 
     return f"""
         {intro}
-        {customer_line}
-        {table}
-        <p>Record: {link}</p>
+        {_render_bundle_fragment(bundle, template)}
     """
 
 
-def _send_sms_alert(bundle, settings, recipients=None):
-    recipients = sorted(recipients or bundle["sms_recipients"])
-    if not recipients:
-        return False
+def _render_bundle_fragment(bundle, template=None):
+    """Render the document table of a bundle once and keep it on the bundle for reuse."""
+    fragment = bundle.get("email_fragment")
+    if fragment is not None:
+        return fragment
+
+    customer_name = ""
+    if bundle.get("parenttype") == "Customer Employee Registration":
+        customer_name = bundle.get("customer_name") or ""
+
+    documents = [
+        {
+            "document_type": doc["document_type"],
+            "document_number": doc["document_number"],
+            "expiry_label": formatdate(doc["expiry_date"]),
+            "due_label": _days_label(doc["days_left"]),
+            "notes": doc["notes"] or "",
+        }
+        for doc in bundle["documents"]
+    ]
+
+    template = template or _get_email_template()
+    fragment = template.render(
+        bundle=bundle,
+        customer_name=customer_name,
+        documents=documents,
+        link=get_link_to_form(bundle["parenttype"], bundle["parent"]),
+    )
+    bundle["email_fragment"] = fragment
+    return fragment
 
-    doc_bits = []
+
+def _get_email_template(settings=None):
+    """Return the compiled alert template (the Document Alert Settings override or the app default)."""
+    if settings is None:
+        settings = frappe.get_cached_doc("Document Alert Settings")
+
+    source = cstr(settings.get("email_template")).strip()
+    return _compile_email_template(source or _get_default_email_template_source())
+
+
+@lru_cache(maxsize=8)
+def _compile_email_template(source):
+    return frappe.get_jenv().from_string(source)
+
+
+@lru_cache(maxsize=1)
+def _get_default_email_template_source():
+    path = frappe.get_app_path("service_workorder", *DEFAULT_EMAIL_TEMPLATE_PATH)
+    with open(path, encoding="utf-8") as template_file:
+        return template_file.read()
+
+
+def _build_sms_message(bundle, settings):
+    """Return the message(s) this bundle alone is packed into, one per line."""
+    merger = _SMSMerger.from_settings(settings)
+    packed = pack_sections([_build_sms_section(bundle)], merger.signature, merger.segment_budget)
+    return "\n".join(sms.message for sms in packed)
+
+
+def _build_sms_section(bundle):
+    items = []
     for doc in bundle["documents"]:
-        doc_bits.append(
-            f"{doc['document_type']} ({formatdate(doc['expiry_date'], 'dd-MMM')})"
+        items.append(
+            SMSItem(
+                label=f"{doc['document_type']} ({formatdate(doc['expiry_date'], 'dd-MMM')})",
+                short_label=(
+                    f"{doc['short_code']} {formatdate(doc['expiry_date'], 'dd/MM')}"
+                    if doc.get("short_code")
+                    else ""
+                ),
+            )
         )
 
-    sms = f"{bundle['title']} doc alert: " + "; ".join(doc_bits)
-    if settings.sms_signature:
-        sms = f"{sms} {settings.sms_signature}"
-
-    _send_sms_message(recipients, sms)
-    return True
+    return SMSSection(title=cstr(bundle["title"]), items=items, reference=_get_bundle_reference(bundle))
 
 
 def _days_label(days):
@@ -635,7 +1850,7 @@ def _get_admin_mobiles(settings):
 
 
 def _collect_contacts(*parts):
-    recipients: List[str] = []
+    recipients: list[str] = []
     seen = set()
 
     for part in parts:
@@ -707,10 +1922,24 @@ def _init_alert_log_context():
         "sms_failed": 0,
         "email_attempts": 0,
         "sms_attempts": 0,
+        "duplicates_skipped": 0,
+        "retries_queued": 0,
+        "sms_segments": 0,
+        "scheduled_sends": 0,
+        "scheduled_names": [],
+        "sending_window": None,
+        "alert_runs": [],
         "email_queue_pending": 0,
         "sms_pending": 0,
+        "email_queue_names": [],
         "failure_details": [],
         "details": [],
+        "retries": [],
+        "run_seconds": 0,
+        "rows_fetched": 0,
+        "peak_memory": 0,
+        "timings": {},
+        "slowest_sends": [],
     }
 
 
@@ -739,8 +1968,11 @@ def _record_alert_detail(context, channel, recipients, bundle, status, error_mes
         context["details"].append(row)
 
 
-def _count_pending_email_queue():
+def _count_pending_email_queue(queue_names=None):
+    """Count unsent messages of this run's batch (or the whole queue without names)."""
     try:
+        if queue_names is not None:
+            return count_pending_queue_names(queue_names)
         return frappe.db.count("Email Queue", {"status": "Not Sent"})
     except Exception:
         return 0
@@ -752,6 +1984,8 @@ def _derive_alert_status(context):
         return explicit
 
     successes = (context.get("emails_sent", 0) or 0) + (context.get("sms_sent", 0) or 0)
+    # held for the sending window; their outcome is tracked by the progress fields
+    successes += context.get("scheduled_sends", 0) or 0
     failures = (context.get("emails_failed", 0) or 0) + (context.get("sms_failed", 0) or 0)
 
     if failures and not successes:
@@ -764,21 +1998,9 @@ def _derive_alert_status(context):
 
 
 def _create_alert_log(context):
+    _stop_run_metrics(context)
     details = "\n".join(context.get("failure_details") or [])
-    detail_rows = []
-    for detail in context.get("details") or []:
-        detail_rows.append(
-            {
-                "doctype": "Document Alert Log Detail",
-                "channel": detail.get("channel"),
-                "recipient": detail.get("recipient"),
-                "status": detail.get("status"),
-                "reference_doctype": detail.get("reference_doctype"),
-                "reference_name": detail.get("reference_name"),
-                "reference_title": detail.get("reference_title"),
-                "error_message": detail.get("error_message"),
-            }
-        )
+    timings = context.get("timings") or {}
 
     payload = {
         "doctype": "Document Alert Log",
@@ -791,11 +2013,22 @@ def _create_alert_log(context):
         "sms_failed": context.get("sms_failed", 0),
         "email_queue_pending": context.get("email_queue_pending", 0),
         "sms_pending": context.get("sms_pending", 0),
+        "duplicates_skipped": context.get("duplicates_skipped", 0),
+        "retries_queued": context.get("retries_queued", 0),
+        "sms_segments": context.get("sms_segments", 0),
+        "scheduled_sends": context.get("scheduled_sends", 0),
+        "scheduled_pending": context.get("scheduled_sends", 0),
         "failure_details": details,
+        "run_seconds": context.get("run_seconds", 0),
+        "rows_fetched": context.get("rows_fetched", 0),
+        "peak_memory_mb": (context.get("peak_memory") or 0) / (1024 * 1024),
+        "stage_timings": frappe.as_json({stage: round(seconds, 4) for stage, seconds in timings.items()}),
+        "slowest_sends": frappe.as_json(
+            sorted(context.get("slowest_sends") or [], key=lambda d: d["seconds"], reverse=True)
+        ),
     }
-
-    if detail_rows:
-        payload["log_entries"] = detail_rows
+    for stage, fieldname in STAGE_LOG_FIELDS.items():
+        payload[fieldname] = timings.get(stage, 0)
 
     doc = None
 
@@ -806,6 +2039,19 @@ def _create_alert_log(context):
         frappe.log_error(frappe.get_traceback(), "Failed to insert Document Alert Log")
         return
 
+    # Recipient rows can run into the tens of thousands, so they skip the ORM
+    try:
+        # rows written at checkpoints come first
+        moved = attach_run_details(doc.name, context.get("alert_runs"))
+        bulk_insert_log_details(doc.name, context.get("details") or [], start_idx=moved + 1)
+    except Exception:
+        frappe.log_error(frappe.get_traceback(), "Failed to insert Document Alert Log details")
+
+    try:
+        link_alert_log(doc.name, context.get("scheduled_names"))
+    except Exception:
+        frappe.log_error(frappe.get_traceback(), "Failed to link scheduled sends to Document Alert Log")
+
     _maybe_email_alert_log(doc)
 
 
@@ -46,14 +46,25 @@ doc_events = {
         "on_cancel": "service_workorder.api.clear_sr_links",
         "on_update_after_submit": "service_workorder.api.update_amended_link",
     },
+    "Product Bundle": {
+        "on_update": "service_workorder.api.clear_product_bundle_cache",
+        "on_trash": "service_workorder.api.clear_product_bundle_cache",
+        "after_rename": "service_workorder.api.clear_all_product_bundle_cache",
+    },
+    "Item": {
+        "on_update": "service_workorder.api.clear_product_bundle_cache_for_item",
+        "after_rename": "service_workorder.api.clear_all_product_bundle_cache",
+    },
     "Workspace": {
         "before_validate": "service_workorder.workspace_hooks.remove_broken_custom_blocks",
     },
     "Customer": {
         "after_save": "service_workorder.ag_docs.customer_contact_sync.update_document_registration_contacts_from_customer",
+        "on_trash": "service_workorder.ag_docs.customer_contact_sync.clear_contact_cache_for_doc",
     },
     "Contact": {
         "after_save": "service_workorder.ag_docs.customer_contact_sync.update_document_registration_contacts_from_contact",
+        "on_trash": "service_workorder.ag_docs.customer_contact_sync.clear_contact_cache_for_doc",
     },
 }
 override_doctype_class = {
@@ -67,8 +78,22 @@ app_include_css = [
 
 scheduler_events = {
     "daily": [
-        "service_workorder.document_expiry.send_expiry_notifications"
-    ]
+        "service_workorder.document_expiry.send_expiry_notifications",
+        "service_workorder.ag_docs.alert_calendar.roll_alert_calendar",
+        "service_workorder.ag_docs.alert_log_retention.compact_alert_log_details",
+    ],
+    "cron": {
+        "*/5 * * * *": [
+            "service_workorder.ag_docs.alert_retry.process_alert_retries",
+            "service_workorder.document_expiry.resume_interrupted_expiry_runs",
+        ],
+    },
+}
+
+default_log_clearing_doctypes = {
+    "Document Alert Send Ledger": 30,
+    "Document Alert Retry": 30,
+    "Document Alert Run": 30,
 }
 
 
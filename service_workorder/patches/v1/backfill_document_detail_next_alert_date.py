@@ -0,0 +1,6 @@
+from service_workorder.ag_docs.alert_schedule import refresh_next_alert_dates
+
+
+def execute():
+	# also clears the alert dates of rows whose registration is inactive
+	refresh_next_alert_dates()
@@ -0,0 +1,5 @@
+from service_workorder.ag_docs.document_numbers import backfill_document_number_keys
+
+
+def execute():
+	backfill_document_number_keys()
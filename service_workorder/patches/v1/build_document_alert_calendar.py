@@ -0,0 +1,5 @@
+from service_workorder.ag_docs.alert_calendar import rebuild_alert_calendar
+
+
+def execute():
+	rebuild_alert_calendar()
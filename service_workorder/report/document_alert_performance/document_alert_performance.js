@@ -0,0 +1,29 @@
+frappe.query_reports["Document Alert Performance"] = {
+	filters: [
+		{
+			fieldname: "from_date",
+			label: __("From Date"),
+			fieldtype: "Date",
+			default: frappe.datetime.add_days(frappe.datetime.get_today(), -30),
+		},
+		{
+			fieldname: "to_date",
+			label: __("To Date"),
+			fieldtype: "Date",
+			default: frappe.datetime.get_today(),
+		},
+		{
+			fieldname: "status",
+			label: __("Status"),
+			fieldtype: "Select",
+			options: "\nSuccess\nPartial Failures\nFailed\nSkipped",
+		},
+		{
+			fieldname: "chart",
+			label: __("Chart"),
+			fieldtype: "Select",
+			options: "Stage Durations\nPeak Memory\nRows Fetched",
+			default: "Stage Durations",
+		},
+	],
+};
@@ -0,0 +1,122 @@
+import frappe
+from frappe import _
+from frappe.utils import add_days, flt, getdate
+
+STAGES = (
+	("query_seconds", _("Query (s)")),
+	("aggregate_seconds", _("Aggregation (s)")),
+	("render_seconds", _("Rendering (s)")),
+	("email_queue_seconds", _("Email Enqueue (s)")),
+	("sms_seconds", _("SMS Sending (s)")),
+)
+
+
+def execute(filters=None):
+	filters = frappe._dict(filters or {})
+	conditions = ["log.run_seconds > 0"]
+	params = {}
+
+	if filters.get("from_date"):
+		conditions.append("log.log_time >= %(from_date)s")
+		params["from_date"] = getdate(filters.from_date)
+
+	if filters.get("to_date"):
+		conditions.append("log.log_time < %(to_date)s")
+		params["to_date"] = getdate(add_days(filters.to_date, 1))
+
+	if filters.get("status"):
+		conditions.append("log.status = %(status)s")
+		params["status"] = filters.status
+
+	data = frappe.db.sql(
+		"""
+		select
+			log.name,
+			log.log_time,
+			log.status,
+			log.total_records,
+			log.rows_fetched,
+			log.run_seconds,
+			log.query_seconds,
+			log.aggregate_seconds,
+			log.render_seconds,
+			log.email_queue_seconds,
+			log.sms_seconds,
+			log.peak_memory_mb,
+			log.emails_sent,
+			log.sms_sent
+		from `tabDocument Alert Log` log
+		where {conditions}
+		order by log.log_time
+		""".format(conditions=" and ".join(conditions)),
+		params,
+		as_dict=True,
+	)
+
+	columns = [
+		{
+			"label": _("Log"),
+			"fieldname": "name",
+			"fieldtype": "Link",
+			"options": "Document Alert Log",
+			"width": 90,
+		},
+		{"label": _("Log Time"), "fieldname": "log_time", "fieldtype": "Datetime", "width": 160},
+		{"label": _("Status"), "fieldname": "status", "fieldtype": "Data", "width": 110},
+		{"label": _("Records"), "fieldname": "total_records", "fieldtype": "Int", "width": 90},
+		{"label": _("Rows Fetched"), "fieldname": "rows_fetched", "fieldtype": "Int", "width": 110},
+		{
+			"label": _("Run (s)"),
+			"fieldname": "run_seconds",
+			"fieldtype": "Float",
+			"precision": 3,
+			"width": 100,
+		},
+	]
+	columns.extend(
+		{"label": label, "fieldname": fieldname, "fieldtype": "Float", "precision": 3, "width": 120}
+		for fieldname, label in STAGES
+	)
+	columns.extend(
+		[
+			{
+				"label": _("Peak Memory (MB)"),
+				"fieldname": "peak_memory_mb",
+				"fieldtype": "Float",
+				"precision": 2,
+				"width": 130,
+			},
+			{"label": _("Emails Sent"), "fieldname": "emails_sent", "fieldtype": "Int", "width": 100},
+			{"label": _("SMS Sent"), "fieldname": "sms_sent", "fieldtype": "Int", "width": 90},
+		]
+	)
+
+	return columns, data, None, get_chart(data, filters.get("chart") or "Stage Durations")
+
+
+def get_chart(data, chart):
+	if not data:
+		return None
+
+	labels = [frappe.format(row.log_time, {"fieldtype": "Datetime"}) for row in data]
+
+	if chart == "Peak Memory":
+		datasets = [{"name": _("Peak Memory (MB)"), "values": [flt(row.peak_memory_mb, 2) for row in data]}]
+		chart_type = "line"
+	elif chart == "Rows Fetched":
+		datasets = [{"name": _("Rows Fetched"), "values": [row.rows_fetched or 0 for row in data]}]
+		chart_type = "bar"
+	else:
+		datasets = [
+			{"name": label, "values": [flt(row.get(fieldname), 3) for row in data]}
+			for fieldname, label in STAGES
+		]
+		chart_type = "bar"
+
+	chart_data = {
+		"data": {"labels": labels, "datasets": datasets},
+		"type": chart_type,
+	}
+	if chart_type == "bar" and len(datasets) > 1:
+		chart_data["barOptions"] = {"stacked": 1}
+	return chart_data
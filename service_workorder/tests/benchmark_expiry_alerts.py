@@ -0,0 +1,444 @@
+# Copyright (c) 2025, Mohamed Sharafudheen and Contributors
+# See license.txt
+
+"""Benchmark of the daily expiry alert run on synthetic registrations.
+
+Not collected by the test runner (no ``test_`` prefix). Run it on a scratch site:
+
+    bench --site bench.localhost execute \\
+        service_workorder.tests.benchmark_expiry_alerts.run_benchmarks \\
+        --kwargs "{'sizes': [10000, 100000, 1000000]}"
+
+Every size seeds customers, employees and ``Document Detail`` rows (names start with
+``BENCH-``) with a realistic spread of expiry dates, runs ``send_expiry_notifications``
+against stub email and SMS sinks and reports wall time, SQL query count and peak
+traced memory. The seeded rows are deleted afterwards. Pass ``baseline_file`` to
+compare against (and ``save_baseline=True`` to record) earlier results.
+"""
+
+import json
+import os
+import random
+import tracemalloc
+from contextlib import contextmanager
+from datetime import timedelta
+from time import perf_counter
+from unittest.mock import patch
+
+import frappe
+from frappe.utils import getdate, now_datetime, nowdate
+
+from service_workorder import document_expiry
+from service_workorder.ag_docs.alert_schedule import get_next_alert_date
+
+BENCH_PREFIX = "BENCH-"
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+
+# Shape of the synthetic population
+DOCUMENTS_PER_REGISTRATION = 4
+EMPLOYEES_PER_CUSTOMER = 50
+
+INSERT_CHUNK_SIZE = 10_000
+
+# (document name, short code, alert days, repeat interval)
+DOCUMENT_TYPES = (
+	("Passport", "PP", 60, 15),
+	("Residence Visa", "RV", 45, 7),
+	("Emirates ID", "EID", 30, 7),
+	("Labour Card", "LC", 30, 5),
+	("Medical Insurance", "INS", 30, 10),
+	("Trade License", "TL", 60, 15),
+)
+
+# (share of documents, expiry offset range in days from today)
+EXPIRY_DISTRIBUTION = (
+	(0.05, (-365, -1)),
+	(0.15, (0, 60)),
+	(0.30, (61, 365)),
+	(0.50, (366, 5 * 365)),
+)
+
+# A metric counts as regressed when it grows by more than this share over the baseline
+REGRESSION_TOLERANCE = 0.2
+
+_META_FIELDS = ("name", "creation", "modified", "owner", "modified_by", "docstatus")
+
+
+def run_benchmarks(sizes=None, seed=42, baseline_file=None, save_baseline=False):
+	"""Seed, run and clean up once per size; returns (and prints) the results."""
+	frappe.only_for("System Manager")
+
+	results = []
+	for documents in sizes or DEFAULT_SIZES:
+		started_at = now_datetime()
+		try:
+			dataset = seed_registrations(int(documents), seed=seed)
+			results.append({**dataset, **measure_expiry_run()})
+		finally:
+			clear_benchmark_data(since=started_at)
+			frappe.db.commit()
+		print(_format_result(results[-1]))
+
+	if baseline_file:
+		regressions = compare_with_baseline(results, _load_baseline(baseline_file))
+		for regression in regressions:
+			print(f"REGRESSION {regression}")
+		if save_baseline:
+			with open(baseline_file, "w", encoding="utf-8") as handle:
+				json.dump(results, handle, indent=1)
+
+	return results
+
+
+def seed_registrations(documents, seed=42, today=None):
+	"""Insert a synthetic population holding ``documents`` Document Detail rows.
+
+	One customer registration and ``EMPLOYEES_PER_CUSTOMER`` employee registrations per
+	customer, ``DOCUMENTS_PER_REGISTRATION`` documents each. Rows are bulk inserted, so
+	no hooks run; ``next_alert_date`` is filled in the way the hooks would.
+	"""
+	rng = random.Random(seed)
+	today = getdate(today or nowdate())
+	registrations = max(documents // DOCUMENTS_PER_REGISTRATION, 1)
+	customers = max(registrations // (EMPLOYEES_PER_CUSTOMER + 1), 1)
+	employees = registrations - customers
+
+	document_types = _seed_document_types()
+
+	customer_names = [f"{BENCH_PREFIX}CUST-{index:06d}" for index in range(customers)]
+	_bulk_insert(
+		"Customer",
+		("customer_name",),
+		[(name, (f"Bench Customer {index}",)) for index, name in enumerate(customer_names)],
+	)
+	_bulk_insert(
+		"Customer Document Registration",
+		(
+			"customer",
+			"customer_name",
+			"customer_email",
+			"customer_mobile",
+			"enable_email_alert",
+			"employee_email_alert",
+			"enable_sms_alert",
+			"employee_sms_alert",
+			"active",
+		),
+		[
+			(
+				name,
+				(
+					name,
+					f"Bench Customer {index}",
+					f"customer{index}@bench.example.com",
+					f"+97150{index:07d}",
+					1,
+					int(rng.random() < 0.7),
+					int(rng.random() < 0.5),
+					int(rng.random() < 0.3),
+					1,
+				),
+			)
+			for index, name in enumerate(customer_names)
+		],
+	)
+
+	employee_names = [f"{BENCH_PREFIX}CEMP-{index:08d}" for index in range(employees)]
+	_bulk_insert(
+		"Customer Employee Registration",
+		(
+			"customer_name",
+			"first_name",
+			"full_name",
+			"employee_type",
+			"naming_series",
+			"email_id",
+			"mobile_number",
+			"notify_employee_email",
+			"notify_employee_sms",
+			"active",
+		),
+		[
+			(
+				name,
+				(
+					customer_names[index % customers],
+					f"Employee {index}",
+					f"Bench Employee {index}",
+					"Employee",
+					"CEMP-.YYYY.-.####",
+					f"employee{index}@bench.example.com",
+					f"+97155{index:07d}",
+					int(rng.random() < 0.6),
+					int(rng.random() < 0.4),
+					1,
+				),
+			)
+			for index, name in enumerate(employee_names)
+		],
+	)
+
+	due = 0
+	parents = [(name, "Customer Document Registration") for name in customer_names]
+	parents += [(name, "Customer Employee Registration") for name in employee_names]
+	rows = []
+	for parent, parenttype in parents:
+		for idx in range(1, DOCUMENTS_PER_REGISTRATION + 1):
+			document_type, alert_days, repeat_interval = rng.choice(document_types)
+			expiry = today + timedelta(days=_random_expiry_offset(rng))
+			next_alert_date = get_next_alert_date(expiry, alert_days, repeat_interval, today)
+			number = f"{BENCH_PREFIX}{rng.randrange(10**8):08d}"
+			due += int(next_alert_date == today)
+			rows.append(
+				(
+					f"{BENCH_PREFIX}{frappe.generate_hash(length=12)}",
+					(
+						idx,
+						parent,
+						parenttype,
+						"document_details",
+						document_type,
+						expiry,
+						next_alert_date,
+						number,
+						number.lower(),
+					),
+				)
+			)
+		if len(rows) >= INSERT_CHUNK_SIZE:
+			_insert_document_rows(rows)
+			rows = []
+	_insert_document_rows(rows)
+	frappe.db.commit()
+
+	return {
+		"documents": registrations * DOCUMENTS_PER_REGISTRATION,
+		"customers": customers,
+		"employees": employees,
+		"due_today": due,
+	}
+
+
+def measure_expiry_run():
+	"""Run the scheduler entry point against stub sinks and measure it."""
+	queries = _QueryCounter()
+	started_at = now_datetime()
+	tracemalloc.start()
+	started = perf_counter()
+	try:
+		with stub_alert_sinks(), _benchmark_settings(), queries.counting():
+			document_expiry.send_expiry_notifications()
+		wall_seconds = perf_counter() - started
+		peak_memory = tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+
+	log = frappe.get_all(
+		"Document Alert Log",
+		filters={"log_time": (">=", started_at)},
+		fields=["name", "total_records", "emails_sent", "sms_sent", "rows_fetched"],
+		order_by="log_time desc",
+		limit=1,
+	)
+	log = log[0] if log else {}
+	return {
+		"wall_seconds": round(wall_seconds, 3),
+		"queries": queries.count,
+		"peak_memory_mb": round(peak_memory / (1024 * 1024), 2),
+		"bundles": log.get("total_records", 0),
+		"emails": log.get("emails_sent", 0),
+		"sms": log.get("sms_sent", 0),
+		"rows_fetched": log.get("rows_fetched", 0),
+		"alert_log": log.get("name"),
+	}
+
+
+@contextmanager
+def stub_alert_sinks():
+	"""Accept every email and SMS without writing the Email Queue or calling a gateway."""
+
+	def insert_emails(_batch, emails):
+		for email in emails:
+			email.queue_name = f"{BENCH_PREFIX}{frappe.generate_hash(length=10)}"
+
+	with (
+		patch("service_workorder.ag_docs.email_queue_batch.EmailQueueBatch._insert", insert_emails),
+		patch.object(document_expiry, "_get_sms_dispatcher", lambda settings: _StubSMSDispatcher()),
+		patch.object(document_expiry, "log_sms_job", lambda job: None),
+	):
+		yield
+
+
+class _StubSMSDispatcher:
+	def send(self, jobs):
+		for job in jobs:
+			job.sent.extend(job.recipients)
+		return jobs
+
+
+class _QueryCounter:
+	def __init__(self):
+		self.count = 0
+
+	@contextmanager
+	def counting(self):
+		# frappe.db is a proxy to the connection of this site, so patch the instance
+		db = frappe.db._get_current_object() if hasattr(frappe.db, "_get_current_object") else frappe.db
+		sql = db.sql
+
+		def counted(*args, **kwargs):
+			self.count += 1
+			return sql(*args, **kwargs)
+
+		db.sql = counted
+		try:
+			yield
+		finally:
+			del db.sql
+
+
+@contextmanager
+def _benchmark_settings():
+	"""Both channels on, one job, no sending window; the previous values are restored."""
+	overrides = {
+		"enable_email": 1,
+		"enable_sms": 1,
+		"alert_shards": 0,
+		"enable_sending_window": 0,
+		"enable_log_email": 0,
+	}
+	previous = {field: frappe.db.get_single_value("Document Alert Settings", field) for field in overrides}
+	frappe.db.set_single_value("Document Alert Settings", overrides)
+	frappe.clear_document_cache("Document Alert Settings", "Document Alert Settings")
+	try:
+		yield
+	finally:
+		frappe.db.set_single_value("Document Alert Settings", previous)
+		frappe.clear_document_cache("Document Alert Settings", "Document Alert Settings")
+
+
+def clear_benchmark_data(since=None):
+	"""Delete everything the benchmark seeded or produced for the seeded registrations.
+
+	With ``since`` the alert logs and run checkpoints created from then on, i.e. by the
+	measured runs, are deleted too (with their child rows).
+	"""
+	like = f"{BENCH_PREFIX}%"
+	frappe.db.delete("Document Detail", {"parent": ("like", like)})
+	for doctype in (
+		"Customer Employee Registration",
+		"Customer Document Registration",
+		"Customer",
+		"Document Type Master",
+	):
+		frappe.db.delete(doctype, {"name": ("like", like)})
+	for doctype in ("Document Alert Send Ledger", "Document Alert Retry", "Document Alert Calendar"):
+		frappe.db.delete(doctype, {"reference_name": ("like", like)})
+
+	if since:
+		for doctype in ("Document Alert Log", "Document Alert Run"):
+			names = frappe.get_all(doctype, filters={"creation": (">=", since)}, pluck="name")
+			_delete_with_children(doctype, names)
+
+
+def compare_with_baseline(results, baseline):
+	"""Return a description of every metric that grew beyond ``REGRESSION_TOLERANCE``."""
+	baseline_by_size = {entry["documents"]: entry for entry in baseline or []}
+	regressions = []
+	for result in results:
+		previous = baseline_by_size.get(result["documents"])
+		if not previous:
+			continue
+		for metric in ("wall_seconds", "queries", "peak_memory_mb"):
+			before, after = previous.get(metric) or 0, result.get(metric) or 0
+			if before and after > before * (1 + REGRESSION_TOLERANCE):
+				regressions.append(f"{result['documents']} documents: {metric} {before} -> {after}")
+	return regressions
+
+
+def _seed_document_types():
+	values = []
+	document_types = []
+	for index, (document_name, short_code, alert_days, repeat_interval) in enumerate(DOCUMENT_TYPES):
+		name = f"{BENCH_PREFIX}DTM-{index}"
+		values.append((name, (document_name, short_code, alert_days, repeat_interval, "DTM-.####")))
+		document_types.append((name, alert_days, repeat_interval))
+
+	_bulk_insert(
+		"Document Type Master",
+		("document_name", "short_code", "alert_days", "repeat_interval", "naming_series"),
+		values,
+	)
+	return document_types
+
+
+def _insert_document_rows(rows):
+	_bulk_insert(
+		"Document Detail",
+		(
+			"idx",
+			"parent",
+			"parenttype",
+			"parentfield",
+			"document_type",
+			"expiry_date",
+			"next_alert_date",
+			"document_number",
+			"document_number_key",
+		),
+		rows,
+	)
+
+
+def _bulk_insert(doctype, fields, rows):
+	"""Insert ``(name, values)`` pairs with the standard meta columns filled in."""
+	if not rows:
+		return
+
+	timestamp = now_datetime()
+	frappe.db.bulk_insert(
+		doctype,
+		fields=(*_META_FIELDS, *fields),
+		values=[
+			(name, timestamp, timestamp, "Administrator", "Administrator", 0, *values)
+			for name, values in rows
+		],
+		ignore_duplicates=True,
+		chunk_size=INSERT_CHUNK_SIZE,
+	)
+
+
+def _delete_with_children(doctype, names):
+	if not names:
+		return
+
+	for table_field in frappe.get_meta(doctype).get_table_fields():
+		frappe.db.delete(table_field.options, {"parent": ("in", names), "parenttype": doctype})
+	frappe.db.delete(doctype, {"name": ("in", names)})
+
+
+def _random_expiry_offset(rng):
+	pick = rng.random()
+	for share, (low, high) in EXPIRY_DISTRIBUTION:
+		if pick < share:
+			return rng.randint(low, high)
+		pick -= share
+	low, high = EXPIRY_DISTRIBUTION[-1][1]
+	return rng.randint(low, high)
+
+
+def _load_baseline(path):
+	if not os.path.exists(path):
+		return []
+	with open(path, encoding="utf-8") as handle:
+		return json.load(handle)
+
+
+def _format_result(result):
+	return (
+		f"{result['documents']:>9} documents ({result['due_today']} due): "
+		f"{result['wall_seconds']:.2f}s, {result['queries']} queries, "
+		f"{result['peak_memory_mb']:.1f} MB peak, {result['bundles']} bundles, "
+		f"{result['emails']} emails, {result['sms']} SMS"
+	)
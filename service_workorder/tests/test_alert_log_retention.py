@@ -0,0 +1,52 @@
+# Copyright (c) 2025, Mohamed Sharafudheen and Contributors
+# See license.txt
+
+from frappe.tests.utils import FrappeTestCase
+
+from service_workorder.ag_docs.alert_log_retention import (
+	compress_details,
+	decompress_details,
+	summarise_details,
+)
+
+
+def _row(channel, recipient, status, reference_name, error=""):
+	# ordered like DETAIL_FIELDS
+	return [
+		channel,
+		recipient,
+		status,
+		"Customer Employee Registration",
+		reference_name,
+		reference_name,
+		error,
+	]
+
+
+class TestAlertLogRetention(FrappeTestCase):
+	def setUp(self):
+		self.rows = [
+			_row("Email", "a@example.com", "Sent", "CER-0001"),
+			_row("Email", "a@example.com", "Sent", "CER-0002"),
+			_row("Email", "b@example.com", "Failed", "CER-0002", "SMTP timeout"),
+			_row("SMS", "+971501234567", "Failed", "CER-0003", "SMTP timeout"),
+			_row("SMS", "+971501234567", "Sent", "CER-0003"),
+		]
+
+	def test_archive_round_trip(self):
+		archive = compress_details(self.rows)
+		self.assertIsInstance(archive, str)
+		self.assertEqual(decompress_details(archive), self.rows)
+		self.assertEqual(decompress_details(None), [])
+
+	def test_summary_counts(self):
+		summary = summarise_details(self.rows)
+
+		self.assertEqual(summary["rows"], 5)
+		self.assertEqual(
+			summary["by_channel_status"], {"Email": {"Sent": 2, "Failed": 1}, "SMS": {"Failed": 1, "Sent": 1}}
+		)
+		self.assertEqual(summary["by_reference_doctype"], {"Customer Employee Registration": 5})
+		self.assertEqual(summary["distinct_recipients"], 3)
+		self.assertEqual(summary["distinct_references"], 3)
+		self.assertEqual(summary["top_errors"], [("SMTP timeout", 2)])
@@ -0,0 +1,54 @@
+# Copyright (c) 2025, Mohamed Sharafudheen and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from service_workorder.ag_docs.doctype.document_alert_run.document_alert_run import RUN_LOCK_KEY, AlertRunLock
+
+
+class TestAlertRunLock(FrappeTestCase):
+	def setUp(self):
+		frappe.cache().delete(frappe.cache().make_key(RUN_LOCK_KEY))
+
+	def tearDown(self):
+		frappe.cache().delete(frappe.cache().make_key(RUN_LOCK_KEY))
+
+	def test_second_run_is_kept_out(self):
+		first = AlertRunLock("bench-run-a")
+		second = AlertRunLock("bench-run-b")
+
+		self.assertTrue(first.acquire())
+		# a run that has not checkpointed yet has not ended
+		self.assertFalse(second.acquire())
+		self.assertEqual(second.holder(), first.value)
+		self.assertFalse(second.heartbeat())
+
+		# releasing someone else's lock is a no-op
+		second.release()
+		self.assertEqual(first.holder(), first.value)
+
+		first.release()
+		self.assertIsNone(first.holder())
+		self.assertTrue(second.acquire())
+
+	def test_other_worker_of_same_run_is_kept_out(self):
+		worker = AlertRunLock("bench-run-a")
+		resumed = AlertRunLock("bench-run-a")
+
+		self.assertTrue(worker.acquire())
+		self.assertFalse(resumed.acquire())
+		self.assertTrue(worker.heartbeat())
+
+		# shards of one run share the lock
+		shard = AlertRunLock("bench-run-a")
+		self.assertTrue(shard.acquire(join_run=True))
+		self.assertEqual(shard.token, worker.token)
+
+		AlertRunLock.release_run("bench-run-a")
+		self.assertIsNone(worker.holder())
+
+	def test_heartbeat_retakes_expired_lock(self):
+		lock = AlertRunLock("bench-run-a")
+		self.assertTrue(lock.heartbeat())
+		self.assertEqual(lock.holder(), lock.value)
@@ -0,0 +1,31 @@
+# Copyright (c) 2025, Mohamed Sharafudheen and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, nowdate
+
+from service_workorder.ag_docs.alert_schedule import set_next_alert_dates
+
+
+class TestAlertSchedule(FrappeTestCase):
+	def test_inactive_registration_has_no_alert_dates(self):
+		doc = frappe._dict(
+			active=0,
+			docstatus=0,
+			document_details=[
+				frappe._dict(
+					document_type=None,
+					expiry_date=add_days(nowdate(), 5),
+					alert_days=30,
+					alert_repeat_interval=1,
+					next_alert_date=nowdate(),
+				)
+			],
+		)
+		set_next_alert_dates(doc)
+		self.assertIsNone(doc.document_details[0].next_alert_date)
+
+		doc.active = 1
+		set_next_alert_dates(doc)
+		self.assertEqual(str(doc.document_details[0].next_alert_date), nowdate())
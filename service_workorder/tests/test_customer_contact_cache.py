@@ -0,0 +1,69 @@
+# Copyright (c) 2025, Mohamed Sharafudheen and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from service_workorder.ag_docs.customer_contact_sync import (
+	clear_customer_contact_cache,
+	get_customer_contact_info,
+)
+
+CUSTOMER = "_Test SW Contact Customer"
+
+
+class TestCustomerContactCache(FrappeTestCase):
+	def setUp(self):
+		if not frappe.db.exists("Customer", CUSTOMER):
+			frappe.get_doc(
+				{
+					"doctype": "Customer",
+					"customer_name": CUSTOMER,
+					"customer_group": "All Customer Groups",
+					"territory": "All Territories",
+				}
+			).insert()
+		clear_customer_contact_cache(CUSTOMER)
+
+	def test_customer_save_refreshes_info(self):
+		self.assertEqual(get_customer_contact_info(CUSTOMER)["customer_name"], CUSTOMER)
+
+		customer = frappe.get_doc("Customer", CUSTOMER)
+		customer.customer_name = "Renamed Contact Customer"
+		customer.save()
+
+		self.assertEqual(get_customer_contact_info(CUSTOMER)["customer_name"], "Renamed Contact Customer")
+
+	def test_contact_save_refreshes_info(self):
+		self.assertFalse(get_customer_contact_info(CUSTOMER).get("contact_email"))
+
+		contact = make_contact("SW Cache", "sw-cache-first@example.com", is_primary_contact=1)
+
+		self.assertEqual(get_customer_contact_info(CUSTOMER)["contact_email"], "sw-cache-first@example.com")
+
+		contact.email_ids[0].email_id = "sw-cache-second@example.com"
+		contact.save()
+
+		self.assertEqual(get_customer_contact_info(CUSTOMER)["contact_email"], "sw-cache-second@example.com")
+
+	def test_customer_primary_contact_wins_over_default_contact(self):
+		make_contact("SW Default", "sw-default@example.com", is_primary_contact=1)
+		chosen = make_contact("SW Chosen", "sw-chosen@example.com")
+
+		customer = frappe.get_doc("Customer", CUSTOMER)
+		customer.customer_primary_contact = chosen.name
+		customer.save()
+
+		self.assertEqual(get_customer_contact_info(CUSTOMER)["contact_email"], "sw-chosen@example.com")
+
+
+def make_contact(first_name, email, is_primary_contact=0):
+	return frappe.get_doc(
+		{
+			"doctype": "Contact",
+			"first_name": first_name,
+			"is_primary_contact": is_primary_contact,
+			"email_ids": [{"email_id": email, "is_primary": 1}],
+			"links": [{"link_doctype": "Customer", "link_name": CUSTOMER}],
+		}
+	).insert()
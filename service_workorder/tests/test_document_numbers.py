@@ -0,0 +1,25 @@
+# Copyright (c) 2025, Mohamed Sharafudheen and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from service_workorder.ag_docs.document_numbers import get_document_number_key, set_document_number_keys
+
+
+class TestDocumentNumbers(FrappeTestCase):
+	def test_document_number_key(self):
+		self.assertEqual(get_document_number_key("  AB1234c "), "ab1234c")
+		self.assertIsNone(get_document_number_key("   "))
+		self.assertIsNone(get_document_number_key(None))
+
+	def test_keys_are_set_on_rows(self):
+		doc = frappe._dict(
+			document_details=[
+				frappe._dict(document_number=" P-100 "),
+				frappe._dict(document_number=""),
+			]
+		)
+		set_document_number_keys(doc)
+
+		self.assertEqual([row.document_number_key for row in doc.document_details], ["p-100", None])
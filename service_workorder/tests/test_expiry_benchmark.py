@@ -0,0 +1,34 @@
+# Copyright (c) 2025, Mohamed Sharafudheen and Contributors
+# See license.txt
+
+import random
+
+from frappe.tests.utils import FrappeTestCase
+
+from service_workorder.tests.benchmark_expiry_alerts import (
+	EXPIRY_DISTRIBUTION,
+	_random_expiry_offset,
+	compare_with_baseline,
+)
+
+
+class TestExpiryBenchmark(FrappeTestCase):
+	def test_expiry_distribution(self):
+		rng = random.Random(7)
+		offsets = [_random_expiry_offset(rng) for _ in range(20_000)]
+
+		for share, (low, high) in EXPIRY_DISTRIBUTION:
+			seen = sum(low <= offset <= high for offset in offsets) / len(offsets)
+			self.assertAlmostEqual(seen, share, delta=0.02)
+
+	def test_compare_with_baseline(self):
+		baseline = [{"documents": 10_000, "wall_seconds": 10.0, "queries": 100, "peak_memory_mb": 50.0}]
+		results = [
+			{"documents": 10_000, "wall_seconds": 11.0, "queries": 150, "peak_memory_mb": 50.0},
+			{"documents": 100_000, "wall_seconds": 90.0, "queries": 900, "peak_memory_mb": 80.0},
+		]
+
+		regressions = compare_with_baseline(results, baseline)
+
+		self.assertEqual(len(regressions), 1)
+		self.assertIn("queries 100 -> 150", regressions[0])
@@ -0,0 +1,60 @@
+# Copyright (c) 2025, Mohamed Sharafudheen and Contributors
+# See license.txt
+
+from datetime import date, timedelta
+from itertools import product
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from service_workorder.ag_docs import expiry_window
+from service_workorder.document_expiry import _prepare_document_entry
+
+
+class TestExpiryWindow(FrappeTestCase):
+	"""Both evaluator paths must agree with the per-row reference rule."""
+
+	def setUp(self):
+		self.today = date(2025, 3, 15)
+		self.rows = []
+		for offset, days, interval, default_days, default_interval in product(
+			(None, -1, 0, 1, 4, 7, 30, 31),
+			(None, 0, 7, 30),
+			(None, 0, 1, 3),
+			(None, 10, 30),
+			(None, -2, 7),
+		):
+			self.rows.append(
+				frappe._dict(
+					expiry_date=self.today + timedelta(days=offset) if offset is not None else None,
+					alert_days=days,
+					alert_repeat_interval=interval,
+					default_alert_days=default_days,
+					default_repeat_interval=default_interval,
+				)
+			)
+
+	def assert_matches_reference(self):
+		days_left, due = expiry_window.evaluate_row_windows(self.rows, self.today)
+		self.assertEqual(len(due), len(self.rows))
+
+		for row, row_days_left, row_due in zip(self.rows, days_left, due, strict=True):
+			entry = _prepare_document_entry(row, self.today)
+			self.assertEqual(row_due, bool(entry), row)
+			if entry:
+				self.assertEqual(row_days_left, entry["days_left"], row)
+
+	def test_matches_reference(self):
+		self.assert_matches_reference()
+
+	def test_python_fallback_matches_reference(self):
+		with patch.object(expiry_window, "np", None):
+			self.assert_matches_reference()
+
+	def test_accepts_string_dates(self):
+		days_left, due = expiry_window.evaluate_expiry_windows(
+			["2025-03-22", "", None], [7, 7, 7], [None] * 3, [None] * 3, [None] * 3, "2025-03-15"
+		)
+		self.assertEqual(days_left, [7, None, None])
+		self.assertEqual(due, [True, False, False])
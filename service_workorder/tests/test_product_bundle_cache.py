@@ -0,0 +1,64 @@
+# Copyright (c) 2025, Mohamed Sharafudheen and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from service_workorder.api import get_product_bundle_items
+
+BUNDLE_ITEM = "_Test SW Bundle"
+CHILD_ITEM = "_Test SW Bundle Child"
+
+
+class TestProductBundleCache(FrappeTestCase):
+	def setUp(self):
+		make_item(BUNDLE_ITEM)
+		make_item(CHILD_ITEM)
+		if not frappe.db.exists("Product Bundle", BUNDLE_ITEM):
+			frappe.get_doc(
+				{
+					"doctype": "Product Bundle",
+					"new_item_code": BUNDLE_ITEM,
+					"items": [{"item_code": CHILD_ITEM, "qty": 2}],
+				}
+			).insert()
+
+	def test_item_save_refreshes_bundle(self):
+		self.assertEqual(get_product_bundle_items(BUNDLE_ITEM)[0]["item_name"], CHILD_ITEM)
+
+		item = frappe.get_doc("Item", CHILD_ITEM)
+		item.item_name = "Renamed Child"
+		item.save()
+
+		self.assertEqual(get_product_bundle_items(BUNDLE_ITEM)[0]["item_name"], "Renamed Child")
+
+		item.is_sales_item = 0
+		item.save()
+
+		self.assertEqual(get_product_bundle_items(BUNDLE_ITEM), [])
+
+	def test_bundle_save_refreshes_bundle(self):
+		self.assertEqual(get_product_bundle_items(BUNDLE_ITEM)[0]["qty"], 2)
+
+		bundle = frappe.get_doc("Product Bundle", BUNDLE_ITEM)
+		bundle.items[0].qty = 5
+		bundle.save()
+
+		self.assertEqual(get_product_bundle_items(BUNDLE_ITEM)[0]["qty"], 5)
+
+
+def make_item(item_code):
+	if frappe.db.exists("Item", item_code):
+		return frappe.get_doc("Item", item_code)
+
+	return frappe.get_doc(
+		{
+			"doctype": "Item",
+			"item_code": item_code,
+			"item_name": item_code,
+			"item_group": "All Item Groups",
+			"stock_uom": "Nos",
+			"is_stock_item": 0,
+			"is_sales_item": 1,
+		}
+	).insert()
@@ -0,0 +1,140 @@
+# Copyright (c) 2025, Mohamed Sharafudheen and Contributors
+# See license.txt
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlsplit
+
+from frappe.tests.utils import FrappeTestCase
+
+from service_workorder.ag_docs import sms_dispatch
+from service_workorder.ag_docs.sms_dispatch import RateLimiter, SMSDispatcher, SMSGateway, SMSJob
+
+
+class _GatewayHandler(BaseHTTPRequestHandler):
+	protocol_version = "HTTP/1.1"
+
+	def do_GET(self):
+		query = parse_qs(urlsplit(self.path).query)
+		receivers = query.get("to", [""])[0].split(",")
+		self.server.calls.append({"receivers": receivers, "message": query.get("msg", [""])[0]})
+		self.server.peers.add(self.client_address)
+
+		status = 500 if "000" in receivers else 200
+		body = b"OK"
+		self.send_response(status)
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, *args):
+		pass
+
+
+class _FakeClock:
+	"""Stands in for the ``time`` module; ``sleep`` only advances the clock."""
+
+	def __init__(self):
+		self.now = 0.0
+		self.sleeps = []
+
+	def monotonic(self):
+		return self.now
+
+	def sleep(self, seconds):
+		self.sleeps.append(seconds)
+		self.now += seconds
+
+
+class TestSMSDispatch(FrappeTestCase):
+	"""Run the dispatcher against a stand-in HTTP gateway on localhost."""
+
+	def setUp(self):
+		self.server = ThreadingHTTPServer(("127.0.0.1", 0), _GatewayHandler)
+		self.server.calls = []
+		self.server.peers = set()
+		self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+		self.thread.start()
+		host, port = self.server.server_address
+		self.gateway = SMSGateway(
+			url=f"http://{host}:{port}/send",
+			message_parameter="msg",
+			receiver_parameter="to",
+		)
+
+	def tearDown(self):
+		self.server.shutdown()
+		self.server.server_close()
+
+	def test_batches_recipients_per_request(self):
+		dispatcher = SMSDispatcher(self.gateway, max_workers=2, batch_size=2)
+		job = SMSJob(recipients=["111", "222", "333"], message="hello")
+
+		dispatcher.send([job])
+
+		self.assertTrue(job.ok)
+		self.assertEqual(sorted(job.sent), ["111", "222", "333"])
+		self.assertEqual(sorted(len(call["receivers"]) for call in self.server.calls), [1, 2])
+
+	def test_reuses_pooled_connections(self):
+		dispatcher = SMSDispatcher(self.gateway, max_workers=2)
+		jobs = [SMSJob(recipients=[f"50{idx}"], message="hello") for idx in range(10)]
+
+		dispatcher.send(jobs)
+
+		self.assertEqual(len(self.server.calls), 10)
+		self.assertLessEqual(len(self.server.peers), 2)
+
+	def test_failed_requests_are_reported_per_job(self):
+		dispatcher = SMSDispatcher(self.gateway, max_workers=4)
+		good = SMSJob(recipients=["111"], message="hello")
+		bad = SMSJob(recipients=["000", "222"], message="hello")
+
+		dispatcher.send([good, bad])
+
+		self.assertTrue(good.ok)
+		self.assertFalse(bad.ok)
+		self.assertEqual(bad.sent, ["222"])
+		self.assertIn("000", bad.error_message)
+
+	def test_rate_limiter_without_rate_never_blocks(self):
+		limiter = RateLimiter(0)
+		for _ in range(1000):
+			limiter.acquire()
+
+	def test_rate_limiter_throttles_after_burst(self):
+		clock = _FakeClock()
+		with patch.object(sms_dispatch, "time", clock):
+			limiter = RateLimiter(2)
+			acquired_at = []
+			for _ in range(6):
+				limiter.acquire()
+				acquired_at.append(clock.now)
+
+		# a burst of two, then one request every half second
+		self.assertEqual(acquired_at, [0.0, 0.0, 0.5, 1.0, 1.5, 2.0])
+		self.assertAlmostEqual(sum(clock.sleeps), 2.0)
+
+	def test_rate_limiter_refills_while_idle(self):
+		clock = _FakeClock()
+		with patch.object(sms_dispatch, "time", clock):
+			limiter = RateLimiter(2)
+			limiter.acquire()
+			limiter.acquire()
+			clock.now += 10
+			limiter.acquire()
+			limiter.acquire()
+
+		# the bucket never holds more than its capacity, so idling did not need a sleep
+		self.assertEqual(clock.sleeps, [])
+
+	def test_json_flag_without_post_sends_query_params(self):
+		self.gateway.use_json = True
+		dispatcher = SMSDispatcher(self.gateway)
+		job = SMSJob(recipients=["111"], message="hello")
+
+		dispatcher.send([job])
+
+		self.assertTrue(job.ok)
+		self.assertEqual(self.server.calls, [{"receivers": ["111"], "message": "hello"}])
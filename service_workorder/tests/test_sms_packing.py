@@ -0,0 +1,73 @@
+# Copyright (c) 2025, Mohamed Sharafudheen and Contributors
+# See license.txt
+
+from frappe.tests.utils import FrappeTestCase
+
+from service_workorder.ag_docs.sms_packing import SMSItem, SMSSection, measure, pack_sections, to_gsm
+
+
+class TestSMSPacking(FrappeTestCase):
+	def test_measure_segments(self):
+		self.assertEqual(measure("a" * 160).segments, 1)
+		self.assertEqual(measure("a" * 161).segments, 2)
+		self.assertEqual(measure("a" * 306).segments, 2)
+		# extension characters count twice
+		self.assertEqual(measure("{" * 80).units, 160)
+		self.assertEqual(measure("{" * 81).segments, 2)
+
+		info = measure("Passport \u2019expires\u2019")
+		self.assertEqual(info.encoding, "UCS-2")
+		self.assertEqual(measure("a" * 71 + "Ω").encoding, "GSM-7")
+		self.assertEqual(measure("a" * 70 + "€").segments, 1)
+		self.assertEqual(measure("a" * 70 + "☎").segments, 2)
+
+	def test_to_gsm_keeps_gsm_encoding(self):
+		self.assertEqual(measure(to_gsm("\u201cVisa\u201d \u2013 renew\u2026")).encoding, "GSM-7")
+
+	def test_packs_within_message_limit(self):
+		sections = [
+			SMSSection(f"Employee {i}", [SMSItem(f"Passport ({i:02d}-Nov)") for _ in range(4)], reference=i)
+			for i in range(10)
+		]
+		packed = pack_sections(sections, signature="- ACME", budget=0)
+
+		self.assertGreater(len(packed), 1)
+		self.assertTrue(all(sms.segments <= 3 for sms in packed))
+		self.assertTrue(all(sms.message.endswith("- ACME") for sms in packed))
+		self.assertEqual({ref for sms in packed for ref in sms.references}, set(range(10)))
+		self.assertEqual(packed[-1].trimmed, 0)
+
+	def test_budget_trims_with_summary(self):
+		sections = [
+			SMSSection(f"Employee {i}", [SMSItem(f"Passport ({i:02d}-Nov)") for _ in range(4)], reference=i)
+			for i in range(10)
+		]
+		packed = pack_sections(sections, budget=1)
+
+		self.assertEqual(len(packed), 1)
+		self.assertEqual(packed[0].segments, 1)
+		self.assertTrue(packed[0].trimmed)
+		self.assertIn(f"+{packed[0].trimmed} more", packed[0].message)
+		# trimmed sections are still accounted for by the summary
+		self.assertEqual(len(packed[0].references), 10)
+
+	def test_prefers_short_codes_when_cheaper(self):
+		items = [SMSItem("Residence Visa (12-Nov)", "RV 12/11") for _ in range(12)]
+		packed = pack_sections([SMSSection("Employee", items)])
+
+		self.assertEqual(len(packed), 1)
+		self.assertIn("RV 12/11", packed[0].message)
+		self.assertLess(packed[0].segments, measure("; ".join(item.label for item in items)).segments)
+
+	def test_oversized_first_document_is_cut_short(self):
+		sections = [SMSSection("Employee", [SMSItem("X" * 600), SMSItem("Passport")], reference=1)]
+		packed = pack_sections(sections, signature="- ACME", budget=1)
+
+		self.assertEqual(len(packed), 1)
+		self.assertEqual(packed[0].segments, 1)
+		self.assertTrue(packed[0].message.endswith("... +1 more - ACME"))
+		self.assertEqual(packed[0].references, [1])
+
+		packed = pack_sections([SMSSection("T" * 500, [SMSItem("Visa")])], max_message_segments=2)
+		self.assertEqual(len(packed), 1)
+		self.assertEqual(packed[0].segments, 2)